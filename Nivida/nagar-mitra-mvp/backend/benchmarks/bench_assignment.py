@@ -0,0 +1,119 @@
+"""
+Benchmark: bulk auto-assignment of the pending queue
+Compares the heap-backed engine with a naive picker that recounts open issues
+per worker with a query for every decision.
+Run from the backend directory: python -m benchmarks.bench_assignment
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Issue, Department, Worker
+from models.issue import IssueStatus
+from services.assignment import OPEN_STATUSES, AssignmentEngine, auto_assign_pending
+import services.assignment as assignment
+
+SPECIALIZATIONS = ["Plumbing", "Electrical", "Road Maintenance", "Waste Collection", "Security"]
+
+def seed(db, departments: int, workers_per_department: int, issue_count: int):
+    """Create departments, workers and a pending queue with random locations"""
+    rng = random.Random(42)
+    user = User(mobile_number="+919000000000", name="Bench User", hashed_password="x")
+    db.add(user)
+    depts = [Department(name=f"Department {d}", keywords="water,pipe") for d in range(departments)]
+    db.add_all(depts)
+    db.flush()
+
+    for dept in depts:
+        for w in range(workers_per_department):
+            db.add(Worker(
+                name=f"Worker {dept.id}-{w}",
+                employee_id=f"W{dept.id:03d}{w:05d}",
+                mobile_number="+919800000000",
+                department_id=dept.id,
+                specialization=rng.choice(SPECIALIZATIONS),
+            ))
+    db.flush()
+
+    rows = [
+        {
+            "title": f"Pending issue {i}",
+            "description": rng.choice(["pipe leak near tap", "streetlight wire down", "pothole on road"]),
+            "category": "general",
+            "status": IssueStatus.PENDING,
+            "latitude": 18.4 + rng.random() * 0.3,
+            "longitude": 73.7 + rng.random() * 0.3,
+            "user_id": user.id,
+            "department_id": depts[i % departments].id,
+            "needs_manual_review": False,
+        }
+        for i in range(issue_count)
+    ]
+    db.execute(Issue.__table__.insert(), rows)
+    db.commit()
+
+def naive_assign(db, limit: int) -> int:
+    """Old-style picker: count open issues per worker with a query for every decision"""
+    issues = db.query(Issue).filter(
+        Issue.status == IssueStatus.PENDING, Issue.worker_id.is_(None)
+    ).order_by(Issue.id).limit(limit).all()
+    for issue in issues:
+        counts = dict(db.execute(
+            select(Worker.id, func.count(Issue.id))
+            .outerjoin(Issue, (Issue.worker_id == Worker.id) & Issue.status.in_(OPEN_STATUSES))
+            .where(Worker.department_id == issue.department_id, Worker.is_available == True)
+            .group_by(Worker.id)
+        ).all())
+        issue.worker_id = min(counts, key=counts.get)
+        issue.status = IssueStatus.ASSIGNED
+        db.commit()
+    return len(issues)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--departments", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=100, help="workers per department")
+    parser.add_argument("--issues", type=int, default=20000)
+    parser.add_argument("--naive-sample", type=int, default=300)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with session_factory() as db:
+        seed(db, args.departments, args.workers, args.issues)
+
+    with session_factory() as db:
+        start = time.perf_counter()
+        naive = naive_assign(db, args.naive_sample)
+        naive_per_issue = (time.perf_counter() - start) / naive
+
+    # Fresh engine instance so loading cost is part of the measurement
+    assignment.assignment_engine = AssignmentEngine()
+    with session_factory() as db:
+        start = time.perf_counter()
+        summary = auto_assign_pending(db)
+        elapsed = time.perf_counter() - start
+
+    with session_factory() as db:
+        loads = [count for _, count in db.execute(
+            select(Issue.worker_id, func.count(Issue.id))
+            .where(Issue.status.in_(OPEN_STATUSES))
+            .group_by(Issue.worker_id)
+        ).all()]
+
+    workers = args.departments * args.workers
+    print(f"{args.issues} pending issues, {workers} workers")
+    print(f"naive query-per-decision: {naive_per_issue * 1000:.3f} ms/issue "
+          f"(~{naive_per_issue * args.issues:.1f}s for the queue)")
+    print(f"engine bulk auto-assign:  {elapsed * 1000 / max(1, summary['assigned']):.3f} ms/issue "
+          f"({elapsed:.2f}s, {summary['assigned']} assigned)")
+    print(f"open issues per worker: min {min(loads)}, max {max(loads)}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Benchmark: hotspot detection (grid DBSCAN)
+Scatters issue locations over a city, a share of them in tight groups around
+repeat-problem spots, clusters them with services.hotspots.density_clusters and
+checks a small sample against a brute-force DBSCAN.
+Run from the backend directory: python -m benchmarks.bench_hotspots
+"""
+import argparse
+import time
+
+import numpy as np
+
+from services.hotspots import HOTSPOT_EPS_M, HOTSPOT_MIN_ISSUES, density_clusters
+
+def brute_force(x: np.ndarray, y: np.ndarray, eps: float, min_samples: int):
+    """Core flags and core-point components from the full distance matrix"""
+    adjacent = (x[:, None] - x[None]) ** 2 + (y[:, None] - y[None]) ** 2 <= eps * eps
+    core = adjacent.sum(axis=1) >= min_samples
+    labels = np.full(len(x), -1)
+    cluster = 0
+    for seed in np.nonzero(core)[0]:
+        if labels[seed] >= 0:
+            continue
+        labels[seed] = cluster
+        stack = [seed]
+        while stack:
+            point = stack.pop()
+            for other in np.nonzero(adjacent[point] & core)[0]:
+                if labels[other] < 0:
+                    labels[other] = cluster
+                    stack.append(other)
+        cluster += 1
+    return core, labels
+
+def city(rng: np.random.Generator, points: int, spots: int, share: float, size_m: float):
+    clustered = int(points * share)
+    centres = rng.uniform(0, size_m, (spots, 2))
+    around = centres[rng.integers(0, spots, clustered)] + rng.normal(0, HOTSPOT_EPS_M / 2, (clustered, 2))
+    scattered = rng.uniform(0, size_m, (points - clustered, 2))
+    locations = np.concatenate([around, scattered])
+    return locations[:, 0], locations[:, 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--spots", type=int, default=20000)
+    parser.add_argument("--share", type=float, default=0.3, help="fraction of points around spots")
+    parser.add_argument("--city-km", type=float, default=100.0)
+    parser.add_argument("--check-points", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    x, y = city(rng, args.points, args.spots, args.share, args.city_km * 1000)
+    start = time.perf_counter()
+    labels = density_clusters(x, y, HOTSPOT_EPS_M, HOTSPOT_MIN_ISSUES)
+    elapsed = time.perf_counter() - start
+    print(f"{args.points} points: {labels.max() + 1} hotspots, {(labels >= 0).mean():.1%} of points clustered, "
+          f"{elapsed:.2f}s (eps {HOTSPOT_EPS_M}m, min {HOTSPOT_MIN_ISSUES})")
+
+    # Core points must form the same clusters as brute force; border points may go either way
+    x, y = city(rng, args.check_points, max(args.check_points // 100, 1), args.share, 3000.0)
+    labels = density_clusters(x, y, HOTSPOT_EPS_M, HOTSPOT_MIN_ISSUES)
+    core, expected = brute_force(x, y, HOTSPOT_EPS_M, HOTSPOT_MIN_ISSUES)
+    mapping = set(zip(labels[core].tolist(), expected[core].tolist()))
+    same = len(mapping) == len({a for a, _ in mapping}) == len({b for _, b in mapping}) and (labels[core] >= 0).all()
+    print(f"brute-force check on {args.check_points} points: {'match' if same else 'MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Benchmark: recording cost of the metrics middleware and query hooks
+Measures the middleware around a no-op ASGI app and the per-query cost of the
+SQLAlchemy cursor hooks on an in-memory database.
+Run from the backend directory: python -m benchmarks.bench_metrics
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import create_engine, text
+
+from middleware.metrics import MetricsMiddleware
+from utils.metrics import install_query_hooks
+
+class FakeRoute:
+    path = "/api/issues/{issue_id}"
+
+async def routed_app(scope, receive, send):
+    scope["route"] = FakeRoute
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+async def send(message):
+    pass
+
+async def measure(app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/api/issues/1", "headers": []}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) * 1e6 / requests
+
+def measure_queries(queries: int, hooks: bool) -> float:
+    engine = create_engine("sqlite://")
+    if hooks:
+        install_query_hooks(engine)
+    with engine.connect() as conn:
+        statement = text("SELECT 1")
+        start = time.perf_counter()
+        for _ in range(queries):
+            conn.execute(statement).scalar()
+        return (time.perf_counter() - start) * 1e6 / queries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=50000)
+    args = parser.parse_args()
+
+    bare = asyncio.run(measure(routed_app, args.requests))
+    instrumented = asyncio.run(measure(MetricsMiddleware(routed_app), args.requests))
+    print(f"middleware overhead: {instrumented - bare:.2f} us/request")
+
+    plain = measure_queries(args.queries, hooks=False)
+    hooked = measure_queries(args.queries, hooks=True)
+    print(f"query hook overhead: {hooked - plain:.2f} us/query ({plain:.1f} us/query without hooks)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
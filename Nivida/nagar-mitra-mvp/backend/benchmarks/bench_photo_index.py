@@ -0,0 +1,55 @@
+"""
+Benchmark: near-duplicate photo search
+Fills the multi-index hash table with random 64-bit photo hashes and looks up
+perturbed copies of stored hashes (a re-compressed upload flips a few bits) and
+unrelated hashes, against a linear scan over all hashes.
+Run from the backend directory: python -m benchmarks.bench_photo_index
+"""
+import argparse
+import random
+import time
+
+from services.media_index import MAX_DISTANCE, MultiIndexHashTable
+from utils.image_hash import HASH_BITS, hamming_distance
+
+def perturb(rng: random.Random, value: int, bits: int) -> int:
+    for position in rng.sample(range(HASH_BITS), bits):
+        value ^= 1 << position
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--photos", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--linear-queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    hashes = [rng.getrandbits(HASH_BITS) for _ in range(args.photos)]
+    table = MultiIndexHashTable()
+    start = time.perf_counter()
+    for media_id, value in enumerate(hashes, 1):
+        table.add(value, media_id, media_id)
+    print(f"{args.photos} photos indexed in {time.perf_counter() - start:.1f}s, max distance {MAX_DISTANCE}")
+
+    queries = [perturb(rng, rng.choice(hashes), rng.randint(0, MAX_DISTANCE)) for _ in range(args.queries // 2)]
+    queries += [rng.getrandbits(HASH_BITS) for _ in range(args.queries - len(queries))]
+    found = 0
+    latencies = []
+    for query in queries:
+        query_start = time.perf_counter()
+        found += bool(table.search(query))
+        latencies.append(time.perf_counter() - query_start)
+    latencies.sort()
+    print(f"multi-index: p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms, {found}/{len(queries)} queries matched")
+
+    start = time.perf_counter()
+    for query in queries[:args.linear_queries]:
+        [value for value in hashes if hamming_distance(query, value) <= MAX_DISTANCE]
+    linear = (time.perf_counter() - start) / args.linear_queries
+    print(f"linear scan: {linear * 1000:.1f} ms per query")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Benchmark: per-request overhead of the rate limiting middleware
+Calls the middleware directly with a no-op ASGI app, so the numbers are the
+enforcement cost alone (budget: 50us per request).
+Run from the backend directory: python -m benchmarks.bench_rate_limit
+"""
+import argparse
+import asyncio
+import time
+
+from middleware.rate_limit import (
+    LocalKeyValueStore,
+    MemoryRateLimitBackend,
+    RateLimitMiddleware,
+    RateLimitRule,
+    SharedRateLimitBackend,
+)
+from utils.auth import create_access_token
+
+BUDGET_US = 50.0
+
+async def noop_app(scope, receive, send):
+    pass
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+async def send(message):
+    pass
+
+def make_scope(method: str, path: str, token: str, ip: str):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "client": (ip, 50000),
+        "headers": [
+            (b"host", b"localhost"),
+            (b"user-agent", b"bench"),
+            (b"authorization", f"Bearer {token}".encode()),
+        ],
+    }
+
+async def measure(app, scopes, requests: int) -> float:
+    """Mean microseconds per call over `requests` calls cycling through `scopes`"""
+    count = len(scopes)
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scopes[i % count], receive, send)
+    return (time.perf_counter() - start) * 1e6 / requests
+
+async def run(requests: int, clients: int):
+    # Limits high enough that the benchmark measures the allow path
+    rules = [
+        RateLimitRule("issue_create", "POST", "/api/issues/", limit=10 ** 9, period=60, key="user"),
+        RateLimitRule("issue_create_ip", "POST", "/api/issues/", limit=10 ** 9, period=60, key="ip"),
+        RateLimitRule("vote", "POST", r"/api/issues/(\d+)/vote", limit=10 ** 9, period=60, key="user"),
+    ]
+    tokens = [create_access_token({"sub": f"+91900000{i:04d}"}) for i in range(clients)]
+    create_scopes = [make_scope("POST", "/api/issues/", tokens[i], f"10.0.{i // 250}.{i % 250}") for i in range(clients)]
+    vote_scopes = [make_scope("POST", f"/api/issues/{i}/vote", tokens[i], "10.1.0.1") for i in range(clients)]
+    list_scopes = [make_scope("GET", "/api/issues/", tokens[i], "10.2.0.1") for i in range(clients)]
+
+    baseline = await measure(noop_app, create_scopes, requests)
+    results = {}
+    for name, backend in (
+        ("memory", MemoryRateLimitBackend()),
+        ("shared (local store)", SharedRateLimitBackend(LocalKeyValueStore())),
+    ):
+        app = RateLimitMiddleware(noop_app, rules=rules, backend=backend)
+        # Warm the token cache so steady state is measured
+        await measure(app, create_scopes, clients)
+        results[f"{name}: unlimited route"] = await measure(app, list_scopes, requests) - baseline
+        results[f"{name}: create (2 rules)"] = await measure(app, create_scopes, requests) - baseline
+        results[f"{name}: vote (pattern rule)"] = await measure(app, vote_scopes, requests) - baseline
+
+    print(f"{requests} requests over {clients} clients, budget {BUDGET_US:.0f}us")
+    for name, overhead in results.items():
+        verdict = "ok" if overhead < BUDGET_US else "OVER BUDGET"
+        print(f"  {name:<42} {overhead:7.2f} us/request  {verdict}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--clients", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.clients))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Benchmark: ORM + pydantic serialization vs the column-tuple fast path
+Run from the backend directory: python -m benchmarks.bench_serialization
+"""
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Issue, IssueMedia
+from models.issue import IssueStatus
+from schemas.issue import IssueListResponse
+from utils.serialization import ISSUE_COLUMNS, dumps, fetch_issue_dicts
+
+def seed(db, issue_count: int):
+    """Create one citizen and issue_count issues, every third one with media"""
+    user = User(mobile_number="+919000000000", name="Bench User", hashed_password="x")
+    db.add(user)
+    db.flush()
+
+    for i in range(issue_count):
+        issue = Issue(
+            title=f"Benchmark issue {i}",
+            description="Water leaking from the main pipe near the market",
+            category="water",
+            latitude=18.52 + i * 1e-5,
+            longitude=73.85,
+            address="Market Road",
+            user_id=user.id,
+            needs_manual_review=i % 2 == 0,
+        )
+        db.add(issue)
+        if i % 3 == 0:
+            issue.media.append(IssueMedia(
+                file_path=f"uploads/{i}.jpg",
+                file_type="image",
+                file_size=1024,
+                original_filename=f"{i}.jpg",
+            ))
+    db.commit()
+
+def current_get_issues(db, limit: int) -> bytes:
+    """Previous get_issues: ORM objects -> IssueListResponse -> jsonable_encoder"""
+    query = db.query(Issue)
+    total = query.count()
+    issues = query.offset(0).limit(limit).all()
+    payload = IssueListResponse.model_validate(
+        {"issues": issues, "total": total, "page": 1, "per_page": limit},
+        from_attributes=True,
+    )
+    return json.dumps(jsonable_encoder(payload)).encode("utf-8")
+
+def fast_get_issues(db, limit: int) -> bytes:
+    """New get_issues: column tuples -> dicts -> orjson"""
+    total = db.execute(select(func.count(Issue.id))).scalar()
+    issues = fetch_issue_dicts(db, select(*ISSUE_COLUMNS).offset(0).limit(limit))
+    return dumps({"issues": issues, "total": total, "page": 1, "per_page": limit})
+
+def current_get_pending(db, limit: int) -> bytes:
+    """Previous admin.get_pending_issues: raw ORM objects through jsonable_encoder"""
+    issues = db.query(Issue).filter(
+        Issue.needs_manual_review == True,
+        Issue.status == IssueStatus.PENDING
+    ).order_by(Issue.created_at.desc()).limit(limit).all()
+    return json.dumps(jsonable_encoder(issues)).encode("utf-8")
+
+def fast_get_pending(db, limit: int) -> bytes:
+    """New admin.get_pending_issues"""
+    issues = fetch_issue_dicts(
+        db,
+        select(*ISSUE_COLUMNS).where(
+            Issue.needs_manual_review == True,
+            Issue.status == IssueStatus.PENDING
+        ).order_by(Issue.created_at.desc()).limit(limit)
+    )
+    return dumps(issues)
+
+def timeit(session_factory, fn, limit: int, repeat: int) -> float:
+    """Return mean milliseconds per call, using a fresh session per call like a request"""
+    # Warm up caches (compiled statements, pydantic validators)
+    with session_factory() as db:
+        fn(db, limit)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        with session_factory() as db:
+            fn(db, limit)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--issues", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with session_factory() as db:
+        seed(db, args.issues)
+
+    cases = [
+        ("get_issues", current_get_issues, fast_get_issues),
+        ("admin.get_pending_issues", current_get_pending, fast_get_pending),
+    ]
+    print(f"{args.issues} issues, page size {args.page_size}, {args.repeat} runs")
+    print(f"{'endpoint':<28}{'current ms':>12}{'fast ms':>10}{'speedup':>10}")
+    for name, current, fast in cases:
+        current_ms = timeit(session_factory, current, args.page_size, args.repeat)
+        fast_ms = timeit(session_factory, fast, args.page_size, args.repeat)
+        print(f"{name:<28}{current_ms:>12.3f}{fast_ms:>10.3f}{current_ms / fast_ms:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+Benchmark: text normalization on mixed-script reports
+Generates English, romanized Hindi, Hindi and Marathi issue texts and compares the
+old lowercase + \\b\\w+\\b split with utils.text (cold caches, and warm as when one
+text is matched by the classifier, priority detection and assignment in turn):
+tokenizing throughput, and how often keyword classification finds the right
+department per language.
+Run from the backend directory: python -m benchmarks.bench_text
+"""
+import argparse
+import random
+import re
+import time
+from collections import defaultdict
+
+from services.classification import IssueClassifier, build_keyword_index
+from utils import text as text_utils
+
+# The sample departments' keywords (init_db)
+DEPARTMENTS = {
+    1: "water,pipe,leak,drainage,sewage,tap,supply,pressure,contamination",
+    2: "electricity,power,outage,transformer,pole,wire,streetlight,meter",
+    3: "road,pothole,traffic,signal,maintenance,construction,parking,footpath",
+    4: "garbage,waste,trash,cleaning,dustbin,disposal,sanitation,sweeping",
+    5: "safety,security,crime,emergency,police,fire,ambulance,accident",
+}
+
+TEMPLATES = {
+    "english": [
+        (1, "Water pipes leaking near the taps, supply is low"),
+        (2, "Streetlights not working and wires sparking on the poles"),
+        (3, "Huge potholes on the roads, traffic jammed"),
+        (4, "Garbage not collected, dustbins overflowing"),
+        (5, "Accidents at the crossing, police never come"),
+    ],
+    "romanized": [
+        (1, "paani nahi aa raha, nal se risav ho raha hai"),
+        (2, "bijli nahi hai, taar gir gaya khamba ke paas"),
+        (3, "sadak par bada gaddha hai"),
+        (4, "kachra teen din se nahi uthaya"),
+        (5, "yahan chori hoti hai, pulis nahi aati"),
+    ],
+    "hindi": [
+        (1, "पानी नहीं आ रहा, नल से रिसाव हो रहा है"),
+        (2, "बिजली के तार गिरे हैं, खंभा टूटा"),
+        (3, "सड़कों पर बड़े गड्ढे हैं"),
+        (4, "कचरा तीन दिन से नहीं उठाया गया"),
+        (5, "चौराहे पर दुर्घटना हुई, पुलिस नहीं आई"),
+    ],
+    "marathi": [
+        (1, "पाणी येत नाही, नळ गळती आहे"),
+        (2, "वीज नाही, खांब पडला आहे"),
+        (3, "रस्त्यावर खड्डे आहेत"),
+        (4, "कचरा उचलला नाही"),
+        (5, "अपघात झाला, पोलीस आले नाहीत"),
+    ],
+}
+
+_LEGACY_WORD_RE = re.compile(r"\b\w+\b")
+
+def legacy_words(text: str):
+    return set(_LEGACY_WORD_RE.findall(text.lower()))
+
+def legacy_classify(text: str):
+    """The keyword matching before utils.text: exact lower-cased words only"""
+    words = legacy_words(text)
+    scores = {}
+    for dept_id, keywords in DEPARTMENTS.items():
+        matches = sum(1 for keyword in keywords.split(",") if keyword in words)
+        if matches:
+            scores[dept_id] = matches
+    return max(scores, key=scores.get) if scores else None
+
+def make_corpus(count: int, seed: int):
+    """Templates with a numbered location suffix so most texts are distinct"""
+    rng = random.Random(seed)
+    languages = list(TEMPLATES)
+    corpus = []
+    for i in range(count):
+        language = rng.choice(languages)
+        dept_id, text = rng.choice(TEMPLATES[language])
+        corpus.append((language, dept_id, f"{text} ward {i % 500} lane {rng.randrange(100)}"))
+    return corpus
+
+def clear_caches():
+    for func in (text_utils.canonical_term, text_utils.canonical_tokens, text_utils.term_set):
+        func.cache_clear()
+
+def timed(label: str, func, texts):
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<36} {len(texts) / elapsed:>12,.0f} texts/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.texts, args.seed)
+    texts = [text for _, _, text in corpus]
+
+    print(f"Tokenizing {len(texts)} mixed-script texts")
+    timed("legacy lower + \\b\\w+\\b", legacy_words, texts)
+    clear_caches()
+    timed("utils.text, cold caches", text_utils.term_set, texts)
+    timed("utils.text, warm (second lookup)", text_utils.term_set, texts[-text_utils.TEXT_CACHE_SIZE:] * 10)
+    print(f"  token cache: {text_utils.cache_info()['terms']}")
+    clear_caches()
+    timed("utils.text, no caches at all", lambda text: frozenset(
+        text_utils.canonical_term.__wrapped__(token) for token in text_utils.tokenize(text)
+    ), texts)
+
+    index = build_keyword_index(
+        (dept_id, f"Department {dept_id}", keywords) for dept_id, keywords in DEPARTMENTS.items()
+    )
+    classifier = IssueClassifier(None, index=index)
+    correct = defaultdict(lambda: [0, 0, 0])
+    for language, dept_id, text in corpus:
+        counts = correct[language]
+        counts[0] += legacy_classify(text) == dept_id
+        counts[1] += classifier.classify_keywords(text, "")[0] == dept_id
+        counts[2] += 1
+
+    print("\nKeyword classification accuracy by language")
+    print(f"  {'language':<12} {'legacy':>8} {'utils.text':>11}")
+    for language, (legacy, current, total) in sorted(correct.items()):
+        print(f"  {language:<12} {legacy / total:>8.1%} {current / total:>11.1%}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
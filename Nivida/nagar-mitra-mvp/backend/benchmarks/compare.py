@@ -0,0 +1,73 @@
+"""
+Compare two load test result files
+Prints throughput and latency percentiles side by side per workload (and per
+endpoint with --endpoints) and exits with status 1 when any p95/p99 latency grows,
+or throughput drops, by more than --threshold percent.
+Run from the backend directory: python -m benchmarks.compare base.json new.json
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+GATED_LATENCY_KEYS = ("p95_ms", "p99_ms")
+
+def change_percent(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) * 100.0 / old
+
+def compare_rows(name: str, old: Dict, new: Dict, threshold: float, regressions: List[str]) -> List[str]:
+    lines = []
+    for key in ("throughput_rps",) + LATENCY_KEYS:
+        delta = change_percent(old.get(key), new.get(key))
+        delta_text = f"{delta:+7.1f}%" if delta is not None else "      -"
+        worse = delta is not None and (
+            (key == "throughput_rps" and delta < -threshold)
+            or (key in GATED_LATENCY_KEYS and delta > threshold)
+        )
+        if worse:
+            regressions.append(f"{name} {key} {delta:+.1f}%")
+        lines.append(f"  {key:<15} {old.get(key)!s:>10} -> {new.get(key)!s:>10}  {delta_text}{'  REGRESSION' if worse else ''}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    parser.add_argument("--endpoints", action="store_true", help="also compare per endpoint")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"base {base.get('git_sha') or 'unknown'} ({base.get('timestamp')})")
+    print(f"new  {new.get('git_sha') or 'unknown'} ({new.get('timestamp')})")
+    regressions: List[str] = []
+    for workload, new_result in new["workloads"].items():
+        old_result = base["workloads"].get(workload)
+        if old_result is None:
+            print(f"\n{workload}: not in base")
+            continue
+        print(f"\n{workload}")
+        print("\n".join(compare_rows(workload, old_result, new_result, args.threshold, regressions)))
+        if args.endpoints:
+            for endpoint, new_endpoint in new_result.get("endpoints", {}).items():
+                old_endpoint = old_result.get("endpoints", {}).get(endpoint)
+                if old_endpoint is not None:
+                    print(f" {endpoint}")
+                    print("\n".join(compare_rows(f"{workload} {endpoint}", old_endpoint, new_endpoint, args.threshold, regressions)))
+
+    if regressions:
+        print(f"\n{len(regressions)} regressions over {args.threshold}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+Synthetic data generator for benchmarks and load tests
+Builds on init_db.create_sample_data (departments, workers, admin and citizen users)
+and adds deterministic synthetic users, issues, media rows and votes in large Core
+batches, so millions of rows take minutes rather than hours.
+Run from the backend directory:
+    python -m benchmarks.datagen --database-url sqlite:///./bench.db --users 100000 --issues 1000000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+BENCH_PASSWORD = "bench123"
+BATCH_SIZE = 10000
+
+# Centre of the synthetic city (Pune) and its rough extent in degrees
+CITY_LATITUDE = 18.52
+CITY_LONGITUDE = 73.85
+CITY_SPREAD = 0.15
+
+ISSUE_TEMPLATES = {
+    "water": [
+        ("Water pipe leak", "The water pipe near the tap is leaking onto the road"),
+        ("No water supply", "No water supply since morning, low pressure in the whole lane"),
+        ("Sewage overflow", "Drainage is blocked and sewage is overflowing near the school"),
+    ],
+    "electricity": [
+        ("Streetlight not working", "The streetlight on the corner pole has been off for a week"),
+        ("Power outage", "Frequent power outage, the transformer makes a loud noise"),
+        ("Loose wire", "A loose electricity wire is hanging from the pole, sparking at night"),
+    ],
+    "roads": [
+        ("Pothole on main road", "Large pothole on the road causing traffic and accidents"),
+        ("Broken footpath", "Footpath is broken, pedestrians walk on the road"),
+        ("Traffic signal faulty", "The traffic signal at the junction is not working"),
+    ],
+    "waste": [
+        ("Garbage not collected", "Garbage has not been collected for three days, dustbin overflowing"),
+        ("Waste dumped in open", "People dump waste on the empty plot, bad smell in the area"),
+        ("Street not swept", "The street has not been swept and trash is everywhere"),
+    ],
+    "public": [
+        ("Unsafe dark lane", "The lane is dark at night and not safe, please add security"),
+        ("Accident prone crossing", "Frequent accidents at the crossing, emergency help is slow"),
+        ("Fire hazard", "Dry waste is burning near the houses, fire risk"),
+    ],
+}
+STATUS_WEIGHTS = [("pending", 30), ("assigned", 15), ("in_progress", 15), ("resolved", 35), ("rejected", 5)]
+PRIORITY_WEIGHTS = [("low", 20), ("medium", 50), ("high", 22), ("critical", 8)]
+
+def bench_mobile(index: int) -> str:
+    """Mobile number of the index-th synthetic user (stable across runs)"""
+    return f"+917{index:09d}"
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+def generate(users: int, issues: int, media_ratio: float = 0.3, seed: int = 42, days: int = 365):
+    """Populate the database named by DATABASE_URL; returns a summary dict"""
+    # Imported here so callers can point DATABASE_URL at a benchmark database first
+    from sqlalchemy import insert
+
+    import init_db
+    from database import SessionLocal, engine
+    from models import Department, Issue, IssueMedia, User, Worker
+    from models.issue import IssuePriority, IssueStatus
+    from services.clusters import rebuild_issue_clusters
+    from services.issue_events import backfill_issue_events
+    from services.media import media_file_type
+    from services.prioritization import compute_urgency, sla_due_at
+    from services.ranking import hot_score
+    from utils.auth import get_password_hash
+    from utils.geo import geo_cells
+
+    rng = random.Random(seed)
+    init_db.create_tables()
+    init_db.create_sample_data()
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        existing = db.query(User).filter(User.mobile_number.like("+917%")).count()
+        # One hash shared by every synthetic user: hashing millions of passwords is not the point
+        hashed = get_password_hash(BENCH_PASSWORD)
+        for batch_start in range(existing, users, BATCH_SIZE):
+            db.execute(User.__table__.insert(), [
+                {
+                    "mobile_number": bench_mobile(i),
+                    "name": f"Bench User {i}",
+                    "email": None,
+                    "address": f"{rng.randint(1, 400)} Synthetic Street",
+                    "is_active": True,
+                    "is_admin": False,
+                    "hashed_password": hashed,
+                }
+                for i in range(batch_start, min(users, batch_start + BATCH_SIZE))
+            ])
+            db.commit()
+
+        user_ids = [row[0] for row in db.query(User.id).filter(User.mobile_number.like("+917%")).all()]
+        departments = db.query(Department).order_by(Department.id).all()
+        workers_by_department = {}
+        for worker in db.query(Worker).all():
+            workers_by_department.setdefault(worker.department_id, []).append(worker.id)
+        department_keys = [dept.name.split()[0].lower() for dept in departments]
+        template_keys = list(ISSUE_TEMPLATES)
+
+        now = datetime.utcnow()
+        existing_issues = db.query(Issue).count()
+        media_rows = 0
+        for batch_start in range(existing_issues, issues, BATCH_SIZE):
+            rows = []
+            for _ in range(batch_start, min(issues, batch_start + BATCH_SIZE)):
+                dept_index = rng.randrange(len(departments))
+                department = departments[dept_index]
+                title, description = rng.choice(ISSUE_TEMPLATES[template_keys[dept_index % len(template_keys)]])
+                status = IssueStatus(_weighted(rng, STATUS_WEIGHTS))
+                priority = IssuePriority(_weighted(rng, PRIORITY_WEIGHTS))
+                created_at = now - timedelta(seconds=rng.random() * days * 86400)
+                # Vote counts are heavy tailed: most issues get a few, some get hundreds
+                upvotes = int(rng.paretovariate(1.5)) - 1
+                downvotes = int(rng.paretovariate(3.0)) - 1
+                latitude = CITY_LATITUDE + rng.uniform(-CITY_SPREAD, CITY_SPREAD)
+                longitude = CITY_LONGITUDE + rng.uniform(-CITY_SPREAD, CITY_SPREAD)
+                has_worker = status in (IssueStatus.ASSIGNED, IssueStatus.IN_PROGRESS, IssueStatus.RESOLVED)
+                rows.append({
+                    "title": f"{title} #{rng.randint(1, 999)}",
+                    "description": description,
+                    "category": department_keys[dept_index],
+                    "status": status,
+                    "priority": priority,
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "address": f"Ward {rng.randint(1, 40)}",
+                    "user_id": rng.choice(user_ids),
+                    "department_id": department.id,
+                    "worker_id": rng.choice(workers_by_department.get(department.id, [None])) if has_worker else None,
+                    "ai_confidence": round(rng.uniform(0.2, 1.0), 2),
+                    "needs_manual_review": rng.random() < 0.1,
+                    "upvotes": upvotes,
+                    "downvotes": downvotes,
+                    "urgency_score": compute_urgency(priority, upvotes, downvotes, created_at, 0, now),
+                    "nearby_count": 0,
+                    "sla_due_at": sla_due_at(priority, created_at),
+                    "sla_breached": False,
+                    "hot_score": hot_score(upvotes, downvotes, created_at),
+                    **geo_cells(latitude, longitude),
+                    "created_at": created_at,
+                    "resolved_at": created_at + timedelta(hours=rng.uniform(2, 400)) if status == IssueStatus.RESOLVED else None,
+                })
+            issue_ids = db.execute(
+                insert(Issue.__table__).returning(Issue.__table__.c.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+
+            media = [
+                {
+                    "issue_id": issue_id,
+                    "file_path": f"uploads/{issue_id}_bench.jpg",
+                    "file_type": media_file_type("image/jpeg"),
+                    "file_size": rng.randint(40000, 2000000),
+                    "original_filename": "photo.jpg",
+                }
+                for issue_id in issue_ids
+                if rng.random() < media_ratio
+            ]
+            if media:
+                db.execute(IssueMedia.__table__.insert(), media)
+                media_rows += len(media)
+            db.commit()
+            print(f"  {batch_start + len(rows)}/{issues} issues", end="\r", flush=True)
+        # Creation (and resolution) events for the generated issues
+        backfill_issue_events(db)
+        rebuild_issue_clusters(db)
+    finally:
+        db.close()
+
+    summary = {
+        "users": users,
+        "issues": issues,
+        "media": media_rows,
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+    print(f"Generated {summary}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--issues", type=int, default=100000)
+    parser.add_argument("--media-ratio", type=float, default=0.3)
+    parser.add_argument("--days", type=int, default=365, help="spread of creation dates")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    generate(args.users, args.issues, args.media_ratio, args.seed, args.days)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Classifier evaluation: routing quality and intake cost
+Replays a labelled corpus through each classifier implementation and reports
+accuracy, the manual-review rate and the accuracy of auto-routed issues at a range
+of review thresholds, a confusion matrix by department, and single-issue latency
+(p50/p99) and throughput, one call per issue and in batches.
+The corpus is either the issues in a database (admin-labelled ones with
+--labels admin, every issue with a department with --labels all) or an NDJSON file
+of {"title", "description", "department_id"} records; departments and keywords are
+always read from the database. Implementations:
+    keywords  the department keyword rules
+    model     the trained model (the active one, or --model-dir), keywords as fallback
+Results are written with --output in the load test format, so two runs can be
+compared with benchmarks.compare.
+Run from the backend directory:
+    python -m benchmarks.eval_classifier --database-url sqlite:///./bench.db --labels all --output eval.json
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.loadtest import git_revision, percentile
+
+THRESHOLDS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+UNROUTED = "none"
+
+Sample = Tuple[str, str, int]
+
+def load_database_corpus(db, labels: str, limit: Optional[int]) -> List[Sample]:
+    from sqlalchemy import select
+    from services.archive import issues_both_tiers
+    from services.classifier_training import labelled_issue_ids
+
+    issues = issues_both_tiers("id", "title", "description", "department_id")
+    query = select(issues.c.title, issues.c.description, issues.c.department_id).where(
+        issues.c.department_id.isnot(None)
+    )
+    if labels == "admin":
+        query = query.where(issues.c.id.in_(labelled_issue_ids()))
+    if limit:
+        query = query.order_by(issues.c.id.desc()).limit(limit)
+    return [(row.title, row.description, row.department_id) for row in db.execute(query)]
+
+def load_file_corpus(path: str, limit: Optional[int]) -> List[Sample]:
+    samples = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                samples.append((record["title"], record.get("description") or "", int(record["department_id"])))
+    return samples[:limit] if limit else samples
+
+def quality(classifier, samples: List[Sample], names: Dict[int, str]) -> Dict[str, Any]:
+    """Accuracy, review rates and confusion matrix from one pass over the corpus"""
+    items = [(title, description) for title, description, _ in samples]
+    decisions = classifier.classify_batch(items)
+    raw = classifier.raw_scores(items)
+    total = len(samples)
+
+    correct = 0
+    confusion: Dict[str, Counter] = defaultdict(Counter)
+    for (_, _, label), (dept_id, _, _) in zip(samples, decisions):
+        correct += dept_id == label
+        confusion[names.get(label, str(label))][names.get(dept_id, UNROUTED) if dept_id else UNROUTED] += 1
+
+    sweep = []
+    for threshold in THRESHOLDS:
+        routed = [
+            dept_id == label
+            for (_, _, label), (dept_id, score, _) in zip(samples, raw)
+            if dept_id is not None and score >= threshold
+        ]
+        sweep.append({
+            "threshold": threshold,
+            "review_rate": round(1 - len(routed) / total, 4),
+            "routed_accuracy": round(sum(routed) / len(routed), 4) if routed else None,
+        })
+
+    return {
+        "samples": total,
+        "accuracy": round(correct / total, 4),
+        "review_rate": round(sum(review for _, _, review in decisions) / total, 4),
+        "unrouted_rate": round(sum(dept_id is None for dept_id, _, _ in decisions) / total, 4),
+        "model_share": round(sum(from_model for _, _, from_model in raw) / total, 4),
+        "thresholds": sweep,
+        "confusion": {label: dict(row) for label, row in sorted(confusion.items())},
+    }
+
+def throughput(classifier, samples: List[Sample], batch_size: int, repeat: int) -> Dict[str, Any]:
+    """Per-call latency percentiles and issues/second, singly and in batches"""
+    items = [(title, description) for title, description, _ in samples]
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for title, description in items:
+            call_start = time.perf_counter()
+            classifier.classify_issue(title, description)
+            latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    batch_start = time.perf_counter()
+    for _ in range(repeat):
+        for offset in range(0, len(items), batch_size):
+            classifier.classify_batch(items[offset:offset + batch_size])
+    batch_elapsed = time.perf_counter() - batch_start
+
+    return {
+        "requests": len(latencies),
+        "errors": 0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "batch_size": batch_size,
+        "batch_throughput_rps": round(len(latencies) / batch_elapsed, 1) if batch_elapsed else None,
+    }
+
+def build_classifiers(db, implementations: List[str], model_dir: Optional[str]) -> Dict[str, Any]:
+    from services.classification import IssueClassifier, get_text_model
+
+    classifiers = {}
+    for name in implementations:
+        classifier = IssueClassifier(db)
+        if name == "model":
+            if model_dir:
+                from services.text_model import LinearTextModel
+                classifier.model = LinearTextModel.load(model_dir)
+            else:
+                classifier.model = get_text_model()
+            if classifier.model is None:
+                print("model: no active model (train one or pass --model-dir), skipped")
+                continue
+        classifiers[name] = classifier
+    return classifiers
+
+def print_report(name: str, result: Dict[str, Any]):
+    print(f"\n{name}: accuracy {result['accuracy']:.1%}, review rate {result['review_rate']:.1%}, "
+          f"unrouted {result['unrouted_rate']:.1%}, model decided {result['model_share']:.1%}")
+    print(f"  {result['throughput_rps']} issues/s one at a time (p50 {result['p50_ms']} ms, "
+          f"p99 {result['p99_ms']} ms), {result['batch_throughput_rps']} issues/s in batches of {result['batch_size']}")
+    print(f"  {'threshold':>9} {'review':>8} {'routed acc':>11}")
+    for row in result["thresholds"]:
+        accuracy = f"{row['routed_accuracy']:.1%}" if row["routed_accuracy"] is not None else "-"
+        print(f"  {row['threshold']:>9.1f} {row['review_rate']:>8.1%} {accuracy:>11}")
+    columns = sorted({column for row in result["confusion"].values() for column in row})
+    print("  " + "actual / predicted".ljust(20) + "".join(f"{column[:10]:>11}" for column in columns))
+    for label, row in result["confusion"].items():
+        print(f"  {label[:20]:<20}" + "".join(f"{row.get(column, 0):>11}" for column in columns))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--corpus", default=None, help="NDJSON corpus instead of the database's issues")
+    parser.add_argument("--labels", choices=["admin", "all"], default="admin")
+    parser.add_argument("--limit", type=int, default=None, help="most recent N issues only")
+    parser.add_argument("--implementations", default="keywords,model")
+    parser.add_argument("--model-dir", default=None, help="a saved model version directory")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=1, help="timing passes over the corpus")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="write results to this JSON file")
+    args = parser.parse_args()
+
+    # Before the app modules create their engine
+    os.environ["DATABASE_URL"] = args.database_url
+    from database import SessionLocal
+    from models.department import Department
+
+    with SessionLocal() as db:
+        names = {dept.id: dept.name for dept in db.query(Department).all()}
+        if args.corpus:
+            samples = load_file_corpus(args.corpus, args.limit)
+        else:
+            samples = load_database_corpus(db, args.labels, args.limit)
+        if not samples:
+            raise SystemExit("Empty corpus (with --labels admin, only admin-assigned issues count)")
+        random.Random(args.seed).shuffle(samples)
+        classifiers = build_classifiers(db, args.implementations.split(","), args.model_dir)
+
+        print(f"{len(samples)} labelled issues over {len({label for _, _, label in samples})} departments")
+        results: Dict[str, Any] = {
+            "git_sha": git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "corpus": args.corpus or f"{args.database_url} ({args.labels})",
+            "workloads": {},
+        }
+        for name, classifier in classifiers.items():
+            result = quality(classifier, samples, names)
+            result.update(throughput(classifier, samples, args.batch_size, args.repeat))
+            results["workloads"][name] = result
+            print_report(name, result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
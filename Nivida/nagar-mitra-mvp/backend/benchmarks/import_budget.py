@@ -0,0 +1,119 @@
+"""
+Import-time budget check
+Runs each entry point in a fresh interpreter with `python -X importtime`, reports
+the cumulative import cost of every project module and of the heaviest third-party
+packages, and exits with status 1 when an entry point exceeds its budget or imports
+a module that is supposed to load lazily.
+Run from the backend directory: python -m benchmarks.import_budget
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_PACKAGES = ("config", "database", "main", "models", "schemas", "routers", "services", "utils", "middleware")
+
+# (name, code, budget in ms, modules that must not be imported)
+ENTRY_POINTS = [
+    ("import main", "import main", 100, ("fastapi", "jose", "passlib", "sqlalchemy")),
+    ("create_app()", "import main; main.create_app()", 2500, ("jose", "passlib")),
+    ("import services.classification", "import services.classification", 800, ("fastapi", "jose", "passlib")),
+    ("import utils.auth", "import utils.auth", 1500, ("jose", "passlib")),
+]
+
+def measure(code: str) -> Tuple[Dict[str, int], List[str]]:
+    """Cumulative import time (us) per module and the top-level imports, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "BACKGROUND_JOBS_ENABLED": "false"},
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"`{code}` failed:\n{result.stderr[-2000:]}")
+    cumulative: Dict[str, int] = {}
+    top_level: List[str] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        module = parts[2].strip()
+        cumulative[module] = int(parts[1])
+        # Nested imports are indented; top-level ones sum to the total import time
+        if not parts[2][1:].startswith(" "):
+            top_level.append(module)
+    return cumulative, top_level
+
+def is_project_module(module: str) -> bool:
+    return module.split(".")[0] in PROJECT_PACKAGES
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=10, help="third-party packages to list per entry point")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply budgets (slow machines)")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report here")
+    args = parser.parse_args()
+
+    # Modules the bare interpreter already imports (site, .pth hooks) are not ours to budget
+    startup, _ = measure("pass")
+
+    report = {}
+    failures = []
+    for name, code, budget_ms, forbidden in ENTRY_POINTS:
+        cumulative, top_level = measure(code)
+        cumulative = {module: us for module, us in cumulative.items() if module not in startup}
+        top_level = [module for module in top_level if module in cumulative]
+        total_ms = sum(cumulative[module] for module in top_level) / 1000.0
+        loaded = {module.split(".")[0] for module in cumulative}
+        leaked = sorted(set(forbidden) & loaded)
+        budget = budget_ms * args.scale
+
+        project = sorted(
+            ((module, us) for module, us in cumulative.items() if is_project_module(module)),
+            key=lambda item: -item[1],
+        )
+        third_party = sorted(
+            ((module, cumulative[module]) for module in top_level if not is_project_module(module)),
+            key=lambda item: -item[1],
+        )[:args.top]
+
+        status = "ok"
+        if total_ms > budget:
+            status = "OVER BUDGET"
+            failures.append(f"{name}: {total_ms:.0f}ms > {budget:.0f}ms")
+        if leaked:
+            status = "EAGER IMPORTS"
+            failures.append(f"{name}: imports {', '.join(leaked)}")
+
+        print(f"\n{name}: {total_ms:.0f}ms (budget {budget:.0f}ms) {status}")
+        print("  project modules (cumulative):")
+        for module, us in project:
+            print(f"    {us / 1000:9.1f}ms  {module}")
+        print("  heaviest packages:")
+        for module, us in third_party:
+            print(f"    {us / 1000:9.1f}ms  {module}")
+        report[name] = {
+            "total_ms": round(total_ms, 1),
+            "budget_ms": budget,
+            "eager_imports": leaked,
+            "project_modules_ms": {module: round(us / 1000, 2) for module, us in project},
+            "packages_ms": {module: round(us / 1000, 2) for module, us in third_party},
+        }
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if failures:
+        print("\nImport budget exceeded:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll entry points within budget")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Load test for the realtime issue feed
+Default mode holds N idle subscribers on the in-process hub (what one worker carries)
+and measures memory per connection, fan-out latency and slow-consumer coalescing.
+With --url it opens N real SSE connections against a running server instead.
+
+Run from the backend directory:
+    python -m benchmarks.load_realtime --connections 10000
+    python -m benchmarks.load_realtime --url http://localhost:8000 --token TOKEN --connections 10000
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from services.realtime import (
+    ADMIN_REVIEW_CHANNEL,
+    EventHub,
+    department_channel,
+    user_channel,
+)
+
+async def run_in_process(connections: int, departments: int, events: int):
+    hub = EventHub()
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    subscribers = []
+    for i in range(connections):
+        channels = [user_channel(i)]
+        if i % 10 == 0:
+            channels.append(department_channel(i % departments))
+        if i % 100 == 0:
+            channels.append(ADMIN_REVIEW_CHANNEL)
+        subscribers.append(hub.subscribe(channels))
+
+    # Each idle connection parks a task waiting for its next batch, as the SSE stream does
+    waiters = [asyncio.ensure_future(sub.get_batch(timeout=3600)) for sub in subscribers]
+    await asyncio.sleep(0)
+
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    print(f"{connections} idle subscribers: {used / 1024 / 1024:.1f} MiB, "
+          f"{used / connections:.0f} bytes each (hub + parked waiter)")
+
+    # Fan-out cost: events hitting one user, a department and the review queue
+    start = time.perf_counter()
+    for n in range(events):
+        hub.publish(
+            [user_channel(n % connections), department_channel(n % departments), ADMIN_REVIEW_CHANNEL],
+            n,
+            {"type": "status_updated", "issue_id": n},
+        )
+    elapsed = time.perf_counter() - start
+    reach = len(hub._channels.get(ADMIN_REVIEW_CHANNEL, ())) + len(hub._channels.get(department_channel(0), ()))
+    print(f"publish: {elapsed / events * 1e6:.1f} us/event (~{reach} subscribers per event)")
+
+    await asyncio.sleep(0.1)
+    delivered = sum(1 for waiter in waiters if waiter.done())
+    print(f"woken subscribers after publish burst: {delivered}")
+
+    # Slow consumer: never drains while the burst is published
+    slow = hub.subscribe([ADMIN_REVIEW_CHANNEL], max_size=64)
+    for n in range(10 * events):
+        hub.publish([ADMIN_REVIEW_CHANNEL], n % 500, {"type": "voted", "issue_id": n % 500})
+    batch = await slow.get_batch(timeout=0)
+    print(f"slow consumer: buffered {len(batch) - 1} events, resync marker {batch[0]}")
+
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+
+async def run_against_server(url: str, token: str, connections: int, hold: float):
+    import httpx
+
+    established = 0
+    failed = 0
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=None) as client:
+        async def hold_stream():
+            nonlocal established, failed
+            try:
+                async with client.stream("GET", "/api/events/stream", params={"token": token}) as response:
+                    if response.status_code != 200:
+                        failed += 1
+                        return
+                    established += 1
+                    async for _ in response.aiter_raw():
+                        pass
+            except Exception:
+                failed += 1
+
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(hold_stream()) for _ in range(connections)]
+        while established + failed < connections and time.perf_counter() - start < hold:
+            await asyncio.sleep(0.5)
+        print(f"established {established}/{connections} streams in {time.perf_counter() - start:.1f}s, "
+              f"{failed} failed")
+        await asyncio.sleep(max(0.0, hold - (time.perf_counter() - start)))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--departments", type=int, default=5)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--url", help="base URL of a running server")
+    parser.add_argument("--token", help="access token used for every stream")
+    parser.add_argument("--hold", type=float, default=30.0, help="seconds to keep streams open")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_against_server(args.url, args.token, args.connections, args.hold))
+    else:
+        asyncio.run(run_in_process(args.connections, args.departments, args.events))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
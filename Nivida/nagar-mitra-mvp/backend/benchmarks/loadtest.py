@@ -0,0 +1,258 @@
+"""
+In-process load test for the API
+Drives the ASGI app through httpx's ASGI transport (no network, no server process)
+with scripted workload mixes and writes latency percentiles and throughput per
+workload and per endpoint to JSON, tagged with the git commit, so runs can be
+compared with benchmarks.compare.
+Run from the backend directory:
+    python -m benchmarks.datagen --database-url sqlite:///./bench.db
+    python -m benchmarks.loadtest --database-url sqlite:///./bench.db --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+ADMIN_MOBILE = "+919999999999"
+
+class Context:
+    """Tokens and id ranges shared by the request factories"""
+
+    def __init__(self, rng: random.Random, user_tokens: List[str], admin_token: str,
+                 max_issue_id: int, department_ids: List[int], cells: List[str], bench_users: int):
+        self.rng = rng
+        self.user_tokens = user_tokens
+        self.admin_token = admin_token
+        self.max_issue_id = max_issue_id
+        self.department_ids = department_ids
+        self.cells = cells
+        self.bench_users = bench_users
+
+    def user_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.rng.choice(self.user_tokens)}"}
+
+    def admin_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.admin_token}"}
+
+# A request factory returns (endpoint label, method, url, keyword arguments for httpx)
+RequestFactory = Callable[[Context], Tuple[str, str, str, dict]]
+
+def create_issue(ctx: Context):
+    return "POST /api/issues/", "POST", "/api/issues/", {
+        "headers": ctx.user_headers(),
+        "data": {
+            "title": "Water pipe leak near the market",
+            "description": "Pipe leaking on the road, water supply pressure is low",
+            "latitude": str(18.52 + ctx.rng.uniform(-0.1, 0.1)),
+            "longitude": str(73.85 + ctx.rng.uniform(-0.1, 0.1)),
+        },
+    }
+
+def vote(ctx: Context):
+    issue_id = ctx.rng.randint(1, ctx.max_issue_id)
+    return "POST /api/issues/{id}/vote", "POST", f"/api/issues/{issue_id}/vote", {
+        "headers": ctx.user_headers(), "json": {"vote_type": ctx.rng.choice(["up", "up", "down"])},
+    }
+
+def list_recent(ctx: Context):
+    return "GET /api/issues/", "GET", "/api/issues/", {"params": {"sort": "recent", "limit": 20}}
+
+def list_hot_department(ctx: Context):
+    return "GET /api/issues/?sort=hot&department_id", "GET", "/api/issues/", {
+        "params": {"sort": "hot", "department_id": ctx.rng.choice(ctx.department_ids), "limit": 20},
+    }
+
+def list_hot_cell(ctx: Context):
+    return "GET /api/issues/?sort=hot&cell", "GET", "/api/issues/", {
+        "params": {"sort": "hot", "cell": ctx.rng.choice(ctx.cells), "limit": 20},
+    }
+
+def get_issue(ctx: Context):
+    return "GET /api/issues/{id}", "GET", f"/api/issues/{ctx.rng.randint(1, ctx.max_issue_id)}", {}
+
+def my_issues(ctx: Context):
+    return "GET /api/issues/my", "GET", "/api/issues/my", {"headers": ctx.user_headers(), "params": {"limit": 20}}
+
+def dashboard(ctx: Context):
+    return "GET /api/admin/dashboard", "GET", "/api/admin/dashboard", {"headers": ctx.admin_headers()}
+
+def pending_queue(ctx: Context):
+    return "GET /api/admin/issues/pending", "GET", "/api/admin/issues/pending", {"headers": ctx.admin_headers()}
+
+def trends(ctx: Context):
+    return "GET /api/admin/analytics/trends", "GET", "/api/admin/analytics/trends", {"headers": ctx.admin_headers()}
+
+def state_at(ctx: Context):
+    at = datetime.utcnow() - timedelta(days=ctx.rng.randint(0, 180))
+    return "GET /api/admin/analytics/state", "GET", "/api/admin/analytics/state", {
+        "headers": ctx.admin_headers(), "params": {"at": at.isoformat(), "limit": 100},
+    }
+
+def login(ctx: Context):
+    from benchmarks.datagen import BENCH_PASSWORD, bench_mobile
+    mobile = bench_mobile(ctx.rng.randrange(ctx.bench_users))
+    return "POST /api/auth/login/mobile", "POST", "/api/auth/login/mobile", {
+        "params": {"mobile_number": mobile, "password": BENCH_PASSWORD},
+    }
+
+# Weighted request mixes
+WORKLOADS: Dict[str, List[Tuple[int, RequestFactory]]] = {
+    "intake_burst": [(8, create_issue), (2, vote)],
+    "browse": [(3, list_recent), (2, list_hot_department), (2, list_hot_cell), (4, get_issue), (1, my_issues), (2, vote)],
+    "admin_dashboard": [(2, dashboard), (3, pending_queue), (1, trends), (1, state_at)],
+    "login_storm": [(1, login)],
+}
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p * len(sorted_values))) - 1))
+    return round(sorted_values[index] * 1000, 3)
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, object]:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+    }
+
+async def run_workload(client, ctx: Context, mix, concurrency: int, duration: float, max_requests: Optional[int]):
+    factories = [factory for _, factory in mix]
+    weights = [weight for weight, _ in mix]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def user_loop():
+        nonlocal issued
+        while time.perf_counter() < deadline and (max_requests is None or issued < max_requests):
+            issued += 1
+            label, method, url, kwargs = ctx.rng.choices(factories, weights=weights)[0](ctx)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies[label].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[label] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    result = summarize(all_latencies, sum(errors.values()), elapsed)
+    result["duration_seconds"] = round(elapsed, 3)
+    result["endpoints"] = {
+        label: summarize(values, errors[label], elapsed) for label, values in sorted(latencies.items())
+    }
+    return result
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_context(rng: random.Random, token_count: int) -> Context:
+    from sqlalchemy import func
+    from database import SessionLocal
+    from models import Department, Issue, User
+    from utils.auth import create_access_token
+
+    db = SessionLocal()
+    try:
+        mobiles = [row[0] for row in db.query(User.mobile_number).filter(User.is_admin == False).limit(token_count).all()]
+        if not mobiles:
+            raise SystemExit("No users found; run `python -m benchmarks.datagen` first")
+        bench_users = db.query(func.count(User.id)).filter(User.mobile_number.like("+917%")).scalar()
+        cells = [row[0] for row in db.query(Issue.geo_cell).filter(Issue.geo_cell.isnot(None)).limit(2000).all()]
+        return Context(
+            rng=rng,
+            user_tokens=[create_access_token({"sub": mobile}) for mobile in mobiles],
+            admin_token=create_access_token({"sub": ADMIN_MOBILE}),
+            max_issue_id=db.query(func.max(Issue.id)).scalar() or 1,
+            department_ids=[row[0] for row in db.query(Department.id).all()],
+            # Five-character cells: a few neighbourhoods each
+            cells=sorted({cell[:5] for cell in cells}) or ["tek3p"],
+            bench_users=max(bench_users, 1),
+        )
+    finally:
+        db.close()
+
+async def run(args) -> Dict[str, object]:
+    import httpx
+    from main import app
+
+    ctx = build_context(random.Random(args.seed), args.tokens)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.workloads:
+            print(f"Running {name} ({args.concurrency} concurrent, {args.duration}s)...")
+            results[name] = await run_workload(
+                client, ctx, WORKLOADS[name], args.concurrency, args.duration, args.requests
+            )
+            summary = results[name]
+            print(f"  {summary['throughput_rps']} req/s, p50 {summary['p50_ms']}ms, "
+                  f"p95 {summary['p95_ms']}ms, p99 {summary['p99_ms']}ms, {summary['errors']} errors")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per workload")
+    parser.add_argument("--requests", type=int, default=None, help="stop each workload after N requests")
+    parser.add_argument("--tokens", type=int, default=500, help="distinct users issuing requests")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rate-limit", action="store_true", help="keep rate limiting enabled")
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    args = parser.parse_args()
+
+    # Must be set before the application modules are imported
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("BACKGROUND_JOBS_ENABLED", "false")
+    if not args.rate_limit:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    results = asyncio.run(run(args))
+    report = {
+        "git_sha": git_revision(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "database": args.database_url.split("://", 1)[0],
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "seed": args.seed,
+            "rate_limit": args.rate_limit,
+        },
+        "workloads": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+S3-compatible stand-in for trying MEDIA_STORAGE=s3 without an object store
+Serves the subset of the S3 REST API the storage backend uses (PUT/GET/HEAD/DELETE
+object, multipart create/upload part/complete/abort) from a local directory, path
+style, and checks SigV4 signatures of both signed requests and pre-signed URLs
+against one access key. Not for production; MinIO is the real thing.
+Run from the backend directory:
+    python -m benchmarks.s3_standin --port 9000 --dir /tmp/s3
+then start the API with MEDIA_STORAGE=s3 S3_ENDPOINT_URL=http://127.0.0.1:9000
+S3_ACCESS_KEY_ID=standin S3_SECRET_ACCESS_KEY=standin-secret.
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.routing import Route
+
+from services.storage import UNSIGNED_PAYLOAD, sigv4_signature
+
+_AUTH_RE = re.compile(r"Credential=([^/]+)/(\d{8})/([^/]+)/s3/aws4_request, SignedHeaders=([^,]+), Signature=(\w+)")
+
+def _error(status: int, code: str) -> Response:
+    return Response(f"<Error><Code>{code}</Code></Error>", status_code=status, media_type="application/xml")
+
+def create_app(root: str, access_key: str, secret_key: str) -> Starlette:
+    os.makedirs(root, exist_ok=True)
+
+    def object_file(bucket: str, key: str) -> str:
+        return os.path.join(root, bucket, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def authorized(request: Request, body: bytes) -> bool:
+        query = dict(request.query_params)
+        if "X-Amz-Signature" in query:
+            signature = query.pop("X-Amz-Signature")
+            credential = query.get("X-Amz-Credential", "").split("/")
+            amz_date, region = query.get("X-Amz-Date", ""), credential[2] if len(credential) > 2 else ""
+            names = query.get("X-Amz-SignedHeaders", "host").split(";")
+            payload_hash = UNSIGNED_PAYLOAD
+            if credential[0] != access_key:
+                return False
+        else:
+            match = _AUTH_RE.search(request.headers.get("authorization", ""))
+            if not match or match.group(1) != access_key:
+                return False
+            region, names, signature = match.group(3), match.group(4).split(";"), match.group(5)
+            amz_date = request.headers.get("x-amz-date", "")
+            payload_hash = request.headers.get("x-amz-content-sha256", "")
+            if payload_hash != UNSIGNED_PAYLOAD and payload_hash != hashlib.sha256(body).hexdigest():
+                return False
+        headers = {name: request.headers.get(name, "") for name in names}
+        expected, _ = sigv4_signature(
+            secret_key, region, amz_date, request.method, request.url.path, query, headers, payload_hash
+        )
+        return expected == signature
+
+    async def handle(request: Request) -> Response:
+        bucket, key = request.path_params["bucket"], request.path_params["key"]
+        body = await request.body()
+        if not authorized(request, body):
+            return _error(403, "SignatureDoesNotMatch")
+        query = request.query_params
+        path = object_file(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        parts_dir = os.path.join(root, "_multipart", query.get("uploadId", "none"))
+
+        if request.method == "POST" and "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            os.makedirs(os.path.join(root, "_multipart", upload_id))
+            return Response(
+                f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>",
+                media_type="application/xml"
+            )
+        if request.method == "PUT" and "partNumber" in query:
+            if not os.path.isdir(parts_dir):
+                return _error(404, "NoSuchUpload")
+            with open(os.path.join(parts_dir, f"{int(query['partNumber']):05d}"), "wb") as part:
+                part.write(body)
+            return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+        if request.method == "POST" and "uploadId" in query:
+            if not os.path.isdir(parts_dir):
+                return _error(404, "NoSuchUpload")
+            with open(path, "wb") as output:
+                for name in sorted(os.listdir(parts_dir)):
+                    with open(os.path.join(parts_dir, name), "rb") as part:
+                        shutil.copyfileobj(part, output)
+            shutil.rmtree(parts_dir)
+            return Response("<CompleteMultipartUploadResult/>", media_type="application/xml")
+        if request.method == "DELETE" and "uploadId" in query:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            return Response(status_code=204)
+        if request.method == "PUT":
+            with open(path, "wb") as output:
+                output.write(body)
+            return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+        if request.method == "DELETE":
+            if os.path.exists(path):
+                os.remove(path)
+            return Response(status_code=204)
+        if not os.path.exists(path):
+            return _error(404, "NoSuchKey")
+        disposition = query.get("response-content-disposition")
+        return FileResponse(path, headers={"Content-Disposition": disposition} if disposition else None)
+
+    methods = ["GET", "HEAD", "PUT", "POST", "DELETE"]
+    return Starlette(routes=[Route("/{bucket}/{key:path}", handle, methods=methods)])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--dir", default="s3-standin")
+    parser.add_argument("--access-key", default="standin")
+    parser.add_argument("--secret-key", default="standin-secret")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.dir, args.access_key, args.secret_key), host="127.0.0.1", port=args.port)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,14 @@
+"""
+Process-wide configuration bootstrap
+Loads the .env file once; every module that reads settings with os.getenv imports
+this module (directly or through database) before doing so.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+# Trained issue classifier versions and the CURRENT pointer (services.classifier_training)
+CLASSIFIER_MODEL_DIR = os.getenv("CLASSIFIER_MODEL_DIR", "classifier_models")
\ No newline at end of file
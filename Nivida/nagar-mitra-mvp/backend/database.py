@@ -1,10 +1,9 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 import os
 
-load_dotenv()
+import config  # loads .env before settings are read
 
 # For MVP, we'll use SQLite instead of PostgreSQL for easier setup
 # In production, switch to PostgreSQL
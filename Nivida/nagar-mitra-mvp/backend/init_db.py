@@ -4,11 +4,8 @@ Run this to create all database tables and populate with initial data
 """
 from database import engine, SessionLocal
 from models import User, Issue, Department, Worker
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from utils.auth import get_password_hash
 
 def create_tables():
     """Create all database tables"""
@@ -102,7 +99,7 @@ def create_sample_data():
             email="admin@nagarmitra.gov",
             address="Municipal Corporation Office",
             is_admin=True,
-            hashed_password=pwd_context.hash("admin123")
+            hashed_password=get_password_hash("admin123")
         )
         db.add(admin_user)
         
@@ -113,7 +110,7 @@ def create_sample_data():
             email="john@example.com",
             address="123 Main Street, City",
             is_admin=False,
-            hashed_password=pwd_context.hash("citizen123")
+            hashed_password=get_password_hash("citizen123")
         )
         db.add(citizen_user)
         
@@ -128,8 +125,47 @@ def create_sample_data():
     finally:
         db.close()
 
+def backfill_issue_history():
+    """Give issues created before the event log existed a creation event"""
+    from services.issue_events import backfill_issue_events
+    
+    db = SessionLocal()
+    try:
+        count = backfill_issue_events(db)
+        if count:
+            print(f"✅ Backfilled event history for {count} issues")
+    finally:
+        db.close()
+
+def rebuild_map_clusters():
+    """Recompute the precomputed map clusters from the issues"""
+    from services.clusters import rebuild_issue_clusters
+    
+    db = SessionLocal()
+    try:
+        count = rebuild_issue_clusters(db)
+        if count:
+            print(f"✅ Map clusters rebuilt from {count} located issues")
+    finally:
+        db.close()
+
+def backfill_photo_hashes():
+    """Give photos uploaded before duplicate detection existed a perceptual hash"""
+    from services.media import backfill_photo_hashes as backfill
+    
+    db = SessionLocal()
+    try:
+        count = backfill(db)
+        if count:
+            print(f"✅ Hashed {count} existing photos for duplicate detection")
+    finally:
+        db.close()
+
 if __name__ == "__main__":
     print("🚀 Initializing Nagar Mitra Database...")
     create_tables()
     create_sample_data()
+    backfill_issue_history()
+    rebuild_map_clusters()
+    backfill_photo_hashes()
     print("🎉 Database initialization complete!")
\ No newline at end of file
@@ -1,60 +1,138 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Import routers (will be created)
-from routers import auth, users, issues, admin
-
-app = FastAPI(
-    title="Nagar Mitra API",
-    description="Civic Issue Reporting and Resolution Platform",
-    version="1.0.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc"
-)
-
-# CORS middleware for frontend communication
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],  # React dev server
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Create uploads directory if it doesn't exist
-os.makedirs("uploads", exist_ok=True)
-
-# Mount static files for media uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-
-# Include routers
-app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(users.router, prefix="/api/users", tags=["Users"])
-app.include_router(issues.router, prefix="/api/issues", tags=["Issues"])
-app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
-
-@app.get("/")
-async def root():
-    return {
-        "message": "Welcome to Nagar Mitra API",
-        "version": "1.0.0",
-        "docs": "/api/docs"
-    }
-
-@app.get("/api/health")
-async def health_check():
-    return {"status": "healthy", "service": "Nagar Mitra API"}
+
+# Load environment variables (once, for every module)
+import config
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+@asynccontextmanager
+async def lifespan(app: "FastAPI"):
+    """Startup and shutdown work that should not happen at import time"""
+    from services.image_ingest import shutdown_pool
+    from services.scheduler import start_background_jobs, stop_background_jobs
+    from services.storage import close_storage
+
+    # Create uploads directory if it doesn't exist
+    os.makedirs(config.UPLOAD_DIR, exist_ok=True)
+    start_background_jobs()
+    yield
+    await stop_background_jobs()
+    shutdown_pool()
+    await close_storage()
+
+def create_app() -> "FastAPI":
+    """Build the application; routers and services are imported here, not at module import"""
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.staticfiles import StaticFiles
+    from routers import auth, users, issues, uploads, admin, events, metrics
+    from middleware.metrics import MetricsMiddleware
+    from middleware.rate_limit import RateLimitMiddleware
+    from database import engine
+    from utils.metrics import install_query_hooks
+    from services.scheduler import register_job
+    from services.prioritization import SWEEP_INTERVAL_SECONDS, run_priority_sweep
+    from services.ranking import HOT_REFRESH_INTERVAL_SECONDS, run_hot_refresh
+    from services.archive import ARCHIVE_INTERVAL_SECONDS, run_archive
+    from services.partitions import PARTITION_INTERVAL_SECONDS, run_ensure_partitions
+    from services.classifier_training import CLASSIFIER_TRAIN_INTERVAL_SECONDS, run_classifier_training
+    from services.uploads import UPLOAD_GC_INTERVAL_SECONDS, run_upload_gc
+    from services.purge import PURGE_INTERVAL_SECONDS, run_purge
+    from services.media_reconcile import RECONCILE_INTERVAL_SECONDS, run_media_reconcile
+    from services.hotspots import HOTSPOT_INTERVAL_SECONDS, run_hotspot_detection
+
+    app = FastAPI(
+        title="Nagar Mitra API",
+        description="Civic Issue Reporting and Resolution Platform",
+        version="1.0.0",
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        lifespan=lifespan
+    )
+
+    # Per-client rate limits on login, registration, issue creation and voting
+    # (added first so CORS stays outermost and 429 responses carry CORS headers)
+    app.add_middleware(RateLimitMiddleware)
+
+    # Request latency, status and per-request query metrics (served on /api/metrics)
+    app.add_middleware(MetricsMiddleware)
+    install_query_hooks(engine)
+
+    # CORS middleware for frontend communication
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],  # React dev server
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Resumable upload clients (routers.uploads) and review queue paging read these
+        expose_headers=["Location", "Upload-Offset", "Upload-Length", "Tus-Resumable", "X-Next-Cursor"],
+    )
+
+    # Mount static files for media uploads (the directory is created on startup);
+    # with MEDIA_STORAGE=s3 only media stored before the switch is here
+    app.mount("/uploads", StaticFiles(directory=config.UPLOAD_DIR, check_dir=False), name="uploads")
+
+    # Include routers
+    app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
+    app.include_router(users.router, prefix="/api/users", tags=["Users"])
+    app.include_router(issues.router, prefix="/api/issues", tags=["Issues"])
+    app.include_router(uploads.router, prefix="/api/uploads", tags=["Uploads"])
+    app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+    app.include_router(events.router, prefix="/api/events", tags=["Realtime"])
+    app.include_router(metrics.router, prefix="/api/metrics", tags=["Monitoring"])
+
+    # Background maintenance jobs
+    register_job("priority_sweep", SWEEP_INTERVAL_SECONDS, run_priority_sweep)
+    register_job("hot_refresh", HOT_REFRESH_INTERVAL_SECONDS, run_hot_refresh)
+    register_job("archive", ARCHIVE_INTERVAL_SECONDS, run_archive, initial_delay=60.0)
+    # Monthly partitions ahead of time (PostgreSQL after migration 0002, otherwise a no-op)
+    register_job("partitions", PARTITION_INTERVAL_SECONDS, run_ensure_partitions, initial_delay=1.0)
+    # Retrains the department classifier when admins have labelled more issues
+    register_job("classifier_training", CLASSIFIER_TRAIN_INTERVAL_SECONDS, run_classifier_training, initial_delay=300.0)
+    # Removes resumable uploads that were abandoned or never attached
+    register_job("upload_gc", UPLOAD_GC_INTERVAL_SECONDS, run_upload_gc, initial_delay=120.0)
+    # Removes soft-deleted issues and their media in batches
+    register_job("purge", PURGE_INTERVAL_SECONDS, run_purge, initial_delay=30.0)
+    # Reclaims unreferenced files in the uploads directory and measures usage, within an I/O budget
+    register_job("media_reconcile", RECONCILE_INTERVAL_SECONDS, run_media_reconcile, initial_delay=600.0)
+    # Clusters recent issue locations per department into hotspots (new issues only between daily full runs)
+    register_job("hotspots", HOTSPOT_INTERVAL_SECONDS, run_hotspot_detection, initial_delay=180.0)
+
+    @app.get("/")
+    async def root():
+        return {
+            "message": "Welcome to Nagar Mitra API",
+            "version": "1.0.0",
+            "docs": "/api/docs"
+        }
+
+    @app.get("/api/health")
+    async def health_check():
+        return {"status": "healthy", "service": "Nagar Mitra API"}
+
+    return app
+
+_app = None
+
+def __getattr__(name):
+    # `main.app` (e.g. `uvicorn main:app`) builds the application on first access,
+    # so importing this module stays cheap for tools and tests
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
-        "main:app",
+        "main:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8000,
         reload=True
@@ -0,0 +1,81 @@
+"""
+Request metrics middleware
+Records latency, status and per-request database statistics labelled by the route
+template (not the raw path, to keep label cardinality bounded). Requests slower than
+SLOW_REQUEST_MS are logged together with the SQL they issued.
+"""
+import logging
+import os
+import time
+
+from services.profiler import get_profile_session
+from utils.metrics import (
+    REQUEST_COUNT,
+    REQUEST_DB_TIME,
+    REQUEST_LATENCY,
+    REQUEST_QUERIES,
+    end_request_stats,
+    start_request_stats,
+)
+
+metrics_logger = logging.getLogger("metrics")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# 0 disables the slow request log (and statement capture)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+def route_label(scope) -> str:
+    """Path template of the matched route, filled in by the router during the call"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return "unmatched"
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        event_stream = False
+        async def send_wrapper(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Server-Sent Events connections are long by design; keep them out of the slow log
+                event_stream = (b"content-type", b"text/event-stream; charset=utf-8") in message["headers"]
+            await send(message)
+
+        stats, token = start_request_stats(capture_statements=SLOW_REQUEST_MS > 0)
+        profile = get_profile_session()
+        if profile is not None:
+            profile_task = profile.request_started(scope)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            end_request_stats(token)
+            method = scope["method"]
+            route = route_label(scope)
+            REQUEST_COUNT.inc((method, route, str(status_code)))
+            REQUEST_LATENCY.observe(elapsed, (method, route))
+            REQUEST_QUERIES.observe(stats.queries, (route,))
+            REQUEST_DB_TIME.observe(stats.db_time, (route,))
+            if profile is not None:
+                profile.request_finished(profile_task, route, status_code, elapsed, stats)
+            if SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS and not event_stream:
+                log_slow_request(method, scope["path"], status_code, elapsed, stats)
+
+def log_slow_request(method: str, path: str, status_code: int, elapsed: float, stats):
+    lines = [
+        f"Slow request {method} {path} -> {status_code} in {elapsed * 1000:.0f}ms "
+        f"({stats.queries} queries, {stats.db_time * 1000:.0f}ms in database)"
+    ]
+    for duration, statement in stats.statements or ():
+        lines.append(f"  {duration * 1000:8.2f}ms  {' '.join(statement.split())}")
+    metrics_logger.warning("\n".join(lines))
\ No newline at end of file
@@ -0,0 +1,274 @@
+"""
+Per-client rate limiting for abuse-prone endpoints
+A pure ASGI middleware matches each request against a small rule table and charges
+one token from every matching bucket, keyed by rule and client (user id from the
+access token when present, otherwise the client IP). Routes without a rule pass
+straight through after one dict lookup.
+Two backends: an in-memory token bucket for a single process, and a sliding-window
+counter on a shared key-value store (Redis when REDIS_URL is set, otherwise a local
+stand-in with the same incr/expire semantics) for several processes.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from utils.auth import decode_access_token
+from utils.metrics import Counter, register
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis is optional; the local stand-in is used instead
+    redis_asyncio = None
+
+rate_limit_logger = logging.getLogger("rate_limit")
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | shared
+REDIS_URL = os.getenv("REDIS_URL")
+# Only trust X-Forwarded-For behind a reverse proxy that sets it
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+
+RATE_LIMITED = register(Counter("rate_limited_requests_total", "Requests rejected by a rate limit rule", ("rule",)))
+
+class RateLimitRule:
+    """`limit` requests per `period` seconds on one route, per user or per IP"""
+
+    __slots__ = ("name", "method", "path", "pattern", "limit", "period", "key")
+
+    def __init__(self, name: str, method: str, path: str, limit: int, period: float, key: str = "user"):
+        if key not in ("user", "ip"):
+            raise ValueError("key must be 'user' or 'ip'")
+        self.name = name
+        self.method = method
+        # Paths containing a regex group are matched by pattern, others exactly
+        self.pattern: Optional[Pattern] = re.compile(f"^{path}$") if "(" in path or "\\" in path else None
+        self.path = path
+        self.limit = limit
+        self.period = period
+        self.key = key
+
+DEFAULT_RULES = [
+    # Both login forms run bcrypt and share one budget
+    RateLimitRule("login", "POST", "/api/auth/login(/mobile)?", limit=10, period=60, key="ip"),
+    RateLimitRule("register", "POST", "/api/auth/register", limit=5, period=3600, key="ip"),
+    RateLimitRule("issue_create", "POST", "/api/issues/", limit=10, period=600, key="user"),
+    RateLimitRule("issue_create_ip", "POST", "/api/issues/", limit=60, period=600, key="ip"),
+    RateLimitRule("vote", "POST", r"/api/issues/(\d+)/vote", limit=30, period=60, key="user"),
+    # Only session creation: chunks and offset checks are how clients recover, and must not be refused
+    RateLimitRule("upload_create", "POST", "/api/uploads/", limit=30, period=600, key="user"),
+]
+
+class MemoryRateLimitBackend:
+    """Token buckets in an LRU-ordered dict; only valid within one process"""
+
+    MAX_KEYS = 100000
+
+    def __init__(self):
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, period: float, now: float) -> float:
+        """Take one token; returns 0 when allowed, else seconds until a token is available"""
+        rate = limit / period
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            # Evict the least recently used bucket: O(1) even when keys rotate constantly
+            if len(self._buckets) >= self.MAX_KEYS:
+                self._buckets.popitem(last=False)
+            self._buckets[key] = [limit - 1.0, now, period]
+            return 0.0
+        self._buckets.move_to_end(key)
+        tokens = min(limit, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / rate
+
+class LocalKeyValueStore:
+    """In-process stand-in for a shared store, with Redis INCR/EXPIRE semantics"""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    async def incr(self, key: str, ttl: float) -> int:
+        """Increment a counter, setting its expiry when it is created"""
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._values.get(key, (0, 0.0))
+            if expires <= now:
+                value, expires = 0, now + ttl
+            value += 1
+            self._values[key] = (value, expires)
+            if value == 1 and len(self._values) > 100000:
+                self._values = {k: v for k, v in self._values.items() if v[1] > now}
+            return value
+
+    async def get(self, key: str) -> int:
+        entry = self._values.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return 0
+        return entry[0]
+
+class RedisKeyValueStore:
+    """Shared counters in Redis so every API process sees the same limits"""
+
+    def __init__(self, url: str):
+        self._client = redis_asyncio.from_url(url)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, int(math.ceil(ttl)), nx=True)
+            value, _ = await pipe.execute()
+        return value
+
+    async def get(self, key: str) -> int:
+        value = await self._client.get(key)
+        return int(value) if value is not None else 0
+
+class SharedRateLimitBackend:
+    """Sliding-window counter (current window plus a weighted previous window)"""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def hit(self, key: str, limit: int, period: float, now: float) -> float:
+        window = int(now // period)
+        elapsed = now - window * period
+        count = await self.store.incr(f"rl:{key}:{window}", period * 2)
+        previous = await self.store.get(f"rl:{key}:{window - 1}")
+        weight = 1.0 - elapsed / period
+        if previous * weight + count <= limit:
+            return 0.0
+        if count > limit or previous == 0:
+            return period - elapsed
+        # Wait until the previous window's share has decayed enough
+        needed = 1.0 - (limit - count) / previous
+        return max(needed * period - elapsed, 0.001)
+
+_token_subjects: Dict[str, Tuple[Optional[str], float]] = {}
+TOKEN_CACHE_SIZE = 10000
+
+def token_subject(token: str, now: float) -> Optional[str]:
+    """Verified `sub` claim of an access token; cached so each token is decoded once"""
+    cached = _token_subjects.get(token)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    payload = decode_access_token(token)
+    if payload is not None:
+        subject, expires = payload.get("sub"), float(payload.get("exp", now + 60))
+    else:
+        # Remember bad tokens briefly too, so garbage tokens do not cost a decode each
+        subject, expires = None, now + 60
+    if len(_token_subjects) >= TOKEN_CACHE_SIZE:
+        _token_subjects.clear()
+    _token_subjects[token] = (subject, expires)
+    return subject
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.split(b",", 1)[0].strip().decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            if value[:7].lower() == b"bearer ":
+                return value[7:].decode("latin-1")
+            return None
+    return None
+
+class RateLimitMiddleware:
+    def __init__(self, app, rules: Optional[List[RateLimitRule]] = None, backend=None):
+        self.app = app
+        self.backend = backend or get_rate_limit_backend()
+        self.exact: Dict[Tuple[str, str], List[RateLimitRule]] = {}
+        self.patterned: Dict[str, List[RateLimitRule]] = {}
+        for rule in rules if rules is not None else DEFAULT_RULES:
+            if rule.pattern is None:
+                self.exact.setdefault((rule.method, rule.path), []).append(rule)
+            else:
+                self.patterned.setdefault(rule.method, []).append(rule)
+
+    def _match(self, method: str, path: str) -> Optional[List[RateLimitRule]]:
+        rules = self.exact.get((method, path))
+        patterned = self.patterned.get(method)
+        if patterned:
+            matched = [rule for rule in patterned if rule.pattern.match(path)]
+            if matched:
+                return (rules or []) + matched
+        return rules
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        rules = self._match(scope["method"], scope["path"])
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        now = time.time()
+        ip = client_ip(scope)
+        user_key = None
+        retry_after = 0.0
+        for rule in rules:
+            if rule.key == "user":
+                if user_key is None:
+                    token = _bearer_token(scope)
+                    subject = token_subject(token, now) if token else None
+                    user_key = f"user:{subject}" if subject else f"ip:{ip}"
+                key = f"{rule.name}:{user_key}"
+            else:
+                key = f"{rule.name}:ip:{ip}"
+            wait = await self.backend.hit(key, rule.limit, rule.period, now)
+            if wait > 0:
+                RATE_LIMITED.inc((rule.name,))
+                retry_after = max(retry_after, wait)
+
+        if retry_after > 0:
+            rate_limit_logger.warning(f"Rate limited {scope['method']} {scope['path']} from {ip}")
+            await _too_many_requests(send, retry_after)
+            return
+        await self.app(scope, receive, send)
+
+async def _too_many_requests(send, retry_after: float):
+    body = json.dumps({"detail": "Too many requests, please try again later"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+_backend = None
+
+def get_rate_limit_backend():
+    """Backend selected by RATE_LIMIT_BACKEND; the shared one uses Redis when configured"""
+    global _backend
+    if _backend is None:
+        if RATE_LIMIT_BACKEND == "shared":
+            if REDIS_URL and redis_asyncio is not None:
+                _backend = SharedRateLimitBackend(RedisKeyValueStore(REDIS_URL))
+            else:
+                if REDIS_URL:
+                    rate_limit_logger.warning("REDIS_URL set but redis is not installed; using local store")
+                _backend = SharedRateLimitBackend(LocalKeyValueStore())
+        else:
+            _backend = MemoryRateLimitBackend()
+    return _backend
\ No newline at end of file
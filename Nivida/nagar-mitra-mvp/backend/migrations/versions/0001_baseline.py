@@ -0,0 +1,116 @@
+"""Baseline: the schema init_db.py created before migrations existed
+
+Databases created by that init_db.py are already at this revision; mark them with
+`alembic stamp 0001_baseline` before running `alembic upgrade head`. The tables are
+spelled out here rather than taken from the models, which keep changing.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Enum columns store the member names (models.issue.IssueStatus, IssuePriority)
+ISSUE_STATUS = sa.Enum("PENDING", "ASSIGNED", "IN_PROGRESS", "RESOLVED", "REJECTED", name="issuestatus")
+ISSUE_PRIORITY = sa.Enum("LOW", "MEDIUM", "HIGH", "CRITICAL", name="issuepriority")
+
+
+def _timestamps():
+    return (
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "departments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False, unique=True),
+        sa.Column("description", sa.Text()),
+        sa.Column("keywords", sa.Text()),
+        sa.Column("contact_email", sa.String(255)),
+        sa.Column("contact_phone", sa.String(15)),
+        sa.Column("is_active", sa.Boolean()),
+        *_timestamps(),
+    )
+    op.create_index("ix_departments_id", "departments", ["id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("mobile_number", sa.String(15), nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("email", sa.String(255)),
+        sa.Column("address", sa.Text()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("is_admin", sa.Boolean()),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        *_timestamps(),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_mobile_number", "users", ["mobile_number"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "workers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("employee_id", sa.String(50), nullable=False, unique=True),
+        sa.Column("mobile_number", sa.String(15), nullable=False),
+        sa.Column("email", sa.String(255)),
+        sa.Column("department_id", sa.Integer(), sa.ForeignKey("departments.id"), nullable=False),
+        sa.Column("specialization", sa.String(100)),
+        sa.Column("is_available", sa.Boolean()),
+        sa.Column("is_active", sa.Boolean()),
+        *_timestamps(),
+    )
+    op.create_index("ix_workers_id", "workers", ["id"])
+
+    op.create_table(
+        "issues",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("category", sa.String(50), nullable=False),
+        sa.Column("status", ISSUE_STATUS),
+        sa.Column("priority", ISSUE_PRIORITY),
+        sa.Column("latitude", sa.Float()),
+        sa.Column("longitude", sa.Float()),
+        sa.Column("address", sa.Text()),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("department_id", sa.Integer(), sa.ForeignKey("departments.id")),
+        sa.Column("worker_id", sa.Integer(), sa.ForeignKey("workers.id")),
+        sa.Column("ai_confidence", sa.Float()),
+        sa.Column("needs_manual_review", sa.Boolean()),
+        sa.Column("upvotes", sa.Integer()),
+        sa.Column("downvotes", sa.Integer()),
+        *_timestamps(),
+        sa.Column("resolved_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_issues_id", "issues", ["id"])
+
+    op.create_table(
+        "issue_media",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("issue_id", sa.Integer(), sa.ForeignKey("issues.id"), nullable=False),
+        sa.Column("file_path", sa.String(500), nullable=False),
+        sa.Column("file_type", sa.String(50), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("original_filename", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_issue_media_id", "issue_media", ["id"])
+
+
+def downgrade() -> None:
+    raise RuntimeError("The baseline cannot be downgraded; drop the database instead")
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""Urgency score and SLA deadline on issues
+
+The columns with defaults are added with constant server defaults, which PostgreSQL
+applies to existing rows without rewriting the table; the priority sweep
+(services.prioritization) then scores the open issues. Indexes are built
+concurrently on PostgreSQL.
+
+Revision ID: 0002_issue_urgency
+Revises: 0001_baseline
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_issue_urgency"
+down_revision: Union[str, None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_issues_urgency_score", ["urgency_score"]),
+    ("ix_issues_sla_due_at", ["sla_due_at"]),
+    # Admin review queue: top-K by urgency among pending manual-review issues (unscored ones rank as 0)
+    ("ix_issues_review_queue", ["needs_manual_review", "status", sa.text("coalesce(urgency_score, 0)"), "id"]),
+)
+
+
+def upgrade() -> None:
+    op.add_column("issues", sa.Column("urgency_score", sa.Float(), server_default="0"))
+    op.add_column("issues", sa.Column("nearby_count", sa.Integer(), server_default="0"))
+    op.add_column("issues", sa.Column("sla_due_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("issues", sa.Column("sla_breached", sa.Boolean(), server_default=sa.false()))
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.create_index(name, "issues", columns, postgresql_concurrently=True)
+    else:
+        for name, columns in INDEXES:
+            op.create_index(name, "issues", columns)
+
+
+def downgrade() -> None:
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="issues")
+    with op.batch_alter_table("issues") as batch:
+        for column in ("sla_breached", "sla_due_at", "nearby_count", "urgency_score"):
+            batch.drop_column(column)
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""Hot score and geohash cell on issues
+
+Existing issues start with a hot score of 0; the hot refresh job (services.ranking)
+scores the recent ones. Issues reported before this revision have no geo_cell and
+are not in per-area listings. Indexes are built concurrently on PostgreSQL.
+
+Revision ID: 0003_hot_ranking
+Revises: 0002_issue_urgency
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_hot_ranking"
+down_revision: Union[str, None] = "0002_issue_urgency"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_issues_hot_score", ["hot_score"]),
+    # Hot listings per department and per area
+    ("ix_issues_department_hot", ["department_id", "hot_score"]),
+    ("ix_issues_geo_cell_hot", ["geo_cell", "hot_score"]),
+)
+
+
+def upgrade() -> None:
+    op.add_column("issues", sa.Column("hot_score", sa.Float(), server_default="0"))
+    op.add_column("issues", sa.Column("geo_cell", sa.String(12), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.create_index(name, "issues", columns, postgresql_concurrently=True)
+    else:
+        for name, columns in INDEXES:
+            op.create_index(name, "issues", columns)
+
+
+def downgrade() -> None:
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="issues")
+    with op.batch_alter_table("issues") as batch:
+        batch.drop_column("geo_cell")
+        batch.drop_column("hot_score")
+    _restore_review_queue_index()
+
+
+def _restore_review_queue_index():
+    # SQLite rebuilds the table for batch column drops and cannot reflect expression
+    # indexes, so the review queue index from 0002 is lost with the old table
+    op.create_index(
+        "ix_issues_review_queue", "issues",
+        ["needs_manual_review", "status", sa.text("coalesce(urgency_score, 0)"), "id"],
+        if_not_exists=True
+    )
\ No newline at end of file
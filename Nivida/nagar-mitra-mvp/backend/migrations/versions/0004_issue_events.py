@@ -0,0 +1,42 @@
+"""Append-only issue event log
+
+The log starts empty; init_db.py gives existing issues a creation event
+(services.issue_events.backfill_issue_events).
+
+Revision ID: 0004_issue_events
+Revises: 0003_hot_ranking
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_issue_events"
+down_revision: Union[str, None] = "0003_hot_ranking"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "issue_events",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True),
+        sa.Column("issue_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.SmallInteger(), nullable=False),
+        sa.Column("ts", sa.Integer(), nullable=False),
+        sa.Column("actor_id", sa.Integer(), nullable=True),
+        sa.Column("status", sa.SmallInteger(), nullable=True),
+        sa.Column("priority", sa.SmallInteger(), nullable=True),
+        sa.Column("department_id", sa.Integer(), nullable=True),
+        sa.Column("worker_id", sa.Integer(), nullable=True),
+        sa.Column("value", sa.SmallInteger(), nullable=True),
+    )
+    op.create_index("ix_issue_events_issue_seq", "issue_events", ["issue_id", "seq"], unique=True)
+    op.create_index("ix_issue_events_ts", "issue_events", ["ts"])
+
+
+def downgrade() -> None:
+    op.drop_table("issue_events")
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""Archive tables for closed issues and their media
+
+Copies of the issues and issue_media columns as of this revision, without defaults,
+foreign keys or hot-path indexes, plus archived_at (models.archive). Later revisions
+that add a column to a hot table add it to its archive table too.
+
+Revision ID: 0005_issue_archive
+Revises: 0004_issue_events
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_issue_archive"
+down_revision: Union[str, None] = "0004_issue_events"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _enum(name: str, *values: str):
+    """An enum type the baseline already created (PostgreSQL must not create it again)"""
+    return sa.Enum(*values, name=name).with_variant(postgresql.ENUM(*values, name=name, create_type=False), "postgresql")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "issues_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("category", sa.String(50), nullable=False),
+        sa.Column("status", _enum("issuestatus", "PENDING", "ASSIGNED", "IN_PROGRESS", "RESOLVED", "REJECTED")),
+        sa.Column("priority", _enum("issuepriority", "LOW", "MEDIUM", "HIGH", "CRITICAL")),
+        sa.Column("latitude", sa.Float()),
+        sa.Column("longitude", sa.Float()),
+        sa.Column("address", sa.Text()),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("department_id", sa.Integer()),
+        sa.Column("worker_id", sa.Integer()),
+        sa.Column("ai_confidence", sa.Float()),
+        sa.Column("needs_manual_review", sa.Boolean()),
+        sa.Column("upvotes", sa.Integer()),
+        sa.Column("downvotes", sa.Integer()),
+        sa.Column("urgency_score", sa.Float()),
+        sa.Column("nearby_count", sa.Integer()),
+        sa.Column("sla_due_at", sa.DateTime(timezone=True)),
+        sa.Column("sla_breached", sa.Boolean()),
+        sa.Column("hot_score", sa.Float()),
+        sa.Column("geo_cell", sa.String(12)),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("resolved_at", sa.DateTime(timezone=True)),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_issues_archive_user_id", "issues_archive", ["user_id"])
+    op.create_index("ix_issues_archive_department_id", "issues_archive", ["department_id"])
+
+    op.create_table(
+        "issue_media_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("issue_id", sa.Integer(), nullable=False),
+        sa.Column("file_path", sa.String(500), nullable=False),
+        sa.Column("file_type", sa.String(50), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("original_filename", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_issue_media_archive_issue_id", "issue_media_archive", ["issue_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("issue_media_archive")
+    op.drop_table("issues_archive")
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""Partition issues and issue_media by created_at month (PostgreSQL)
+
+The conversion is online: the existing table is not copied but attached as the
+`<table>_legacy` partition for everything before the cutover month, and new rows go
+to monthly `<table>_pYYYYMM` partitions (kept ahead by services.partitions). The slow
+steps (constraint validation, building the (id, created_at) unique index) do not block
+writes; the swap itself only touches the catalog under a short ACCESS EXCLUSIVE lock.
+
+After the conversion:
+- primary keys are (id, created_at), as PostgreSQL requires the partition key in them;
+- issue_media.issue_id has no foreign key (it would need a unique index on issues.id);
+- foreign keys from issues to users, departments and workers remain on the legacy
+  partition only, since adding them to the partitioned parent validates every row
+  under lock; the API creates issues only for existing users and departments.
+
+Other databases only get the new index on issue_media.issue_id.
+
+Revision ID: 0006_partition_issues
+Revises: 0005_issue_archive
+Create Date: 2026-10-19 00:00:00
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_partition_issues"
+down_revision: Union[str, None] = "0005_issue_archive"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MEDIA_ISSUE_INDEX = "ix_issue_media_issue_id"
+
+
+def _is_partitioned(table: str) -> bool:
+    from services.partitions import partitioned_tables
+
+    return table in partitioned_tables(op.get_bind())
+
+
+def _prepare(table: str, cutover: str):
+    """Non-blocking preparation of the table that becomes the legacy partition"""
+    bind = op.get_bind()
+    bind.execute(sa.text(f"UPDATE {table} SET created_at = now() WHERE created_at IS NULL"))
+    with op.get_context().autocommit_block():
+        # A validated CHECK lets SET NOT NULL and ATTACH PARTITION skip their table scans
+        bind.execute(sa.text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {table}_created_at_not_null "
+            f"CHECK (created_at IS NOT NULL) NOT VALID"
+        ))
+        bind.execute(sa.text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_created_at_not_null"))
+        bind.execute(sa.text(f"ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL"))
+        bind.execute(sa.text(f"ALTER TABLE {table} DROP CONSTRAINT {table}_created_at_not_null"))
+        bind.execute(sa.text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {table}_legacy_bound "
+            f"CHECK (created_at < '{cutover}') NOT VALID"
+        ))
+        bind.execute(sa.text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_legacy_bound"))
+        bind.execute(sa.text(
+            f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {table}_legacy_id_created_at "
+            f"ON {table} (id, created_at)"
+        ))
+
+
+def _swap(table: str, cutover: str):
+    """Catalog-only swap: rename, create the partitioned parent, attach the old table"""
+    bind = op.get_bind()
+    legacy = f"{table}_legacy"
+    indexes = [
+        index for index in sa.inspect(bind).get_indexes(table)
+        if not index["unique"] and index["name"] != f"{table}_legacy_id_created_at"
+    ]
+    sequence = bind.execute(sa.text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+
+    # Fail fast instead of queueing every other query behind the lock
+    bind.execute(sa.text("SET LOCAL lock_timeout = '10s'"))
+    bind.execute(sa.text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+    bind.execute(sa.text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    bind.execute(sa.text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey"))
+    for index in indexes:
+        bind.execute(sa.text(f"ALTER INDEX {index['name']} RENAME TO {index['name']}_legacy"))
+    bind.execute(sa.text(
+        f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_id_created_at_key "
+        f"UNIQUE USING INDEX {table}_legacy_id_created_at"
+    ))
+
+    bind.execute(sa.text(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"))
+    bind.execute(sa.text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)"))
+    # No scan: the validated legacy_bound check already proves the range
+    bind.execute(sa.text(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{cutover}')"))
+    bind.execute(sa.text(f"ALTER TABLE {legacy} DROP CONSTRAINT {table}_legacy_bound"))
+    if sequence:
+        bind.execute(sa.text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    # Parent indexes adopt the renamed legacy indexes instead of rebuilding them
+    for index in indexes:
+        columns = ", ".join(index.get("expressions") or index["column_names"])
+        bind.execute(sa.text(f"CREATE INDEX {index['name']} ON {table} ({columns})"))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index(MEDIA_ISSUE_INDEX, "issue_media", ["issue_id"])
+        return
+
+    from services.partitions import PARTITION_MONTHS_AHEAD, add_months, create_month_partitions, month_start
+
+    # Media of an issue is looked up by issue_id in every partition
+    with op.get_context().autocommit_block():
+        bind.execute(sa.text(f"CREATE INDEX CONCURRENTLY {MEDIA_ISSUE_INDEX} ON issue_media (issue_id)"))
+
+    # Everything created before next month stays in the legacy partition
+    first_month = add_months(month_start(datetime.utcnow().date()), 1)
+    cutover = f"{first_month.isoformat()} 00:00:00+00"
+
+    for foreign_key in sa.inspect(bind).get_foreign_keys("issue_media"):
+        if foreign_key["referred_table"] == "issues":
+            op.drop_constraint(foreign_key["name"], "issue_media", type_="foreignkey")
+
+    for table in ("issues", "issue_media"):
+        if _is_partitioned(table):
+            continue
+        _prepare(table, cutover)
+        _swap(table, cutover)
+        create_month_partitions(bind, table, first_month, add_months(first_month, PARTITION_MONTHS_AHEAD + 1))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        raise RuntimeError(
+            "Partitioned tables cannot be converted back in place; restore a pre-upgrade backup instead"
+        )
+    op.drop_index(MEDIA_ISSUE_INDEX, table_name="issue_media")
\ No newline at end of file
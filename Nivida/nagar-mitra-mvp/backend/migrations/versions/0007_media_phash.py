@@ -0,0 +1,38 @@
+"""Perceptual hash and duplicate link on issue media
+
+Nullable columns without defaults: adding them only changes the catalog, and
+existing photos are hashed afterwards by init_db's backfill (services.media).
+
+Revision ID: 0007_media_phash
+Revises: 0006_partition_issues
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_media_phash"
+down_revision: Union[str, None] = "0006_partition_issues"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("issue_media", "issue_media_archive")
+COLUMNS = (
+    ("phash", sa.BigInteger()),
+    ("duplicate_of_issue_id", sa.Integer()),
+)
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        for name, column_type in COLUMNS:
+            op.add_column(table, sa.Column(name, column_type, nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            for name, _ in COLUMNS:
+                batch.drop_column(name)
\ No newline at end of file
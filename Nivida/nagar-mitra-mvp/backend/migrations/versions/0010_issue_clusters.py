@@ -0,0 +1,34 @@
+"""Precomputed map clusters
+
+Revision ID: 0010_issue_clusters
+Revises: 0009_soft_delete
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_issue_clusters"
+down_revision: Union[str, None] = "0009_soft_delete"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The table starts empty: init_db.py fills it from the existing issues
+    op.create_table(
+        "issue_clusters",
+        sa.Column("zoom", sa.SmallInteger(), primary_key=True, autoincrement=False),
+        sa.Column("cell_x", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("cell_y", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("status", sa.SmallInteger(), primary_key=True, autoincrement=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("lat_sum", sa.Float(), nullable=False),
+        sa.Column("lon_sum", sa.Float(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("issue_clusters")
\ No newline at end of file
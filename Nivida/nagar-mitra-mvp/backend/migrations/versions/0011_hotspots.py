@@ -0,0 +1,42 @@
+"""Issue hotspots
+
+Revision ID: 0011_hotspots
+Revises: 0010_issue_clusters
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0011_hotspots"
+down_revision: Union[str, None] = "0010_issue_clusters"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "hotspots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("department_id", sa.Integer(), sa.ForeignKey("departments.id"), nullable=True),
+        sa.Column("issue_count", sa.Integer(), nullable=False),
+        sa.Column("open_count", sa.Integer(), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.Column("radius_m", sa.Float(), nullable=False),
+        sa.Column("min_latitude", sa.Float(), nullable=False),
+        sa.Column("max_latitude", sa.Float(), nullable=False),
+        sa.Column("min_longitude", sa.Float(), nullable=False),
+        sa.Column("max_longitude", sa.Float(), nullable=False),
+        sa.Column("first_reported_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_reported_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("computed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_hotspots_id", "hotspots", ["id"])
+    op.create_index("ix_hotspots_department_count", "hotspots", ["department_id", "issue_count"])
+
+
+def downgrade() -> None:
+    op.drop_table("hotspots")
\ No newline at end of file
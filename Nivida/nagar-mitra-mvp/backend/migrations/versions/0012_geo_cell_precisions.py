@@ -0,0 +1,55 @@
+"""Geohash cell prefixes on issues for per-area hot listings
+
+Cells of 4 and 5 characters get their own columns and (cell, hot_score) indexes, so
+a listing of any supported precision is an equality lookup read in hot order instead
+of a range scan sorted per request. Existing rows are filled from geo_cell.
+
+Revision ID: 0012_geo_cell_precisions
+Revises: 0011_hotspots
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0012_geo_cell_precisions"
+down_revision: Union[str, None] = "0011_hotspots"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("issues", "issues_archive")
+PRECISIONS = (4, 5)
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        for precision in PRECISIONS:
+            op.add_column(table, sa.Column(f"geo_cell_{precision}", sa.String(precision), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET geo_cell_4 = substr(geo_cell, 1, 4), geo_cell_5 = substr(geo_cell, 1, 5) "
+            "WHERE geo_cell IS NOT NULL"
+        )
+    for precision in PRECISIONS:
+        op.create_index(f"ix_issues_geo_cell_{precision}_hot", "issues", [f"geo_cell_{precision}", "hot_score"])
+
+
+def downgrade() -> None:
+    for precision in PRECISIONS:
+        op.drop_index(f"ix_issues_geo_cell_{precision}_hot", table_name="issues")
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            for precision in PRECISIONS:
+                batch.drop_column(f"geo_cell_{precision}")
+    _restore_review_queue_index()
+
+
+def _restore_review_queue_index():
+    # SQLite rebuilds the table for batch column drops and cannot reflect expression
+    # indexes, so the review queue index from 0002 is lost with the old table
+    op.create_index(
+        "ix_issues_review_queue", "issues",
+        ["needs_manual_review", "status", sa.text("coalesce(urgency_score, 0)"), "id"],
+        if_not_exists=True
+    )
\ No newline at end of file
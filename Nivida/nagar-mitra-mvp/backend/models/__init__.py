@@ -2,5 +2,13 @@ from .user import User
 from .issue import Issue, IssueMedia
 from .department import Department
 from .worker import Worker
+from .issue_event import IssueEvent
+from .archive import issues_archive, issue_media_archive
+from .upload_session import UploadSession
+from .issue_cluster import IssueCluster
+from .hotspot import Hotspot
 
-__all__ = ["User", "Issue", "IssueMedia", "Department", "Worker"]
\ No newline at end of file
+__all__ = [
+    "User", "Issue", "IssueMedia", "Department", "Worker", "IssueEvent", "issues_archive", "issue_media_archive",
+    "UploadSession", "IssueCluster", "Hotspot"
+]
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, Index, Table
+from database import Base
+from models.issue import Issue, IssueMedia
+
+def _archive_table(source: Table, name: str, *indexes: Index) -> Table:
+    """Copy of a hot table's columns, without defaults, foreign keys or hot-path indexes"""
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in source.columns
+    ]
+    return Table(name, Base.metadata, *columns, Column("archived_at", DateTime(timezone=True), nullable=False), *indexes)
+
+# Closed issues moved out of `issues` by services.archive
+issues_archive = _archive_table(
+    Issue.__table__, "issues_archive",
+    Index("ix_issues_archive_user_id", "user_id"),
+    Index("ix_issues_archive_department_id", "department_id"),
+)
+
+issue_media_archive = _archive_table(
+    IssueMedia.__table__, "issue_media_archive",
+    Index("ix_issue_media_archive_issue_id", "issue_id"),
+)
\ No newline at end of file
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer
+from sqlalchemy.sql import func
+from database import Base
+
+class Hotspot(Base):
+    """A dense cluster of recent issue locations in one department (see services.hotspots)"""
+    __tablename__ = "hotspots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
+    issue_count = Column(Integer, nullable=False)
+    open_count = Column(Integer, nullable=False)  # not yet resolved or rejected
+    # Centroid, and distance from it to the farthest issue
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    radius_m = Column(Float, nullable=False)
+    # Bounding box of the issues, used to find the hotspots a new issue can change
+    min_latitude = Column(Float, nullable=False)
+    max_latitude = Column(Float, nullable=False)
+    min_longitude = Column(Float, nullable=False)
+    max_longitude = Column(Float, nullable=False)
+    first_reported_at = Column(DateTime(timezone=True), nullable=False)
+    last_reported_at = Column(DateTime(timezone=True), nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_hotspots_department_count", "department_id", "issue_count"),
+    )
\ No newline at end of file
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Enum, Index, event, text
+from sqlalchemy.orm import Session, relationship, with_loader_criteria
 from sqlalchemy.sql import func
 from database import Base
 import enum
@@ -45,27 +45,70 @@ class Issue(Base):
     upvotes = Column(Integer, default=0)
     downvotes = Column(Integer, default=0)
     
+    # Urgency and SLA (maintained by services.prioritization)
+    urgency_score = Column(Float, default=0.0, index=True)
+    nearby_count = Column(Integer, default=0)  # open reports close by in the same department
+    sla_due_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    sla_breached = Column(Boolean, default=False)
+    
+    # Hot ranking (maintained by services.ranking) and geohash cells for per-area listings
+    # (utils.geo.GEO_CELL_COLUMNS): the full-precision cell and its 4 and 5 character prefixes
+    hot_score = Column(Float, default=0.0, index=True)
+    geo_cell = Column(String(12), nullable=True)
+    geo_cell_4 = Column(String(4), nullable=True)
+    geo_cell_5 = Column(String(5), nullable=True)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     resolved_at = Column(DateTime(timezone=True), nullable=True)
+    # Tombstone: set by delete, the row and its media are removed later by services.purge
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="issues")
     department = relationship("Department", back_populates="issues")
     worker = relationship("Worker", back_populates="issues")
     media = relationship("IssueMedia", back_populates="issue", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Admin review queue: top-K by urgency among pending manual-review issues (unscored ones rank as 0)
+        Index("ix_issues_review_queue", "needs_manual_review", "status", text("coalesce(urgency_score, 0)"), "id"),
+        # Hot listings per department and per area
+        Index("ix_issues_department_hot", "department_id", "hot_score"),
+        Index("ix_issues_geo_cell_hot", "geo_cell", "hot_score"),
+        Index("ix_issues_geo_cell_4_hot", "geo_cell_4", "hot_score"),
+        Index("ix_issues_geo_cell_5_hot", "geo_cell_5", "hot_score"),
+        Index("ix_issues_deleted_at", "deleted_at"),
+    )
 
 class IssueMedia(Base):
     __tablename__ = "issue_media"
 
     id = Column(Integer, primary_key=True, index=True)
-    issue_id = Column(Integer, ForeignKey("issues.id"), nullable=False)
+    issue_id = Column(Integer, ForeignKey("issues.id"), nullable=False, index=True)
     file_path = Column(String(500), nullable=False)
     file_type = Column(String(50), nullable=False)  # image, video, audio
     file_size = Column(Integer, nullable=False)  # in bytes
     original_filename = Column(String(255), nullable=False)
+    # 64-bit perceptual hash of photos (utils.image_hash, stored signed)
+    phash = Column(BigInteger, nullable=True)
+    # Earlier issue that already has a near-identical photo
+    duplicate_of_issue_id = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    issue = relationship("Issue", back_populates="media")
\ No newline at end of file
+    issue = relationship("Issue", back_populates="media")
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted_issues(execute_state):
+    """Deleted issues are left out of every ORM query unless it sets include_deleted=True"""
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(Issue, Issue.deleted_at.is_(None), include_aliases=True)
+        )
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Float, Integer, SmallInteger
+from database import Base
+
+class IssueCluster(Base):
+    """Issues in one map grid cell with one status, at one zoom level (see services.clusters)"""
+    __tablename__ = "issue_clusters"
+
+    zoom = Column(SmallInteger, primary_key=True, autoincrement=False)
+    cell_x = Column(Integer, primary_key=True, autoincrement=False)  # Web Mercator grid column at this zoom
+    cell_y = Column(Integer, primary_key=True, autoincrement=False)  # grid row, counted from the north
+    status = Column(SmallInteger, primary_key=True, autoincrement=False)  # models.issue_event.STATUS_CODES
+    count = Column(Integer, nullable=False, default=0)
+    # Coordinate sums: the cluster is drawn at sum / count
+    lat_sum = Column(Float, nullable=False, default=0.0)
+    lon_sum = Column(Float, nullable=False, default=0.0)
\ No newline at end of file
@@ -0,0 +1,61 @@
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, Index
+from database import Base
+from models.issue import IssueStatus, IssuePriority
+import enum
+
+class IssueEventType(enum.IntEnum):
+    CREATED = 1
+    STATUS_CHANGED = 2
+    ASSIGNED = 3
+    PRIORITY_CHANGED = 4
+    DEPARTMENT_CHANGED = 5
+    UPDATED = 6
+    VOTED = 7
+    MEDIA_ADDED = 8
+    DELETED = 9
+
+# Small integer codes stored instead of the enum strings (never renumber)
+STATUS_CODES = {
+    IssueStatus.PENDING: 1,
+    IssueStatus.ASSIGNED: 2,
+    IssueStatus.IN_PROGRESS: 3,
+    IssueStatus.RESOLVED: 4,
+    IssueStatus.REJECTED: 5,
+}
+PRIORITY_CODES = {
+    IssuePriority.LOW: 1,
+    IssuePriority.MEDIUM: 2,
+    IssuePriority.HIGH: 3,
+    IssuePriority.CRITICAL: 4,
+}
+# `value` of ASSIGNED events chosen by the assignment engine rather than an admin
+AUTOMATIC_ASSIGNMENT = 1
+
+STATUS_BY_CODE = {code: status for status, code in STATUS_CODES.items()}
+PRIORITY_BY_CODE = {code: priority for priority, code in PRIORITY_CODES.items()}
+
+class IssueEvent(Base):
+    """Append-only issue lifecycle log (see services.issue_events)
+
+    Each row carries the issue's status, priority, department and worker *after*
+    the event, so the state at any time is the latest row at or before it.
+    """
+    __tablename__ = "issue_events"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # No foreign key: the history outlives deleted issues
+    issue_id = Column(Integer, nullable=False)
+    seq = Column(Integer, nullable=False)  # 1, 2, ... per issue
+    event_type = Column(SmallInteger, nullable=False)
+    ts = Column(Integer, nullable=False)  # seconds since services.issue_events.EVENT_EPOCH
+    actor_id = Column(Integer, nullable=True)  # user who caused the event, if any
+    status = Column(SmallInteger, nullable=True)
+    priority = Column(SmallInteger, nullable=True)
+    department_id = Column(Integer, nullable=True)
+    worker_id = Column(Integer, nullable=True)
+    value = Column(SmallInteger, nullable=True)  # vote direction (+1/-1), media count, AUTOMATIC_ASSIGNMENT
+
+    __table_args__ = (
+        Index("ix_issue_events_issue_seq", "issue_id", "seq", unique=True),
+        Index("ix_issue_events_ts", "ts"),
+    )
\ No newline at end of file
@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from database import Base
+
+class UploadSession(Base):
+    """A resumable upload in progress (see services.uploads)"""
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # random hex, the client's handle for the upload
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    length = Column(BigInteger, nullable=False)  # total bytes the client announced
+    received = Column(BigInteger, nullable=False, default=0)  # bytes stored so far, the next chunk's offset
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime, nullable=False, index=True)  # pushed back by every chunk
\ No newline at end of file
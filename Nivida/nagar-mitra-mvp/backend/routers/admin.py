@@ -1,17 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import tempfile
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict, Any
+from sqlalchemy import and_, func, literal_column, or_, select
+from typing import List, Dict, Any, Optional
 
 from database import get_db
 from models.user import User
 from models.issue import Issue, IssueStatus
+from models.issue_event import IssueEventType
 from models.department import Department
 from models.worker import Worker
+from services.archive import get_issue_or_restore, issues_both_tiers
+from services.assignment import auto_assign_issue, auto_assign_pending, get_assignment_engine
+from services.profiler import MAX_PROFILE_SECONDS, run_profile
+from services.classifier_training import get_model_info, train_classifier
+from services.hotspots import hotspot_detector, list_hotspots
+from services.media_reconcile import media_reconciler, recorded_storage_usage
+from services.bulk_issues import import_issues, iter_csv_records, iter_ndjson_records, iter_export
+from services.issue_events import count_by_status_at, get_state_at, record_issue_event
+from services.realtime import publish_issue_event
 from utils.auth import get_current_admin_user
+from utils.serialization import ISSUE_COLUMNS, FastJSONResponse, fetch_issue_dicts
 
 router = APIRouter()
 
+# Uploads larger than this are spooled to disk while being parsed
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+# Larger import bodies are refused, so one request cannot fill the disk
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_MB", "200")) * 1024 * 1024
+
 @router.get("/dashboard")
 async def get_dashboard_stats(
     admin_user: User = Depends(get_current_admin_user),
@@ -19,17 +40,19 @@ async def get_dashboard_stats(
 ) -> Dict[str, Any]:
     """Get dashboard statistics for admin"""
     
-    # Issue statistics
-    total_issues = db.query(Issue).count()
-    pending_issues = db.query(Issue).filter(Issue.status == IssueStatus.PENDING).count()
-    in_progress_issues = db.query(Issue).filter(Issue.status == IssueStatus.IN_PROGRESS).count()
-    resolved_issues = db.query(Issue).filter(Issue.status == IssueStatus.RESOLVED).count()
+    # Issue statistics (hot and archived issues)
+    all_issues = issues_both_tiers("id", "status", "department_id")
+    status_counts = dict(db.query(all_issues.c.status, func.count()).group_by(all_issues.c.status).all())
+    total_issues = sum(status_counts.values())
+    pending_issues = status_counts.get(IssueStatus.PENDING, 0)
+    in_progress_issues = status_counts.get(IssueStatus.IN_PROGRESS, 0)
+    resolved_issues = status_counts.get(IssueStatus.RESOLVED, 0)
     
     # Issues by department
     dept_stats = db.query(
         Department.name,
-        func.count(Issue.id).label('count')
-    ).join(Issue, Department.id == Issue.department_id, isouter=True)\
+        func.count(all_issues.c.id).label('count')
+    ).join(all_issues, Department.id == all_issues.c.department_id, isouter=True)\
      .group_by(Department.id, Department.name).all()
     
     # Recent issues
@@ -66,18 +89,112 @@ async def get_dashboard_stats(
         }
     }
 
-@router.get("/issues/pending")
+# Review queue ordering key, matching ix_issues_review_queue; unscored issues rank as 0
+_review_urgency = func.coalesce(Issue.urgency_score, literal_column("0"))
+
+@router.get("/issues/pending", response_class=FastJSONResponse)
 async def get_pending_issues(
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
     admin_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get all pending issues that need manual review"""
-    issues = db.query(Issue).filter(
+    """Get the pending issues that need manual review, most urgent first
+    
+    Without `limit` the whole queue is returned as a list, as before paging existed.
+    With it the response is `{"issues": [...], "next_cursor": ...}`; pass a non-null
+    `next_cursor` (also sent as the `X-Next-Cursor` header) back as `cursor` for the
+    next page.
+    """
+    filters = [
         Issue.needs_manual_review == True,
         Issue.status == IssueStatus.PENDING
-    ).order_by(Issue.created_at.desc()).all()
+    ]
+    if cursor:
+        try:
+            score, last_id = cursor.split(":")
+            score, last_id = float(score), int(last_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Keyset paging over (urgency_score, id), served by ix_issues_review_queue
+        filters.append(or_(
+            _review_urgency < score,
+            and_(_review_urgency == score, Issue.id < last_id)
+        ))
+    
+    issues = fetch_issue_dicts(
+        db,
+        select(*ISSUE_COLUMNS).where(*filters)
+        .order_by(_review_urgency.desc(), Issue.id.desc())
+        .limit(limit)
+    )
+    
+    if limit is None:
+        return FastJSONResponse(issues)
     
-    return issues
+    next_cursor = None
+    headers = {}
+    if len(issues) == limit:
+        last = issues[-1]
+        next_cursor = headers["X-Next-Cursor"] = f"{last['urgency_score'] or 0.0}:{last['id']}"
+    return FastJSONResponse({"issues": issues, "next_cursor": next_cursor}, headers=headers)
+
+@router.post("/issues/import")
+async def import_issues_bulk(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$"),
+    admin_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk import issues from an NDJSON or CSV request body (413 past IMPORT_MAX_MB)"""
+    too_large = HTTPException(status_code=413, detail=f"Imports are limited to {IMPORT_MAX_BYTES} bytes")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > IMPORT_MAX_BYTES:
+        raise too_large
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "csv" if "csv" in content_type else "ndjson"
+    
+    # Stream the body into a spooled file so memory stays bounded for large dumps
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > IMPORT_MAX_BYTES:
+                # Chunked bodies have no length to check up front
+                raise too_large
+            spool.write(chunk)
+        spool.seek(0)
+        
+        records = iter_csv_records(spool) if fmt == "csv" else iter_ndjson_records(spool)
+        # Parsing, classification and inserts are blocking, keep them off the event loop
+        summary = await run_in_threadpool(import_issues, db, records, admin_user.id)
+    
+    return summary
+
+@router.get("/issues/export")
+async def export_issues(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    status: Optional[IssueStatus] = None,
+    department_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Stream all issues as NDJSON or CSV"""
+    filters = []
+    if status:
+        filters.append(Issue.status == status)
+    if department_id:
+        filters.append(Issue.department_id == department_id)
+    if created_after:
+        filters.append(Issue.created_at >= created_after)
+    
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        iter_export(fmt, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="issues.{fmt}"'}
+    )
 
 @router.post("/issues/{issue_id}/assign/{worker_id}")
 async def assign_issue_to_worker(
@@ -87,8 +204,8 @@ async def assign_issue_to_worker(
     db: Session = Depends(get_db)
 ):
     """Assign an issue to a worker"""
-    # Get issue
-    issue = db.query(Issue).filter(Issue.id == issue_id).first()
+    # Get issue (reopening an archived one)
+    issue = get_issue_or_restore(db, issue_id)
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
     
@@ -97,17 +214,60 @@ async def assign_issue_to_worker(
     if not worker:
         raise HTTPException(status_code=404, detail="Worker not found")
     
+    old_worker_id, old_status = issue.worker_id, issue.status
+    
     # Assign worker and update status
     issue.worker_id = worker_id
     issue.department_id = worker.department_id
     issue.status = IssueStatus.ASSIGNED
     issue.needs_manual_review = False
     
+    record_issue_event(db, issue, IssueEventType.ASSIGNED, admin_user.id)
     db.commit()
     db.refresh(issue)
+    get_assignment_engine(db).on_issue_change(
+        old_worker_id, old_status, issue.worker_id, issue.status, issue.latitude, issue.longitude
+    )
+    publish_issue_event(issue, "assigned")
     
     return {"message": "Issue assigned successfully", "issue": issue}
 
+@router.post("/issues/auto-assign")
+async def auto_assign_pending_issues(
+    limit: Optional[int] = Query(None, ge=1),
+    include_review: bool = False,
+    admin_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Auto-assign the pending queue to the least-loaded matching workers"""
+    # Batched DB work, keep it off the event loop
+    summary = await run_in_threadpool(auto_assign_pending, db, limit, include_review, actor_id=admin_user.id)
+    return summary
+
+@router.post("/issues/{issue_id}/auto-assign")
+async def auto_assign_single_issue(
+    issue_id: int,
+    admin_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Assign an issue to the best available worker in its department"""
+    issue = db.query(Issue).filter(Issue.id == issue_id).first()
+    if not issue:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    if issue.department_id is None:
+        raise HTTPException(status_code=400, detail="Issue has no department, assign it manually")
+    
+    try:
+        worker_id = auto_assign_issue(db, issue, admin_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if worker_id is None:
+        raise HTTPException(status_code=409, detail="No available worker in the issue's department")
+    
+    db.refresh(issue)
+    publish_issue_event(issue, "assigned")
+    return {"message": "Issue assigned successfully", "worker_id": worker_id}
+
 @router.get("/departments")
 async def get_departments(
     admin_user: User = Depends(get_current_admin_user),
@@ -132,32 +292,126 @@ async def get_workers(
     workers = query.all()
     return workers
 
+@router.post("/profile")
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+    requests: Optional[int] = Query(None, ge=1),
+    interval_ms: float = Query(5.0, ge=1.0, le=1000.0),
+    include_idle: bool = False,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Sample this worker's stacks for N seconds or until N requests complete
+    
+    `format=collapsed` returns a flamegraph.pl / speedscope compatible file;
+    `json` returns per-route statistics together with the collapsed stacks.
+    """
+    try:
+        session = await run_profile(seconds, requests, interval_ms / 1000.0, include_idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if format == "collapsed":
+        return PlainTextResponse(session.collapsed())
+    summary = session.summary()
+    summary["collapsed"] = session.collapsed()
+    return summary
+
+@router.get("/classifier")
+async def get_classifier_model(admin_user: User = Depends(get_current_admin_user)):
+    """The active department classifier model (version None means keyword rules only)"""
+    return await run_in_threadpool(get_model_info)
+
+@router.post("/classifier/train")
+async def train_classifier_model(
+    force: bool = False,
+    min_samples: Optional[int] = Query(None, ge=2),
+    admin_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Retrain the classifier from admin assignments now
+    
+    The new model is activated only if it beats the keyword rules on a holdout,
+    unless `force` is set.
+    """
+    kwargs = {"min_samples": min_samples} if min_samples else {}
+    return await run_in_threadpool(train_classifier, db, force, **kwargs)
+
+@router.get("/storage")
+async def get_storage_usage(
+    admin_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Media usage per department: as recorded in issue_media, and as measured on disk by the
+    last completed reconciler pass in this process (None until one has finished)"""
+    return {
+        "recorded": recorded_storage_usage(db),
+        "reconciled": media_reconciler.last_report
+    }
+
+@router.get("/hotspots", response_class=FastJSONResponse)
+async def get_hotspots(
+    department_id: Optional[int] = None,
+    min_issues: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    admin_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Places where recent issues of one department cluster, largest first (updated by the hotspots job)"""
+    return FastJSONResponse(list_hotspots(db, department_id, min_issues, limit))
+
+@router.post("/hotspots/recompute")
+async def recompute_hotspots(
+    admin_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Cluster all recent issues again now instead of waiting for the daily full run"""
+    count = await run_in_threadpool(hotspot_detector.recompute_all, db)
+    return {"hotspots": count}
+
+def _days_between(db: Session, start, end):
+    """SQL expression for the days from start to end on the current database"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", end - start) / 86400.0
+    return func.julianday(end) - func.julianday(start)
+
 @router.get("/analytics/trends")
 async def get_issue_trends(
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
     admin_user: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Get issue trends for analytics"""
+    """Get issue trends for analytics
+    
+    `created_from`/`created_to` (inclusive dates) restrict to issues created in that
+    range; on partitioned PostgreSQL tables only the matching months are read.
+    """
+    # Hot and archived issues together
+    all_issues = issues_both_tiers(
+        "id", "status", "department_id", "created_at", "resolved_at",
+        created_from=created_from, created_to=created_to
+    )
     
     # Issues by status over time (simplified for MVP)
     status_distribution = db.query(
-        Issue.status,
-        func.count(Issue.id).label('count')
-    ).group_by(Issue.status).all()
+        all_issues.c.status,
+        func.count(all_issues.c.id).label('count')
+    ).group_by(all_issues.c.status).all()
     
     # Issues by department
     dept_distribution = db.query(
         Department.name,
-        func.count(Issue.id).label('count')
-    ).join(Issue, Department.id == Issue.department_id, isouter=True)\
+        func.count(all_issues.c.id).label('count')
+    ).join(all_issues, Department.id == all_issues.c.department_id, isouter=True)\
      .group_by(Department.name).all()
     
     # Average resolution time (for resolved issues)
     avg_resolution_time = db.query(
         func.avg(
-            func.julianday(Issue.resolved_at) - func.julianday(Issue.created_at)
+            _days_between(db, all_issues.c.created_at, all_issues.c.resolved_at)
         ).label('avg_days')
-    ).filter(Issue.status == IssueStatus.RESOLVED).scalar()
+    ).filter(all_issues.c.status == IssueStatus.RESOLVED).scalar()
     
     return {
         "status_distribution": [
@@ -169,4 +423,28 @@ async def get_issue_trends(
             for name, count in dept_distribution
         ],
         "average_resolution_days": float(avg_resolution_time) if avg_resolution_time else 0
-    }
\ No newline at end of file
+    }
+
+@router.get("/analytics/state")
+async def get_issue_state_at(
+    at: datetime,
+    department_id: Optional[int] = None,
+    status: Optional[IssueStatus] = None,
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    admin_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """State of all issues at time `at`, rebuilt from the issue event log
+    
+    Pages by issue id: pass the last `issue_id` of a page as `after_id` for the next one.
+    """
+    issues = await run_in_threadpool(get_state_at, db, at, department_id, status, after_id, limit)
+    response = {
+        "at": at,
+        "issues": issues,
+        "next_after_id": issues[-1]["issue_id"] if len(issues) == limit else None,
+    }
+    if after_id == 0:
+        response["status_counts"] = await run_in_threadpool(count_by_status_at, db, at, department_id)
+    return FastJSONResponse(response)
\ No newline at end of file
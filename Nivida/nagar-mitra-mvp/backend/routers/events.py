@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from typing import List, Optional
+
+from database import SessionLocal
+from services.realtime import (
+    ADMIN_REVIEW_CHANNEL,
+    department_channel,
+    get_event_hub,
+    user_channel,
+)
+from utils.auth import get_user_from_token
+from utils.serialization import dumps
+
+router = APIRouter()
+
+# Comment lines keep proxies from closing idle streams
+KEEPALIVE_SECONDS = 15
+
+optional_security = HTTPBearer(auto_error=False)
+
+def _authenticate(token: Optional[str]):
+    """Resolve the stream's user without holding a DB connection for the stream lifetime"""
+    if not token:
+        return None
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(db, token)
+        if user is None or not user.is_active:
+            return None
+        return user.id, user.is_admin
+    finally:
+        db.close()
+
+async def _event_stream(channels: List[str]):
+    hub = get_event_hub()
+    subscriber = hub.subscribe(channels)
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            events = await subscriber.get_batch(timeout=KEEPALIVE_SECONDS)
+            if not events:
+                yield b": keepalive\n\n"
+                continue
+            yield b"".join(
+                b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+                for event in events
+            )
+    finally:
+        # Runs when the client disconnects and the response task is cancelled
+        hub.unsubscribe(subscriber)
+
+@router.get("/stream")
+async def stream_issue_events(
+    department_id: Optional[List[int]] = Query(None),
+    review_queue: bool = False,
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """Server-Sent Events stream of issue updates
+
+    Always includes the caller's own issues; `department_id` (repeatable) adds
+    department feeds and `review_queue` adds the admin manual-review queue.
+    Browsers' EventSource cannot set headers, so `?token=` is accepted too.
+    """
+    identity = _authenticate(credentials.credentials if credentials else token)
+    if identity is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id, is_admin = identity
+
+    channels = [user_channel(user_id)]
+    channels.extend(department_channel(dept_id) for dept_id in department_id or [])
+    if review_queue:
+        if not is_admin:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+        channels.append(ADMIN_REVIEW_CHANNEL)
+
+    return StreamingResponse(
+        _event_stream(channels),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
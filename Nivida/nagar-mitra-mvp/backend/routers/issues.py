@@ -1,41 +1,64 @@
-import os
-import uuid
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import shutil
 
 from database import get_db
 from models.user import User
 from models.issue import Issue, IssueMedia, IssueStatus
+from models.issue_event import IssueEventType
 from schemas.issue import IssueCreate, IssueResponse, IssueUpdate, IssueVoteRequest, IssueListResponse
+from schemas.upload import UploadAttachRequest
 from utils.auth import get_current_active_user, get_current_admin_user
+from services.archive import get_archived_issue, get_archived_media, get_issue_or_restore
+from services.assignment import get_assignment_engine
 from services.classification import get_classifier
+from services.clusters import get_clusters, parse_bbox
+from services.issue_events import get_issue_timeline, record_issue_changes, record_issue_event, snapshot_issue
+from services.media import (
+    ALLOWED_FILE_TYPES, StagedUpload, attach_uploads, discard_staged, find_duplicate_photos, ingest_staged,
+    photo_hash, stage_uploads, store_staged, upload_location
+)
+from services.image_ingest import ImageRejected
+from services.media_index import photo_index
+from services.prioritization import prioritize_new_issue, rescore_issue
+from services.purge import soft_delete_issue
+from services.ranking import hot_score, rescore_hot
+from services.storage import StorageError, storage_for
+from services.uploads import UploadError, completed_sessions, consume_sessions, release_sessions, stage_sessions
+from utils.geo import GEO_CELL_COLUMNS, geo_cells, is_valid_cell
+from services.realtime import build_issue_event, publish_event, publish_issue_event
+from utils.metrics import timed
+from utils.serialization import ISSUE_COLUMNS, FastJSONResponse, fetch_issue_dicts
 
 router = APIRouter()
 
-# Allowed file types and max size
-ALLOWED_FILE_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'video/mp4', 'audio/mpeg', 'audio/wav'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+def _finished_uploads(db: Session, upload_ids: List[str], user: User):
+    """The user's completed resumable uploads, or the HTTP error to answer with"""
+    try:
+        return completed_sessions(db, upload_ids, user.id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+def _consume_uploads(db: Session, sessions):
+    """Delete attached sessions in the current transaction, or the HTTP error to answer with"""
+    try:
+        consume_sessions(db, sessions)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
-def save_uploaded_file(file: UploadFile, issue_id: int) -> str:
-    """Save uploaded file and return file path"""
-    # Create uploads directory if it doesn't exist
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{issue_id}_{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    return file_path
+async def _ingest_uploads(staged: List[StagedUpload]) -> List[StagedUpload]:
+    """Processed staged uploads, or the HTTP error to answer with (the staged files are removed)"""
+    try:
+        return await ingest_staged(staged)
+    except ImageRejected as e:
+        await discard_staged(staged)
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+# Max size of files sent with the issue form (larger media goes through /api/uploads)
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
 @router.post("/", response_model=IssueResponse)
 async def create_issue(
@@ -45,10 +68,11 @@ async def create_issue(
     longitude: Optional[float] = Form(None),
     address: Optional[str] = Form(None),
     files: List[UploadFile] = File(None),
+    upload_ids: Optional[str] = Form(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Create a new issue with optional media files"""
+    """Create a new issue with optional media files and/or completed uploads (comma-separated ids)"""
     
     # Validate files if provided
     if files:
@@ -61,6 +85,16 @@ async def create_issue(
             
             # Note: file.size might not be available in all cases
             # In production, you'd want to check file size during upload
+    sessions = _finished_uploads(db, [i.strip() for i in upload_ids.split(",") if i.strip()], current_user) \
+        if upload_ids else []
+    
+    # Save uploads first: photos are recompressed and stripped of EXIF in the ingest pool,
+    # and their GPS position stands in for coordinates the reporter did not give
+    staged = await _ingest_uploads((stage_uploads(files) if files else []) + stage_sessions(sessions))
+    if latitude is None and longitude is None:
+        location = upload_location(staged)
+        if location is not None:
+            latitude, longitude = location
     
     # Create issue data
     issue_data = {
@@ -69,101 +103,152 @@ async def create_issue(
         "latitude": latitude,
         "longitude": longitude,
         "address": address,
-        "user_id": current_user.id
+        "user_id": current_user.id,
+        **geo_cells(latitude, longitude),
+        "hot_score": hot_score(0, 0, None)
     }
     
-    # Use AI classifier to categorize the issue
-    classifier = get_classifier(db)
-    dept_id, confidence, needs_review = classifier.classify_issue(title, description)
-    
-    issue_data.update({
-        "department_id": dept_id,
-        "ai_confidence": confidence,
-        "needs_manual_review": needs_review,
-        "category": "general" if not dept_id else None  # Will be set by department
-    })
-    
-    # Create issue
-    db_issue = Issue(**issue_data)
-    db.add(db_issue)
-    db.commit()
-    db.refresh(db_issue)
-    
-    # Handle file uploads if any
-    if files and files[0].filename:  # Check if files were actually uploaded
-        for file in files:
-            if file.filename:  # Skip empty files
-                file_path = save_uploaded_file(file, db_issue.id)
-                
-                # Determine file type
-                file_type = "image" if file.content_type.startswith("image") else \
-                           "video" if file.content_type.startswith("video") else "audio"
-                
-                # Create media record
-                media = IssueMedia(
-                    issue_id=db_issue.id,
-                    file_path=file_path,
-                    file_type=file_type,
-                    file_size=0,  # Would calculate in production
-                    original_filename=file.filename
-                )
-                db.add(media)
+    # The issue, its media and the used upload sessions are committed together;
+    # on failure the staged files are removed and the sessions can be attached again
+    try:
+        # Use AI classifier to categorize the issue
+        classifier = get_classifier(db)
+        with timed("classify"):
+            dept_id, confidence, needs_review = classifier.classify_issue(title, description)
+        
+        issue_data.update({
+            "department_id": dept_id,
+            "ai_confidence": confidence,
+            "needs_manual_review": needs_review,
+            "category": classifier.get_category(dept_id)
+        })
         
-        db.commit()
-        db.refresh(db_issue)
+        await store_staged(staged)
+        db_issue = Issue(**issue_data)
+        priority, _ = classifier.detect_priority(title, description)
+        prioritize_new_issue(db, db_issue, priority)
+        db.add(db_issue)
+        record_issue_event(db, db_issue, IssueEventType.CREATED, current_user.id)
+        _consume_uploads(db, sessions)
+        # Photos already attached to other issues are flagged
+        attach_uploads(db, db_issue, staged, current_user.id)
+    except Exception:
+        db.rollback()
+        await discard_staged(staged)
+        raise
+    release_sessions(sessions)
+    db.refresh(db_issue)
     
+    publish_issue_event(db_issue, "created")
     return db_issue
 
-@router.get("/", response_model=IssueListResponse)
+@router.get("/", response_model=IssueListResponse, response_class=FastJSONResponse)
 async def get_issues(
     skip: int = 0,
     limit: int = 20,
     status: Optional[IssueStatus] = None,
     department_id: Optional[int] = None,
     user_id: Optional[int] = None,
+    cell: Optional[str] = None,
+    sort: Optional[str] = Query(None, pattern="^(hot|recent)$"),
     db: Session = Depends(get_db)
 ):
-    """Get issues with optional filtering"""
-    query = db.query(Issue)
+    """Get issues with optional filtering
+    
+    `sort=hot` ranks by time-decayed votes, `sort=recent` by creation time.
+    `cell` restricts to a geohash cell of 4, 5 or 6 characters.
+    """
+    filters = []
     
     # Apply filters
     if status:
-        query = query.filter(Issue.status == status)
+        filters.append(Issue.status == status)
     if department_id:
-        query = query.filter(Issue.department_id == department_id)
+        filters.append(Issue.department_id == department_id)
     if user_id:
-        query = query.filter(Issue.user_id == user_id)
+        filters.append(Issue.user_id == user_id)
+    if cell:
+        cell = cell.lower()
+        if not is_valid_cell(cell):
+            raise HTTPException(status_code=400, detail="cell must be a geohash of 4, 5 or 6 characters")
+        # Equality on the column of this precision: its index yields the area's issues in hot order
+        filters.append(getattr(Issue, GEO_CELL_COLUMNS[len(cell)]) == cell)
+    
+    statement = select(*ISSUE_COLUMNS).where(*filters)
+    if sort == "hot":
+        statement = statement.order_by(Issue.hot_score.desc(), Issue.id.desc())
+    elif sort == "recent":
+        statement = statement.order_by(Issue.created_at.desc(), Issue.id.desc())
     
     # Get total count
-    total = query.count()
+    total = db.execute(select(func.count(Issue.id)).where(*filters)).scalar()
     
-    # Get paginated results
-    issues = query.offset(skip).limit(limit).all()
+    # Get paginated results as column tuples (trusted rows skip model validation)
+    issues = fetch_issue_dicts(db, statement.offset(skip).limit(limit))
     
-    return {
+    return FastJSONResponse({
         "issues": issues,
         "total": total,
         "page": skip // limit + 1,
         "per_page": limit
-    }
+    })
 
-@router.get("/my", response_model=List[IssueResponse])
+@router.get("/my", response_model=List[IssueResponse], response_class=FastJSONResponse)
 async def get_my_issues(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get current user's issues"""
-    issues = db.query(Issue).filter(Issue.user_id == current_user.id).all()
-    return issues
+    issues = fetch_issue_dicts(
+        db, select(*ISSUE_COLUMNS).where(Issue.user_id == current_user.id)
+    )
+    return FastJSONResponse(issues)
+
+@router.get("/clusters", response_class=FastJSONResponse)
+async def get_issue_clusters(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(..., ge=0, le=24),
+    status: Optional[IssueStatus] = None,
+    db: Session = Depends(get_db)
+):
+    """Issue clusters for a map viewport: centroid and count per grid cell
+    
+    Read from per-zoom aggregates kept up to date with every issue change, so the
+    response grows with the viewport rather than with the number of issues.
+    """
+    try:
+        return FastJSONResponse(get_clusters(db, parse_bbox(bbox), zoom, status))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{issue_id}", response_model=IssueResponse)
 async def get_issue(issue_id: int, db: Session = Depends(get_db)):
     """Get issue by ID"""
     issue = db.query(Issue).filter(Issue.id == issue_id).first()
     if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
+        # Closed issues past the archive age live in the archive tables
+        issue = get_archived_issue(db, issue_id)
+        if issue is None:
+            raise HTTPException(status_code=404, detail="Issue not found")
     return issue
 
+@router.get("/{issue_id}/timeline")
+async def get_issue_timeline_events(
+    issue_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Lifecycle events of an issue, oldest first (admin or issue owner only)"""
+    events = get_issue_timeline(db, issue_id)
+    if not events:
+        raise HTTPException(status_code=404, detail="Issue not found")
+    
+    # Read from the event log only; the reporter is the actor of the creation event
+    if not current_user.is_admin and events[0]["actor_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return FastJSONResponse({"issue_id": issue_id, "events": events})
+
 @router.put("/{issue_id}", response_model=IssueResponse)
 async def update_issue(
     issue_id: int,
@@ -172,7 +257,7 @@ async def update_issue(
     db: Session = Depends(get_db)
 ):
     """Update issue (admin or issue owner only)"""
-    issue = db.query(Issue).filter(Issue.id == issue_id).first()
+    issue = get_issue_or_restore(db, issue_id)
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
     
@@ -183,17 +268,29 @@ async def update_issue(
             detail="Not enough permissions"
         )
     
+    previous_status, previous_worker_id = issue.status, issue.worker_id
+    previous = snapshot_issue(issue)
+    
     # Update fields
     update_data = issue_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(issue, field, value)
     
+    if "priority" in update_data:
+        rescore_issue(issue)
+    
     # If status is being changed to resolved, set resolved_at
     if issue_update.status == IssueStatus.RESOLVED and issue.resolved_at is None:
         issue.resolved_at = datetime.utcnow()
     
+    record_issue_changes(db, issue, previous, current_user.id)
     db.commit()
     db.refresh(issue)
+    
+    get_assignment_engine(db).on_issue_change(
+        previous_worker_id, previous_status, issue.worker_id, issue.status, issue.latitude, issue.longitude
+    )
+    publish_issue_event(issue, "status_updated" if issue.status != previous_status else "updated")
     return issue
 
 @router.post("/{issue_id}/vote")
@@ -206,6 +303,8 @@ async def vote_on_issue(
     """Vote on an issue (upvote or downvote)"""
     issue = db.query(Issue).filter(Issue.id == issue_id).first()
     if not issue:
+        if get_archived_issue(db, issue_id) is not None:
+            raise HTTPException(status_code=409, detail="Issue is closed and archived")
         raise HTTPException(status_code=404, detail="Issue not found")
     
     # In a full implementation, you'd track user votes to prevent duplicate voting
@@ -214,23 +313,84 @@ async def vote_on_issue(
         issue.upvotes += 1
     else:
         issue.downvotes += 1
+    rescore_issue(issue)
+    rescore_hot(issue)
     
+    record_issue_event(
+        db, issue, IssueEventType.VOTED, current_user.id, value=1 if vote_request.vote_type == "up" else -1
+    )
     db.commit()
+    publish_issue_event(issue, "voted")
     
     return {"message": "Vote recorded", "upvotes": issue.upvotes, "downvotes": issue.downvotes}
 
+@router.post("/media/duplicates")
+async def check_duplicate_photo(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Issues that already have this photo (or a resized/re-compressed copy), before reporting"""
+    value = photo_hash(file.file)
+    if value is None:
+        raise HTTPException(status_code=400, detail="Not a readable image")
+    return {"duplicates": find_duplicate_photos(db, value)}
+
+@router.post("/{issue_id}/media", response_model=IssueResponse)
+async def attach_issue_media(
+    issue_id: int,
+    attach_request: UploadAttachRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Attach completed resumable uploads to an existing issue (admin or issue owner only)"""
+    issue = db.query(Issue).filter(Issue.id == issue_id).first()
+    if not issue:
+        if get_archived_issue(db, issue_id) is not None:
+            raise HTTPException(status_code=409, detail="Issue is closed and archived")
+        raise HTTPException(status_code=404, detail="Issue not found")
+    
+    if not current_user.is_admin and issue.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    sessions = _finished_uploads(db, attach_request.upload_ids, current_user)
+    if sessions:
+        staged = await _ingest_uploads(stage_sessions(sessions))
+        try:
+            await store_staged(staged)
+            _consume_uploads(db, sessions)
+            attach_uploads(db, issue, staged, current_user.id)
+        except Exception:
+            db.rollback()
+            await discard_staged(staged)
+            raise
+        release_sessions(sessions)
+        db.refresh(issue)
+        publish_issue_event(issue, "updated")
+    return issue
+
 @router.get("/{issue_id}/media/{media_id}")
 async def get_media_file(issue_id: int, media_id: int, db: Session = Depends(get_db)):
-    """Serve media file"""
-    media = db.query(IssueMedia).filter(
+    """Serve media file (a redirect to a pre-signed URL when it is in object storage)"""
+    media = db.query(IssueMedia).join(Issue).filter(
         IssueMedia.id == media_id,
         IssueMedia.issue_id == issue_id
     ).first()
+    if not media:
+        media = get_archived_media(db, issue_id, media_id)
     
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
     
-    if not os.path.exists(media.file_path):
+    try:
+        storage = storage_for(media.file_path)
+    except StorageError:
+        raise HTTPException(status_code=404, detail="File not found")
+    url = storage.download_url(media.file_path, media.original_filename)
+    if url:
+        return RedirectResponse(url, status_code=307)
+    
+    if not storage.exists(media.file_path):
         raise HTTPException(status_code=404, detail="File not found")
     
     return FileResponse(media.file_path, filename=media.original_filename)
@@ -242,16 +402,17 @@ async def delete_issue(
     db: Session = Depends(get_db)
 ):
     """Delete issue (admin only)"""
-    issue = db.query(Issue).filter(Issue.id == issue_id).first()
+    issue = get_issue_or_restore(db, issue_id)
     if not issue:
         raise HTTPException(status_code=404, detail="Issue not found")
     
-    # Delete associated media files
-    for media in issue.media:
-        if os.path.exists(media.file_path):
-            os.remove(media.file_path)
-    
-    db.delete(issue)
+    # Soft delete: the issue disappears now, its rows and media files are removed by the purge job
+    deleted_event = build_issue_event(issue, "deleted")
+    released = (issue.worker_id, issue.status, issue.latitude, issue.longitude)
+    soft_delete_issue(db, issue, admin_user.id)
     db.commit()
+    get_assignment_engine(db).on_issue_change(released[0], released[1], None, None, released[2], released[3])
+    photo_index.remove_issue(issue_id)
+    publish_event(*deleted_event)
     
     return {"message": "Issue deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from database import get_db
+from models.user import User
+from models.upload_session import UploadSession
+from schemas.upload import UploadCreate, UploadStatus
+from utils.auth import get_current_active_user
+from services.uploads import UploadError, create_session, delete_session, get_session, is_complete, write_chunk
+
+router = APIRouter()
+
+TUS_VERSION = "1.0.0"
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+def _status(upload: UploadSession) -> UploadStatus:
+    return UploadStatus(
+        id=upload.id,
+        filename=upload.filename,
+        content_type=upload.content_type,
+        length=upload.length,
+        offset=upload.received,
+        complete=is_complete(upload),
+        expires_at=upload.expires_at
+    )
+
+def _offset_headers(upload: UploadSession) -> dict:
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(upload.received),
+        "Upload-Length": str(upload.length),
+        "Cache-Control": "no-store"
+    }
+
+def _get_upload(db: Session, upload_id: str, user: User) -> UploadSession:
+    upload = get_session(db, upload_id, user.id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+@router.post("/", response_model=UploadStatus, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload_request: UploadCreate,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Start a resumable upload; send the bytes with PATCH to the returned location"""
+    try:
+        upload = create_session(
+            db, current_user.id, upload_request.filename, upload_request.content_type, upload_request.length
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    response.headers["Location"] = f"/api/uploads/{upload.id}"
+    response.headers["Tus-Resumable"] = TUS_VERSION
+    return _status(upload)
+
+@router.head("/{upload_id}")
+async def get_upload_offset(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Bytes received so far, in the Upload-Offset header"""
+    upload = _get_upload(db, upload_id, current_user)
+    return Response(status_code=200, headers=_offset_headers(upload))
+
+@router.get("/{upload_id}", response_model=UploadStatus)
+async def get_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Upload progress"""
+    return _status(_get_upload(db, upload_id, current_user))
+
+@router.patch("/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    content_type: Optional[str] = Header(None),
+    content_length: Optional[int] = Header(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Append the request body at Upload-Offset; the body is streamed to disk"""
+    if content_type != CHUNK_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Chunks must be sent as {CHUNK_CONTENT_TYPE}")
+    upload = _get_upload(db, upload_id, current_user)
+    if content_length is not None and upload_offset + content_length > upload.length:
+        raise HTTPException(status_code=413, detail="Chunk goes past the announced upload length")
+
+    try:
+        await write_chunk(db, upload, upload_offset, request.stream())
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=_offset_headers(upload))
+    return Response(status_code=204, headers=_offset_headers(upload))
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Abandon an upload and delete what was received"""
+    try:
+        delete_session(db, _get_upload(db, upload_id, current_user))
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return Response(status_code=204, headers={"Tus-Resumable": TUS_VERSION})
\ No newline at end of file
@@ -36,7 +36,9 @@ class IssueMediaResponse(BaseModel):
     id: int
     file_path: str
     file_type: str
+    file_size: Optional[int] = None
     original_filename: str
+    duplicate_of_issue_id: Optional[int] = None
     created_at: datetime
     
     class Config:
@@ -53,6 +55,10 @@ class IssueResponse(IssueBase):
     needs_manual_review: bool
     upvotes: int
     downvotes: int
+    urgency_score: Optional[float] = None
+    sla_due_at: Optional[datetime] = None
+    sla_breached: Optional[bool] = None
+    hot_score: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     resolved_at: Optional[datetime] = None
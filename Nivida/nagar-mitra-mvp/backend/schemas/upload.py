@@ -0,0 +1,26 @@
+from pydantic import BaseModel, validator
+from typing import List
+from datetime import datetime
+
+class UploadCreate(BaseModel):
+    filename: str
+    content_type: str
+    length: int  # total size in bytes
+
+    @validator('filename')
+    def validate_filename(cls, v):
+        if not v.strip():
+            raise ValueError('Filename is required')
+        return v.strip()
+
+class UploadStatus(BaseModel):
+    id: str
+    filename: str
+    content_type: str
+    length: int
+    offset: int
+    complete: bool
+    expires_at: datetime
+
+class UploadAttachRequest(BaseModel):
+    upload_ids: List[str]
\ No newline at end of file
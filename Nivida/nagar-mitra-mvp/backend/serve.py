@@ -0,0 +1,453 @@
+"""
+Production server: a pre-fork supervisor running several uvicorn workers
+The supervisor builds the app and loads read-mostly data (the department keyword
+index) before forking, freezes the preloaded objects out of the garbage collector so
+copy-on-write pages stay shared, and publishes the index to a shared cache that
+workers memory-map instead of each querying the database.
+Workers share one listening socket, report readiness and liveness through a pipe, and
+are restarted one at a time on SIGHUP: the replacement must be serving before the old
+worker is told to stop accepting connections and drain in-flight requests (uploads
+included) for up to --graceful-timeout seconds.
+
+Usage (from the backend directory):
+    python serve.py --host 0.0.0.0 --port 8000 --workers 4
+Signals: HUP rolling restart, TERM/INT graceful stop, TTIN/TTOU add/remove a worker.
+With --no-preload each worker imports the code itself, so HUP also deploys new code.
+Realtime events are relayed between workers. With more than one worker the rate
+limiter must count in Redis (RATE_LIMIT_BACKEND=shared with REDIS_URL): without it the
+default worker count falls back to 1, and an explicit --workers N (or WEB_CONCURRENCY)
+refuses to start, unless rate limiting is disabled.
+"""
+import argparse
+import errno
+import gc
+import logging
+import math
+import os
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+serve_logger = logging.getLogger("serve")
+
+HEARTBEAT_SECONDS = 5
+RESPAWN_BACKOFF_SECONDS = 1.0
+READY_TIMEOUT_SECONDS = 60
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """CPU quota of the container, if one is set (cgroup v2, then v1)"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+            if quota != "max":
+                return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY, else one async worker per usable CPU"""
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.getenv("WEB_CONCURRENCY")))
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_limit()
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return max(1, cpus)
+
+def multi_worker_problem() -> Optional[str]:
+    """Why several workers cannot run with this configuration, or None"""
+    from middleware import rate_limit
+
+    if not rate_limit.RATE_LIMIT_ENABLED:
+        return None
+    if rate_limit.RATE_LIMIT_BACKEND != "shared" or not rate_limit.REDIS_URL:
+        return "rate limits would be counted per worker; set REDIS_URL (and RATE_LIMIT_BACKEND=shared)"
+    if rate_limit.redis_asyncio is None:
+        return "REDIS_URL is set but the redis package is not installed"
+    return None
+
+def configure_workers(workers: Optional[int]) -> int:
+    """Defaults for state that must agree across workers; returns the worker count to run
+    An explicit count that cannot run exits; the CPU-based default falls back to 1 worker.
+    """
+    explicit = workers is not None or bool(os.getenv("WEB_CONCURRENCY"))
+    if workers is None:
+        workers = default_workers()
+    if workers <= 1:
+        return workers
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "shared")
+    problem = multi_worker_problem()
+    if problem and not explicit:
+        serve_logger.warning(f"Running 1 worker instead of {workers}: {problem}")
+        return 1
+    if problem:
+        sys.exit(
+            f"Cannot run {workers} workers: {problem}. "
+            "Alternatively set RATE_LIMIT_ENABLED=false (e.g. when a proxy limits requests) or use --workers 1."
+        )
+    # Assignment counts drift by what the other workers assign until they are reloaded
+    os.environ.setdefault("ASSIGNMENT_REFRESH_SECONDS", "30")
+    return workers
+
+def create_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def preload(publish: bool):
+    """Import the application and warm shared data before forking"""
+    import main
+    from database import SessionLocal, engine
+    from services.classification import get_classifier, publish_classifier_index
+
+    app = main.create_app()
+    db = SessionLocal()
+    try:
+        if publish:
+            publish_classifier_index(db)
+        # Also warm this process's copy, which forked workers inherit
+        get_classifier(db)
+    finally:
+        db.close()
+    # Connections must not be shared across fork
+    engine.dispose()
+    return app
+
+def publish_snapshots():
+    from database import SessionLocal, engine
+    from services.classification import publish_classifier_index
+
+    db = SessionLocal()
+    try:
+        publish_classifier_index(db)
+    finally:
+        db.close()
+    engine.dispose()
+
+class Worker:
+    def __init__(self, index: int, pid: int, notify_fd: int):
+        self.index = index
+        self.pid = pid
+        self.notify_fd = notify_fd
+        self.started_at = time.monotonic()
+        self.last_heartbeat: Optional[float] = None
+        self.retiring = False
+
+    @property
+    def ready(self) -> bool:
+        return self.last_heartbeat is not None
+
+class Supervisor:
+    def __init__(self, args):
+        self.args = args
+        self.num_workers = args.workers
+        self.workers: Dict[int, Worker] = {}
+        self.app = None
+        self.sock: Optional[socket.socket] = None
+        self.restart_queue: List[Worker] = []
+        self.replacing: Optional[tuple] = None
+        self.stopping = False
+        self.signals: List[int] = []
+        self.last_snapshot = 0.0
+        self.last_crash = 0.0
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+
+    # Process management
+    def spawn(self, index: int) -> Worker:
+        notify_r, notify_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(notify_r)
+            try:
+                self.run_worker(index, notify_w)
+                code = 0
+            except BaseException:
+                serve_logger.exception(f"Worker {index} crashed")
+                code = 1
+            os._exit(code)
+        os.close(notify_w)
+        os.set_blocking(notify_r, False)
+        worker = Worker(index, pid, notify_r)
+        self.workers[pid] = worker
+        serve_logger.info(f"Started worker {index} (pid {pid})")
+        return worker
+
+    def run_worker(self, index: int, notify_fd: int):
+        import uvicorn
+
+        # Undo the supervisor's signal setup; uvicorn installs its own INT/TERM handlers
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGHUP, signal.SIGCHLD, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, signal.SIG_DFL)
+        for worker in self.workers.values():
+            os.close(worker.notify_fd)
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
+
+        import services.scheduler as scheduler
+        # Periodic jobs run in one worker only
+        scheduler.BACKGROUND_JOBS_ENABLED = scheduler.BACKGROUND_JOBS_ENABLED and index == 0
+
+        app = self.app
+        if app is None:
+            import main
+            app = main.create_app()
+        else:
+            from database import engine
+            engine.dispose(close=False)
+
+        async def notify():
+            try:
+                os.write(notify_fd, b".")
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EPIPE):
+                    raise
+
+        config = uvicorn.Config(
+            app,
+            lifespan="on",
+            proxy_headers=self.args.proxy_headers,
+            forwarded_allow_ips=self.args.forwarded_allow_ips,
+            timeout_keep_alive=self.args.keep_alive,
+            timeout_graceful_shutdown=self.args.graceful_timeout,
+            callback_notify=notify,
+            timeout_notify=HEARTBEAT_SECONDS,
+            log_level=self.args.log_level,
+        )
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def kill(self, worker: Worker, signum: int):
+        try:
+            os.kill(worker.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            os.close(worker.notify_fd)
+            code = os.waitstatus_to_exitcode(status)
+            if worker.retiring or self.stopping:
+                serve_logger.info(f"Worker {worker.index} (pid {pid}) stopped")
+                continue
+            serve_logger.error(f"Worker {worker.index} (pid {pid}) exited unexpectedly with {code}")
+            if self.replacing is not None and worker in self.replacing:
+                # The replacement died before serving: stop the rolling restart, keep the old worker
+                serve_logger.error("Rolling restart aborted")
+                self.replacing = None
+                self.restart_queue.clear()
+                continue
+            # Avoid a tight crash loop when the app cannot start
+            if time.monotonic() - self.last_crash < RESPAWN_BACKOFF_SECONDS:
+                time.sleep(RESPAWN_BACKOFF_SECONDS)
+            self.last_crash = time.monotonic()
+            if self._active_count() < self.num_workers:
+                self.spawn(worker.index)
+
+    def _active_count(self) -> int:
+        return sum(1 for worker in self.workers.values() if not worker.retiring)
+
+    def _free_index(self) -> int:
+        used = {worker.index for worker in self.workers.values() if not worker.retiring}
+        return next(index for index in range(len(used) + 1) if index not in used)
+
+    # Signals and the main loop
+    def _on_signal(self, signum, frame):
+        self.signals.append(signum)
+
+    def handle_signals(self):
+        while self.signals:
+            signum = self.signals.pop(0)
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                self.stopping = True
+            elif signum == signal.SIGHUP:
+                self.start_rolling_restart()
+            elif signum == signal.SIGTTIN:
+                problem = multi_worker_problem() if self.num_workers == 1 else None
+                if problem:
+                    serve_logger.error(f"Not adding a worker: {problem}")
+                    continue
+                self.num_workers += 1
+                self.spawn(self._free_index())
+            elif signum == signal.SIGTTOU and self.num_workers > 1:
+                self.num_workers -= 1
+                worker = max(
+                    (w for w in self.workers.values() if not w.retiring), key=lambda w: w.index, default=None
+                )
+                if worker is not None:
+                    worker.retiring = True
+                    self.kill(worker, signal.SIGTERM)
+
+    def start_rolling_restart(self):
+        if self.restart_queue or self.replacing:
+            serve_logger.warning("Rolling restart already in progress")
+            return
+        serve_logger.info("Rolling restart")
+        self.refresh_snapshots()
+        self.restart_queue = sorted(
+            (worker for worker in self.workers.values() if not worker.retiring), key=lambda w: w.index
+        )
+
+    def step_rolling_restart(self):
+        if self.replacing is not None:
+            old, new = self.replacing
+            if new.ready:
+                # New worker is serving: let the old one finish its requests and exit
+                old.retiring = True
+                self.kill(old, signal.SIGTERM)
+                self.replacing = None
+            elif time.monotonic() - new.started_at > READY_TIMEOUT_SECONDS:
+                serve_logger.error(f"Replacement worker {new.index} not ready; aborting rolling restart")
+                new.retiring = True
+                self.kill(new, signal.SIGKILL)
+                self.replacing = None
+                self.restart_queue.clear()
+            return
+        while self.restart_queue:
+            old = self.restart_queue.pop(0)
+            if old.pid in self.workers and not old.retiring:
+                self.replacing = (old, self.spawn(old.index))
+                return
+        serve_logger.debug("Rolling restart complete")
+
+    def read_heartbeats(self, timeout: float):
+        fds = [self._wakeup_r] + [worker.notify_fd for worker in self.workers.values()]
+        try:
+            readable, _, _ = select.select(fds, [], [], timeout)
+        except InterruptedError:
+            return
+        now = time.monotonic()
+        by_fd = {worker.notify_fd: worker for worker in self.workers.values()}
+        for fd in readable:
+            try:
+                data = os.read(fd, 4096)
+            except BlockingIOError:
+                continue
+            worker = by_fd.get(fd)
+            if worker is not None and data:
+                if worker.last_heartbeat is None:
+                    serve_logger.info(f"Worker {worker.index} (pid {worker.pid}) ready")
+                worker.last_heartbeat = now
+
+    def check_liveness(self):
+        now = time.monotonic()
+        for worker in list(self.workers.values()):
+            if worker.retiring:
+                continue
+            last = worker.last_heartbeat if worker.ready else worker.started_at
+            limit = self.args.timeout if worker.ready else READY_TIMEOUT_SECONDS
+            if now - last > limit:
+                serve_logger.error(f"Worker {worker.index} (pid {worker.pid}) unresponsive; killing")
+                self.kill(worker, signal.SIGKILL)
+
+    def refresh_snapshots(self):
+        try:
+            publish_snapshots()
+        except Exception as e:
+            serve_logger.error(f"Could not refresh shared snapshots: {str(e)}")
+        self.last_snapshot = time.monotonic()
+
+    def run(self):
+        args = self.args
+        shared_dir = tempfile.mkdtemp(prefix="nagar-mitra-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        os.environ["SHARED_CACHE_DIR"] = shared_dir
+        try:
+            self.sock = create_socket(args.host, args.port, args.backlog)
+            if args.preload:
+                self.app = preload(publish=True)
+                # Preloaded objects are never freed; keep the collector from touching their pages
+                gc.freeze()
+            else:
+                self.refresh_snapshots()
+            self.last_snapshot = time.monotonic()
+
+            signal.set_wakeup_fd(self._wakeup_w)
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD):
+                signal.signal(signum, self._on_signal)
+
+            serve_logger.info(f"Listening on {args.host}:{args.port} with {self.num_workers} workers")
+            for index in range(self.num_workers):
+                self.spawn(index)
+
+            while not self.stopping:
+                self.read_heartbeats(1.0)
+                self.handle_signals()
+                self.reap()
+                self.step_rolling_restart()
+                self.check_liveness()
+                if time.monotonic() - self.last_snapshot > args.snapshot_interval:
+                    self.refresh_snapshots()
+            self.shutdown()
+        finally:
+            shutil.rmtree(shared_dir, ignore_errors=True)
+
+    def shutdown(self):
+        serve_logger.info("Stopping workers")
+        for worker in self.workers.values():
+            self.kill(worker, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.read_heartbeats(0.2)
+            self.reap()
+        for worker in self.workers.values():
+            serve_logger.error(f"Worker {worker.index} (pid {worker.pid}) did not drain in time; killing")
+            self.kill(worker, signal.SIGKILL)
+        if self.sock is not None:
+            self.sock.close()
+
+def main():
+    from services.classification import CLASSIFIER_REFRESH_SECONDS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=None, help="default: WEB_CONCURRENCY, else one per CPU")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds to drain in-flight requests")
+    parser.add_argument("--timeout", type=int, default=60, help="kill workers silent for this long")
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--snapshot-interval", type=int, default=CLASSIFIER_REFRESH_SECONDS)
+    parser.add_argument("--no-preload", dest="preload", action="store_false")
+    parser.add_argument("--proxy-headers", action="store_true")
+    parser.add_argument("--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s [%(process)d] %(name)s: %(message)s")
+    args.workers = configure_workers(args.workers)
+    Supervisor(args).run()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
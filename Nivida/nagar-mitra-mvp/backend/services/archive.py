@@ -0,0 +1,156 @@
+"""
+Hot/cold tiering for issues
+Resolved and rejected issues older than ARCHIVE_AFTER_DAYS are moved, with their media
+rows, from `issues`/`issue_media` into `issues_archive`/`issue_media_archive` in batches,
+one transaction per batch. Listings only ever see the small hot tables; single-issue
+reads fall back to the archive, writes move an archived issue back first, and
+analytics read both tiers through issues_both_tiers().
+"""
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import DateTime, delete, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from models.archive import issue_media_archive, issues_archive
+from models.issue import Issue, IssueMedia, IssueStatus
+from utils.serialization import ISSUE_FIELDS, MEDIA_FIELDS
+
+archive_logger = logging.getLogger("archive")
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# Batches per job run, so one run never holds the database for long
+ARCHIVE_MAX_BATCHES = int(os.getenv("ARCHIVE_MAX_BATCHES", "20"))
+ARCHIVE_INTERVAL_SECONDS = 3600
+
+CLOSED_STATUSES = (IssueStatus.RESOLVED, IssueStatus.REJECTED)
+
+_issues = Issue.__table__
+_media = IssueMedia.__table__
+_ISSUE_COLUMNS = [column.name for column in _issues.columns]
+_MEDIA_COLUMNS = [column.name for column in _media.columns]
+
+def _archive_batch(db: Session, issue_ids: List[int]):
+    """Copy issues and their media to the archive and delete them from the hot tables"""
+    archived_at = literal(datetime.utcnow(), DateTime(timezone=True)).label("archived_at")
+    db.execute(insert(issues_archive).from_select(
+        _ISSUE_COLUMNS + ["archived_at"],
+        select(*_issues.columns, archived_at).where(_issues.c.id.in_(issue_ids)),
+    ))
+    db.execute(insert(issue_media_archive).from_select(
+        _MEDIA_COLUMNS + ["archived_at"],
+        select(*_media.columns, archived_at).where(_media.c.issue_id.in_(issue_ids)),
+    ))
+    db.execute(delete(_media).where(_media.c.issue_id.in_(issue_ids)))
+    db.execute(delete(_issues).where(_issues.c.id.in_(issue_ids)))
+
+def archive_closed_issues(
+    db: Session,
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None
+) -> int:
+    """Move closed issues past the age cutoff to the archive; returns issues moved"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    # Rejected issues have no resolved_at; their last update is when they were closed
+    closed_at = func.coalesce(_issues.c.resolved_at, _issues.c.updated_at, _issues.c.created_at)
+    moved = 0
+    batches = 0
+    last_id = 0
+    while max_batches is None or batches < max_batches:
+        # Locks the batch where supported, so a concurrent reopen waits or is skipped
+        issue_ids = db.execute(
+            select(_issues.c.id)
+            .where(
+                _issues.c.status.in_(CLOSED_STATUSES), closed_at < cutoff, _issues.c.id > last_id,
+                _issues.c.deleted_at.is_(None)  # deleted issues are purged, not archived
+            )
+            .order_by(_issues.c.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not issue_ids:
+            break
+        last_id = issue_ids[-1]
+        _archive_batch(db, issue_ids)
+        db.commit()
+        moved += len(issue_ids)
+        batches += 1
+    if moved:
+        archive_logger.info(f"Archived {moved} closed issues")
+    return moved
+
+def run_archive(db: Session):
+    """Periodic job entry point"""
+    archive_closed_issues(db, max_batches=ARCHIVE_MAX_BATCHES)
+
+def get_archived_issue(db: Session, issue_id: int) -> Optional[Dict[str, Any]]:
+    """An archived issue as an IssueResponse-shaped dict, or None"""
+    row = db.execute(
+        select(*(issues_archive.c[name] for name in ISSUE_FIELDS)).where(issues_archive.c.id == issue_id)
+    ).first()
+    if row is None:
+        return None
+    issue = dict(zip(ISSUE_FIELDS, row))
+    media_rows = db.execute(
+        select(*(issue_media_archive.c[name] for name in MEDIA_FIELDS))
+        .where(issue_media_archive.c.issue_id == issue_id)
+        .order_by(issue_media_archive.c.id)
+    ).all()
+    issue["media"] = [dict(zip(MEDIA_FIELDS, media)) for media in media_rows]
+    return issue
+
+def get_archived_media(db: Session, issue_id: int, media_id: int):
+    """(file_path, original_filename) of an archived media row, or None"""
+    return db.execute(
+        select(issue_media_archive.c.file_path, issue_media_archive.c.original_filename).where(
+            issue_media_archive.c.id == media_id, issue_media_archive.c.issue_id == issue_id
+        )
+    ).first()
+
+def restore_issue(db: Session, issue_id: int) -> Optional[Issue]:
+    """Move an archived issue back to the hot tables (not committed); None if not archived"""
+    exists = db.execute(
+        select(issues_archive.c.id).where(issues_archive.c.id == issue_id).with_for_update()
+    ).first()
+    if exists is None:
+        return None
+    db.execute(insert(_issues).from_select(
+        _ISSUE_COLUMNS,
+        select(*(issues_archive.c[name] for name in _ISSUE_COLUMNS)).where(issues_archive.c.id == issue_id),
+    ))
+    db.execute(insert(_media).from_select(
+        _MEDIA_COLUMNS,
+        select(*(issue_media_archive.c[name] for name in _MEDIA_COLUMNS))
+        .where(issue_media_archive.c.issue_id == issue_id),
+    ))
+    db.execute(delete(issue_media_archive).where(issue_media_archive.c.issue_id == issue_id))
+    db.execute(delete(issues_archive).where(issues_archive.c.id == issue_id))
+    archive_logger.info(f"Restored issue {issue_id} from the archive")
+    return db.query(Issue).filter(Issue.id == issue_id).first()
+
+def get_issue_or_restore(db: Session, issue_id: int) -> Optional[Issue]:
+    """The hot issue, moving it back from the archive first if needed (for writes)"""
+    issue = db.query(Issue).filter(Issue.id == issue_id).first()
+    if issue is None:
+        issue = restore_issue(db, issue_id)
+    return issue
+
+def issues_both_tiers(*names: str, created_from: Optional[date] = None, created_to: Optional[date] = None):
+    """Subquery over hot and archived issues with the given columns, for analytics
+
+    The optional creation date range (both ends inclusive) is applied inside each
+    branch, so partitioned tables only scan the matching months.
+    """
+    branches = []
+    for table in (_issues, issues_archive):
+        statement = select(*(table.c[name] for name in names)).where(table.c.deleted_at.is_(None))
+        if created_from:
+            statement = statement.where(table.c.created_at >= datetime.combine(created_from, time.min))
+        if created_to:
+            statement = statement.where(table.c.created_at < datetime.combine(created_to + timedelta(days=1), time.min))
+        branches.append(statement)
+    return union_all(*branches).subquery("all_issues")
\ No newline at end of file
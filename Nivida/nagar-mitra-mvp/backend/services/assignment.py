@@ -0,0 +1,385 @@
+"""
+Automatic worker assignment with load balancing
+Open-issue counts per worker live in per-department min-heaps that are updated
+incrementally as issues are assigned and closed, so picking a worker never runs a
+count query. The least-loaded candidates are then scored on specialization match
+and on distance to the centroid of the worker's open issues.
+"""
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from models.issue import Issue, IssueStatus
+from models.issue_event import AUTOMATIC_ASSIGNMENT, IssueEventType
+from models.worker import Worker
+from services.issue_events import issue_event_params, record_issue_event, record_issue_events
+from services.realtime import publish_issue_event
+from utils.text import canonical_term, term_set
+
+assignment_logger = logging.getLogger("assignment")
+
+# Statuses that count towards a worker's load
+OPEN_STATUSES = (IssueStatus.ASSIGNED, IssueStatus.IN_PROGRESS)
+
+# How many of the least-loaded workers are scored per decision
+CANDIDATES_PER_DECISION = 8
+# A specialization match is worth this many open issues
+SPECIALIZATION_BONUS = 2.0
+# Open-issue equivalents per kilometre from the worker's current area
+DISTANCE_WEIGHT = 0.5
+# Counts are rebuilt from the database this often to absorb changes made by other processes
+# (serve.py lowers the default when running several workers)
+REFRESH_SECONDS = int(os.getenv("ASSIGNMENT_REFRESH_SECONDS", "300"))
+
+# Issue words that indicate a specialization, keyed by specialization stem
+SPECIALIZATION_KEYWORDS = {
+    "plumb": {"pipe", "leak", "tap", "drain", "drainage", "sewage", "water", "supply"},
+    "elect": {"electricity", "power", "outage", "transformer", "wire", "streetlight", "meter", "pole"},
+    "road": {"road", "pothole", "footpath", "construction", "maintenance"},
+    "waste": {"garbage", "waste", "trash", "dustbin", "disposal", "sweeping"},
+    "secur": {"safety", "security", "crime", "police", "emergency"},
+}
+
+_SPECIALIZATION_TERMS = {
+    prefix: {canonical_term(word) for word in words} for prefix, words in SPECIALIZATION_KEYWORDS.items()
+}
+
+def _stems(text: str) -> Set[str]:
+    return {word[:5] for word in term_set(text or "")}
+
+def _words(text: str) -> Set[str]:
+    return term_set(text or "")
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+class WorkerLoad:
+    """Incrementally maintained load of one worker"""
+
+    __slots__ = ("worker_id", "department_id", "specialization", "keywords",
+                 "open_count", "lat_sum", "lon_sum", "located", "version")
+
+    def __init__(self, worker_id: int, department_id: int, specialization: Optional[str]):
+        self.worker_id = worker_id
+        self.department_id = department_id
+        self.specialization = _stems(specialization)
+        self.keywords = set()
+        for stem in self.specialization:
+            for prefix, words in _SPECIALIZATION_TERMS.items():
+                if stem.startswith(prefix) or prefix.startswith(stem):
+                    self.keywords |= words
+        self.open_count = 0
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+        self.located = 0
+        self.version = 0
+
+    def centroid(self) -> Optional[Tuple[float, float]]:
+        if not self.located:
+            return None
+        return self.lat_sum / self.located, self.lon_sum / self.located
+
+    def matches(self, words: Set[str]) -> bool:
+        return bool(self.keywords & words) or bool(self.specialization & {w[:5] for w in words})
+
+class AssignmentEngine:
+    """Picks workers for issues using per-department load heaps"""
+
+    def __init__(self):
+        self._workers: Dict[int, WorkerLoad] = {}
+        self._department_sizes: Dict[int, int] = {}
+        # department_id -> heap of (open_count, worker_id, version); stale entries are skipped
+        self._heaps: Dict[int, List[Tuple[int, int, int]]] = {}
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+
+    def load(self, db: Session):
+        """(Re)build worker loads with one grouped query"""
+        workers = db.execute(
+            select(Worker.id, Worker.department_id, Worker.specialization).where(
+                Worker.is_active == True,
+                Worker.is_available == True
+            )
+        ).all()
+        loads = {row.id: WorkerLoad(row.id, row.department_id, row.specialization) for row in workers}
+
+        open_stats = db.execute(
+            select(
+                Issue.worker_id,
+                func.count(Issue.id),
+                func.sum(Issue.latitude),
+                func.sum(Issue.longitude),
+                func.count(Issue.latitude),
+            ).where(
+                Issue.worker_id.isnot(None),
+                Issue.status.in_(OPEN_STATUSES)
+            ).group_by(Issue.worker_id)
+        ).all()
+        for worker_id, count, lat_sum, lon_sum, located in open_stats:
+            load = loads.get(worker_id)
+            if load is not None:
+                load.open_count = count
+                load.lat_sum = lat_sum or 0.0
+                load.lon_sum = lon_sum or 0.0
+                load.located = located
+
+        with self._lock:
+            self._workers = loads
+            self._department_sizes = {}
+            for load in loads.values():
+                self._department_sizes[load.department_id] = self._department_sizes.get(load.department_id, 0) + 1
+            self._heaps = {}
+            for department_id in self._department_sizes:
+                self._rebuild_heap(department_id)
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, db: Session):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > REFRESH_SECONDS:
+            self.load(db)
+
+    def open_count(self, worker_id: int) -> Optional[int]:
+        load = self._workers.get(worker_id)
+        return load.open_count if load else None
+
+    def _rebuild_heap(self, department_id: int):
+        heap = [
+            (load.open_count, load.worker_id, load.version)
+            for load in self._workers.values() if load.department_id == department_id
+        ]
+        heapq.heapify(heap)
+        self._heaps[department_id] = heap
+
+    def _push(self, load: WorkerLoad):
+        load.version += 1
+        heap = self._heaps.setdefault(load.department_id, [])
+        heapq.heappush(heap, (load.open_count, load.worker_id, load.version))
+        # Lazy invalidation leaves stale entries behind; compact when they dominate
+        if len(heap) > 4 * self._department_sizes.get(load.department_id, 1) + 16:
+            self._rebuild_heap(load.department_id)
+
+    def choose_worker(
+        self,
+        department_id: Optional[int],
+        text: str = "",
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None
+    ) -> Optional[int]:
+        """Return the best worker id for an issue, or None if the department has no one available"""
+        if department_id is None:
+            return None
+
+        with self._lock:
+            heap = self._heaps.get(department_id)
+            if not heap:
+                return None
+
+            candidates: List[WorkerLoad] = []
+            while heap and len(candidates) < CANDIDATES_PER_DECISION:
+                count, worker_id, version = heapq.heappop(heap)
+                load = self._workers.get(worker_id)
+                if load is None or load.version != version:
+                    continue  # stale entry
+                candidates.append(load)
+
+            # Candidates were only peeked at; their entries go back unchanged
+            for load in candidates:
+                heapq.heappush(heap, (load.open_count, load.worker_id, load.version))
+            if not candidates:
+                return None
+
+            words = _words(text)
+            best_id, best_score = None, None
+            for load in candidates:
+                score = float(load.open_count)
+                if words and load.matches(words):
+                    score -= SPECIALIZATION_BONUS
+                centroid = load.centroid()
+                if centroid is not None and latitude is not None and longitude is not None:
+                    score += DISTANCE_WEIGHT * haversine_km(latitude, longitude, *centroid)
+                if best_score is None or score < best_score:
+                    best_id, best_score = load.worker_id, score
+            return best_id
+
+    def _adjust(self, worker_id: Optional[int], delta: int, latitude: Optional[float], longitude: Optional[float]):
+        load = self._workers.get(worker_id) if worker_id is not None else None
+        if load is None:
+            return
+        load.open_count = max(0, load.open_count + delta)
+        if latitude is not None and longitude is not None:
+            load.lat_sum += delta * latitude
+            load.lon_sum += delta * longitude
+            load.located = max(0, load.located + delta)
+        self._push(load)
+
+    def on_issue_change(
+        self,
+        old_worker_id: Optional[int],
+        old_status: Optional[IssueStatus],
+        new_worker_id: Optional[int],
+        new_status: Optional[IssueStatus],
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None
+    ):
+        """Apply an issue's worker/status transition to the load counts"""
+        was_open = old_worker_id is not None and old_status in OPEN_STATUSES
+        is_open = new_worker_id is not None and new_status in OPEN_STATUSES
+        if was_open and is_open and old_worker_id == new_worker_id:
+            return
+        with self._lock:
+            if was_open:
+                self._adjust(old_worker_id, -1, latitude, longitude)
+            if is_open:
+                self._adjust(new_worker_id, 1, latitude, longitude)
+
+# Global engine instance (one per worker process)
+assignment_engine = AssignmentEngine()
+
+def get_assignment_engine(db: Session) -> AssignmentEngine:
+    """Get the assignment engine, loading worker counts on first use"""
+    assignment_engine.ensure_loaded(db)
+    return assignment_engine
+
+_issues = Issue.__table__
+
+# Only unassigned pending issues are assigned automatically; the guard is part of the
+# UPDATE so an issue assigned or closed meanwhile by another request is left alone
+_assignable = (_issues.c.status == IssueStatus.PENDING, _issues.c.worker_id.is_(None))
+_assign_statement = update(_issues).where(_issues.c.id == bindparam("issue_id"), *_assignable).values(
+    worker_id=bindparam("assigned_worker_id"),
+    status=IssueStatus.ASSIGNED,
+    needs_manual_review=False,
+)
+
+def _assign_rows(db: Session, params: List[Dict[str, int]]) -> Set[int]:
+    """Run the guarded assignment UPDATEs (not committed); returns the issue ids updated"""
+    if db.get_bind().dialect.supports_sane_multi_rowcount:
+        if db.execute(_assign_statement, params).rowcount == len(params):
+            return {param["issue_id"] for param in params}
+        # Some issues changed since they were read: find out which, one at a time
+        db.rollback()
+    return {param["issue_id"] for param in params if db.execute(_assign_statement, param).rowcount == 1}
+
+def auto_assign_issue(db: Session, issue: Issue, actor_id: Optional[int] = None) -> Optional[int]:
+    """Pick a worker for one pending issue and assign it; returns the worker id or None
+
+    Raises ValueError when the issue is not pending and unassigned.
+    """
+    if issue.status != IssueStatus.PENDING or issue.worker_id is not None:
+        raise ValueError("Only pending, unassigned issues can be auto-assigned")
+    engine = get_assignment_engine(db)
+    worker_id = engine.choose_worker(
+        issue.department_id, f"{issue.title} {issue.description}", issue.latitude, issue.longitude
+    )
+    if worker_id is None:
+        return None
+
+    result = db.execute(
+        update(_issues)
+        .where(_issues.c.id == issue.id, *_assignable)
+        .values(worker_id=worker_id, status=IssueStatus.ASSIGNED, needs_manual_review=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise ValueError("Only pending, unassigned issues can be auto-assigned")
+    db.refresh(issue)
+    record_issue_event(db, issue, IssueEventType.ASSIGNED, actor_id, value=AUTOMATIC_ASSIGNMENT)
+    db.commit()
+    engine.on_issue_change(None, IssueStatus.PENDING, worker_id, IssueStatus.ASSIGNED, issue.latitude, issue.longitude)
+    return worker_id
+
+_PENDING_COLUMNS = (
+    Issue.id, Issue.title, Issue.description, Issue.latitude, Issue.longitude,
+    Issue.department_id, Issue.user_id, Issue.upvotes, Issue.downvotes, Issue.priority,
+)
+
+def auto_assign_pending(
+    db: Session,
+    limit: Optional[int] = None,
+    include_review: bool = False,
+    batch_size: int = 500,
+    actor_id: Optional[int] = None
+) -> Dict[str, int]:
+    """Assign the pending queue (oldest first) in batches; returns counts
+
+    Within a batch, chosen workers are provisionally charged so the batch spreads
+    over them. The engine keeps only the assignments a batch's commit made; rows
+    changed meanwhile by another request are skipped by the guarded UPDATE.
+    Counts are reloaded first: other processes may have assigned or closed issues.
+    """
+    engine = assignment_engine
+    engine.load(db)
+    filters = [
+        Issue.status == IssueStatus.PENDING,
+        Issue.worker_id.is_(None),
+        Issue.department_id.isnot(None),
+    ]
+    if not include_review:
+        filters.append(Issue.needs_manual_review == False)
+
+    summary = {"assigned": 0, "unassigned": 0}
+    last_id = 0
+    while limit is None or summary["assigned"] + summary["unassigned"] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - summary["assigned"] - summary["unassigned"])
+        # Keyset paging keeps each batch an index range read
+        rows = db.execute(
+            select(*_PENDING_COLUMNS).where(*filters, Issue.id > last_id).order_by(Issue.id).limit(size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        chosen = []  # (row, worker id)
+        try:
+            for row in rows:
+                worker_id = engine.choose_worker(
+                    row.department_id, f"{row.title} {row.description}", row.latitude, row.longitude
+                )
+                if worker_id is None:
+                    summary["unassigned"] += 1
+                    continue
+                engine.on_issue_change(None, None, worker_id, IssueStatus.ASSIGNED, row.latitude, row.longitude)
+                chosen.append((row, worker_id))
+
+            updated = _assign_rows(db, [{"issue_id": row.id, "assigned_worker_id": worker_id} for row, worker_id in chosen]) \
+                if chosen else set()
+            summary["unassigned"] += len(chosen) - len(updated)
+            assigned_rows = [
+                SimpleNamespace(
+                    id=row.id, user_id=row.user_id, department_id=row.department_id,
+                    worker_id=worker_id, status=IssueStatus.ASSIGNED, priority=row.priority,
+                    needs_manual_review=False, upvotes=row.upvotes, downvotes=row.downvotes,
+                    latitude=row.latitude, longitude=row.longitude,
+                )
+                for row, worker_id in chosen if row.id in updated
+            ]
+            record_issue_events(db, [
+                issue_event_params(issue, IssueEventType.ASSIGNED, actor_id, value=AUTOMATIC_ASSIGNMENT)
+                for issue in assigned_rows
+            ])
+            db.commit()
+        finally:
+            # Undo the provisional charges; only committed assignments are applied below
+            for row, worker_id in chosen:
+                engine.on_issue_change(worker_id, IssueStatus.ASSIGNED, None, None, row.latitude, row.longitude)
+
+        for issue in assigned_rows:
+            engine.on_issue_change(None, None, issue.worker_id, IssueStatus.ASSIGNED, issue.latitude, issue.longitude)
+        summary["assigned"] += len(assigned_rows)
+        for issue in assigned_rows:
+            publish_issue_event(issue, "assigned")
+
+    assignment_logger.info(f"Auto-assigned {summary['assigned']} issues, {summary['unassigned']} left unassigned")
+    return summary
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""
+Bulk import and export of issues
+Imports are parsed record by record from a spooled upload, classified in batches and
+inserted with executemany in chunked transactions; exports stream rows from a
+server-side cursor so memory stays flat regardless of table size
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from enum import Enum
+from types import SimpleNamespace
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.issue import Issue, IssueStatus, IssuePriority
+from models.issue_event import IssueEventType
+from models.user import User
+from services.classification import get_classifier
+from services.issue_events import issue_event_params, record_issue_events
+from services.prioritization import compute_urgency, sla_due_at
+from services.ranking import hot_score
+from utils.geo import geo_cells
+from utils.metrics import timed
+from utils.serialization import ISSUE_COLUMNS, ISSUE_FIELDS, dumps
+
+bulk_logger = logging.getLogger("bulk_issues")
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 50
+
+class ImportRecordError(ValueError):
+    """Raised when an import record cannot be turned into an issue row"""
+
+def iter_ndjson_records(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """Yield one dict per non-empty NDJSON line"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"_error": f"line {line_number}: invalid JSON ({e})"}
+            continue
+        if not isinstance(record, dict):
+            yield {"_error": f"line {line_number}: expected a JSON object"}
+            continue
+        yield record
+
+def iter_csv_records(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """Yield one dict per CSV row, using the header row as keys"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()
+
+def _optional_float(value: Any) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    return float(value)
+
+def _enum_value(enum_cls, value: Any, default):
+    if value in (None, ""):
+        return default
+    try:
+        return enum_cls(str(value).lower())
+    except ValueError:
+        raise ImportRecordError(f"invalid {enum_cls.__name__} '{value}'")
+
+def record_to_row(record: Dict[str, Any], default_user_id: int, now: datetime) -> Dict[str, Any]:
+    """Validate an import record and map it to an issues row (classification excluded)"""
+    if "_error" in record:
+        raise ImportRecordError(record["_error"])
+
+    title = (record.get("title") or "").strip()
+    description = (record.get("description") or "").strip()
+    if len(title) < 5:
+        raise ImportRecordError("title must be at least 5 characters long")
+    if len(description) < 10:
+        raise ImportRecordError("description must be at least 10 characters long")
+
+    try:
+        latitude = _optional_float(record.get("latitude"))
+        longitude = _optional_float(record.get("longitude"))
+    except (TypeError, ValueError):
+        raise ImportRecordError("latitude/longitude must be numbers")
+
+    created_at = record.get("created_at")
+    if created_at:
+        try:
+            created_at = datetime.fromisoformat(str(created_at))
+        except ValueError:
+            raise ImportRecordError(f"invalid created_at '{created_at}'")
+    else:
+        created_at = now
+
+    status = _enum_value(IssueStatus, record.get("status"), IssueStatus.PENDING)
+    resolved_at = created_at if status == IssueStatus.RESOLVED else None
+
+    user_id = record.get("user_id")
+    try:
+        user_id = int(user_id) if user_id not in (None, "") else default_user_id
+    except (TypeError, ValueError):
+        raise ImportRecordError(f"invalid user_id '{user_id}'")
+
+    return {
+        "title": title[:200],
+        "description": description,
+        "category": (record.get("category") or "").strip() or None,
+        "status": status,
+        "priority": _enum_value(IssuePriority, record.get("priority"), None),
+        "latitude": latitude,
+        "longitude": longitude,
+        "address": (record.get("address") or "").strip() or None,
+        "user_id": user_id,
+        "created_at": created_at,
+        "resolved_at": resolved_at,
+        "upvotes": 0,
+        "downvotes": 0,
+    }
+
+def _insert_batch(db: Session, classifier, rows: List[Dict[str, Any]], default_user_id: int, now: datetime) -> int:
+    """Classify, score and insert one chunk in its own transaction"""
+    # Unknown reporters would violate the users foreign key, attribute them to the importer
+    user_ids = {row["user_id"] for row in rows}
+    known = set(db.execute(select(User.id).where(User.id.in_(user_ids))).scalars())
+
+    with timed("classify_batch"):
+        results = classifier.classify_batch([(row["title"], row["description"]) for row in rows])
+    for row, (dept_id, confidence, needs_review) in zip(rows, results):
+        if row["user_id"] not in known:
+            row["user_id"] = default_user_id
+        row["department_id"] = dept_id
+        row["ai_confidence"] = confidence
+        row["needs_manual_review"] = needs_review
+        if not row["category"]:
+            row["category"] = classifier.get_category(dept_id)
+        if row["priority"] is None:
+            row["priority"], _ = classifier.detect_priority(row["title"], row["description"])
+        # Clustering is filled in by the next priority sweep
+        row["nearby_count"] = 0
+        row["sla_due_at"] = sla_due_at(row["priority"], row["created_at"])
+        row["urgency_score"] = compute_urgency(row["priority"], 0, 0, row["created_at"], 0, now)
+        row["hot_score"] = hot_score(0, 0, row["created_at"])
+        row.update(geo_cells(row["latitude"], row["longitude"]))
+
+    # A list of parameter sets makes SQLAlchemy use executemany (batched INSERT ... RETURNING)
+    issue_ids = db.execute(
+        insert(Issue.__table__).returning(Issue.__table__.c.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    # Imported issues enter the event log with their imported state
+    record_issue_events(db, [
+        issue_event_params(
+            SimpleNamespace(id=issue_id, worker_id=None, **row), IssueEventType.CREATED,
+            row["user_id"], when=row["created_at"]
+        )
+        for issue_id, row in zip(issue_ids, rows)
+    ])
+    db.commit()
+    return len(rows)
+
+def import_issues(
+    db: Session,
+    records: Iterable[Dict[str, Any]],
+    default_user_id: int,
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> Dict[str, Any]:
+    """Import issue records in chunks and return a summary"""
+    classifier = get_classifier(db)
+    now = datetime.utcnow()
+    summary = {"imported": 0, "skipped": 0, "errors": []}
+    batch: List[Dict[str, Any]] = []
+
+    for index, record in enumerate(records, start=1):
+        try:
+            batch.append(record_to_row(record, default_user_id, now))
+        except ImportRecordError as e:
+            summary["skipped"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append({"record": index, "error": str(e)})
+            continue
+
+        if len(batch) >= batch_size:
+            summary["imported"] += _insert_batch(db, classifier, batch, default_user_id, now)
+            batch = []
+
+    if batch:
+        summary["imported"] += _insert_batch(db, classifier, batch, default_user_id, now)
+
+    bulk_logger.info(f"Imported {summary['imported']} issues, skipped {summary['skipped']}")
+    return summary
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def iter_export(fmt: str, filters: list, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Stream issues as NDJSON or CSV chunks, one chunk per fetched batch"""
+    # The generator outlives the request handler, so it owns its session
+    db = SessionLocal()
+    try:
+        statement = select(*ISSUE_COLUMNS).where(*filters).order_by(Issue.id)
+        # yield_per turns on stream_results, i.e. a server-side cursor where supported
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(ISSUE_FIELDS)
+            for partition in result.partitions():
+                writer.writerows([_csv_value(value) for value in row] for row in partition)
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
+        else:
+            for partition in result.partitions():
+                yield b"".join(dumps(dict(zip(ISSUE_FIELDS, row))) + b"\n" for row in partition)
+    finally:
+        db.close()
\ No newline at end of file
@@ -1,29 +1,118 @@
 """
-Simple rule-based AI classification system for categorizing civic issues
-In production, this could be replaced with machine learning models
+Classification of civic issues into departments
+A statistical model (services.text_model) trained from admin decisions is used
+when one has been trained and activated; department keyword rules handle texts
+the model knows nothing about, and everything until a model exists.
 """
-import re
-from typing import Tuple, Optional
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Tuple, Optional
+import numpy as np
 from sqlalchemy.orm import Session
+import config
 from models.department import Department
+from models.issue import IssuePriority
+from services.shared_cache import get_shared_cache
+from utils.text import canonical_term, term_set
+
+# Words that raise an issue's priority, checked from most to least severe
+PRIORITY_KEYWORDS = {
+    IssuePriority.CRITICAL: {"fire", "electrocution", "collapse", "collapsed", "explosion", "gas",
+                             "accident", "injured", "sparking", "flood", "flooding", "emergency"},
+    IssuePriority.HIGH: {"contamination", "contaminated", "sewage", "overflow", "outage", "blocked",
+                         "dangerous", "hazard", "urgent", "children", "school", "hospital"},
+    IssuePriority.LOW: {"minor", "suggestion", "cosmetic", "paint", "request"},
+}
+_PRIORITY_TERMS = {
+    priority: {canonical_term(word): word for word in words} for priority, words in PRIORITY_KEYWORDS.items()
+}
+
+classification_logger = logging.getLogger("classification")
+
+# Keyword matches scoring below this share of a department's keywords go to manual review
+REVIEW_THRESHOLD = float(os.getenv("REVIEW_THRESHOLD", "0.3"))
+# Added to the reported confidence of keyword matches scoring at least BOOST_MIN_SCORE
+CONFIDENCE_BOOST = float(os.getenv("CONFIDENCE_BOOST", "0.2"))
+BOOST_MIN_SCORE = 0.5
+# Model predictions below this probability go to the manual review queue
+MODEL_REVIEW_THRESHOLD = float(os.getenv("MODEL_REVIEW_THRESHOLD", "0.6"))
+
+def _strings(values: List[str]) -> np.ndarray:
+    # Fixed-width unicode, so the array can be saved and memory-mapped as it is
+    return np.array(values, dtype=f"<U{max((len(value) for value in values), default=1) or 1}")
+
+def build_keyword_index(departments: Iterable[Tuple[int, str, Optional[str]]]) -> Dict[str, np.ndarray]:
+    """Keyword index arrays from (id, name, comma-separated keywords) of the active departments
+
+    Departments and their keywords keep the given order. Keywords are also listed by
+    canonical term (`sorted_terms`, `term_order`) so a text's terms are found with a
+    binary search, and categories are sorted by department id for the same reason.
+    """
+    dept_ids, dept_names, dept_sizes, keyword_dept, keywords, categories = [], [], [], [], [], {}
+    for dept_id, name, dept_keywords in departments:
+        if dept_keywords:
+            words = [kw.strip().lower() for kw in dept_keywords.split(',')]
+            keyword_dept.extend([len(dept_ids)] * len(words))
+            keywords.extend(words)
+            dept_ids.append(dept_id)
+            dept_names.append(name)
+            dept_sizes.append(len(words))
+        categories[dept_id] = name.split()[0].lower()
+    terms = _strings([canonical_term(kw) for kw in keywords])
+    term_order = np.argsort(terms, kind="stable")
+    category_ids = sorted(categories)
+    return {
+        "dept_ids": np.array(dept_ids, dtype=np.int64),
+        "dept_names": _strings(dept_names),
+        "dept_sizes": np.array(dept_sizes, dtype=np.int64),
+        "keyword_dept": np.array(keyword_dept, dtype=np.int64),
+        "keywords": _strings(keywords),
+        "sorted_terms": terms[term_order],
+        "term_order": term_order.astype(np.int64),
+        "category_ids": np.array(category_ids, dtype=np.int64),
+        "categories": _strings([categories[dept_id] for dept_id in category_ids]),
+    }
 
 class IssueClassifier:
-    def __init__(self, db: Session):
+    def __init__(self, db: Optional[Session], index: Optional[Dict[str, np.ndarray]] = None):
+        """Keyword rules from `index` (build_keyword_index arrays, used in place) or the database"""
         self.db = db
-        self._load_department_keywords()
+        # Trained text model (services.text_model.LinearTextModel), if any
+        self.model = None
+        if index is None:
+            departments = self.db.query(Department).filter(Department.is_active == True).all()
+            index = build_keyword_index((dept.id, dept.name, dept.keywords) for dept in departments)
+        self.index = index
     
-    def _load_department_keywords(self):
-        """Load department keywords from database"""
-        self.department_keywords = {}
-        departments = self.db.query(Department).filter(Department.is_active == True).all()
-        
-        for dept in departments:
-            if dept.keywords:
-                keywords = [kw.strip().lower() for kw in dept.keywords.split(',')]
-                self.department_keywords[dept.id] = {
-                    'name': dept.name,
-                    'keywords': keywords
-                }
+    def _keyword_hits(self, word_set) -> np.ndarray:
+        """Per keyword, whether its canonical term is among the text's terms"""
+        index = self.index
+        hits = np.zeros(len(index["keywords"]), dtype=bool)
+        if not word_set or not len(hits):
+            return hits
+        words = np.array(list(word_set))
+        sorted_terms = index["sorted_terms"]
+        starts = np.searchsorted(sorted_terms, words, "left")
+        ends = np.searchsorted(sorted_terms, words, "right")
+        term_order = index["term_order"]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if start < end:
+                hits[term_order[start:end]] = True
+        return hits
+    
+    def has_department(self, department_id: Optional[int]) -> bool:
+        """Whether an active department has this id"""
+        return self._category_position(department_id) is not None
+    
+    def _category_position(self, department_id: Optional[int]) -> Optional[int]:
+        category_ids = self.index["category_ids"]
+        if department_id is None or not len(category_ids):
+            return None
+        position = int(np.searchsorted(category_ids, department_id))
+        if position < len(category_ids) and category_ids[position] == department_id:
+            return position
+        return None
     
     def classify_issue(self, title: str, description: str) -> Tuple[Optional[int], float, bool]:
         """
@@ -36,65 +125,198 @@ class IssueClassifier:
         Returns:
             Tuple of (department_id, confidence_score, needs_manual_review)
         """
-        text = f"{title} {description}".lower()
-        
-        # Remove punctuation and split into words
-        words = re.findall(r'\b\w+\b', text)
-        word_set = set(words)
-        
-        # Calculate match scores for each department
-        dept_scores = {}
-        
-        for dept_id, dept_info in self.department_keywords.items():
-            keywords = dept_info['keywords']
-            matches = sum(1 for keyword in keywords if keyword in word_set)
-            
-            if matches > 0:
-                # Calculate confidence based on keyword matches
-                confidence = min(matches / len(keywords), 1.0)
-                dept_scores[dept_id] = confidence
+        if self.model is not None:
+            return self.classify_batch([(title, description)])[0]
+        return self.classify_keywords(title, description)
+    
+    def classify_keywords(self, title: str, description: str) -> Tuple[Optional[int], float, bool]:
+        """Keyword-rule classification (the fallback for the trained model)"""
+        return self._keyword_decision(*self.best_keyword_match(title, description))
+    
+    def keyword_scores(self, title: str, description: str) -> Dict[int, float]:
+        """Raw keyword score (share of the department's keywords present) per matching department"""
+        # Normalized, transliterated and stemmed terms (shared cache, see utils.text)
+        hits = self._keyword_hits(term_set(f"{title} {description}"))
+        if not hits.any():
+            return {}
         
+        # Confidence is the share of each department's keywords present, in department order
+        index = self.index
+        matches = np.bincount(index["keyword_dept"][hits], minlength=len(index["dept_ids"]))
+        return {
+            int(index["dept_ids"][position]): min(int(matches[position]) / int(index["dept_sizes"][position]), 1.0)
+            for position in np.flatnonzero(matches).tolist()
+        }
+    
+    def best_keyword_match(self, title: str, description: str) -> Tuple[Optional[int], float]:
+        """(department_id, raw score) of the best keyword match, (None, 0.0) without any"""
+        dept_scores = self.keyword_scores(title, description)
         if not dept_scores:
+            return None, 0.0
+        best_dept_id = max(dept_scores, key=dept_scores.get)
+        return best_dept_id, dept_scores[best_dept_id]
+    
+    @staticmethod
+    def _keyword_decision(dept_id: Optional[int], score: float) -> Tuple[Optional[int], float, bool]:
+        if dept_id is None:
             # No matches found - needs manual review
             return None, 0.0, True
         
-        # Get department with highest score
-        best_dept_id = max(dept_scores, key=dept_scores.get)
-        best_confidence = dept_scores[best_dept_id]
-        
         # If confidence is too low, flag for manual review
-        needs_manual_review = best_confidence < 0.3
+        needs_manual_review = score < REVIEW_THRESHOLD
         
         # Boost confidence for multiple keyword matches
-        if best_confidence >= 0.5:
-            best_confidence = min(best_confidence + 0.2, 1.0)
+        if score >= BOOST_MIN_SCORE:
+            score = min(score + CONFIDENCE_BOOST, 1.0)
+        
+        return dept_id, score, needs_manual_review
+    
+    def classify_batch(self, items: Iterable[Tuple[str, str]]) -> List[Tuple[Optional[int], float, bool]]:
+        """Classify (title, description) pairs; the model scores the whole batch at once"""
+        return [
+            (dept_id, score, score < MODEL_REVIEW_THRESHOLD) if from_model else self._keyword_decision(dept_id, score)
+            for dept_id, score, from_model in self.raw_scores(items)
+        ]
+    
+    def raw_scores(self, items: Iterable[Tuple[str, str]]) -> List[Tuple[Optional[int], float, bool]]:
+        """(department_id, raw score, from_model) per pair, before review flags and boosts
+        
+        The score is the model probability, or the keyword score when the keyword
+        rules decided (no model, or a text the model cannot judge).
+        """
+        items = list(items)
+        model = self.model
+        if model is None or not items:
+            return [(*self.best_keyword_match(title, description), False) for title, description in items]
+        
+        best, confidence, known = model.predict_batch([f"{title} {description}" for title, description in items])
+        results = []
+        for (title, description), index, probability, has_features in zip(items, best, confidence, known):
+            dept_id = int(model.classes[index])
+            if not has_features or not self.has_department(dept_id):
+                # Nothing the model has seen, or a department that no longer exists
+                results.append((*self.best_keyword_match(title, description), False))
+            else:
+                results.append((dept_id, float(probability), True))
+        return results
+    
+    def detect_priority(self, title: str, description: str) -> Tuple[IssuePriority, List[str]]:
+        """Return (priority, matched priority keywords) for an issue's text"""
+        word_set = term_set(f"{title} {description}")
         
-        return best_dept_id, best_confidence, needs_manual_review
+        for priority in (IssuePriority.CRITICAL, IssuePriority.HIGH, IssuePriority.LOW):
+            terms = _PRIORITY_TERMS[priority]
+            matched = sorted({terms[term] for term in terms.keys() & word_set})
+            if matched:
+                return priority, matched
+        return IssuePriority.MEDIUM, []
+    
+    def get_category(self, department_id: Optional[int]) -> str:
+        """Category slug for a department (leading word of its name), "general" if unknown"""
+        position = self._category_position(department_id)
+        return str(self.index["categories"][position]) if position is not None else "general"
     
     def get_category_suggestions(self, text: str, limit: int = 3) -> list:
         """Get category suggestions for given text"""
-        words = re.findall(r'\b\w+\b', text.lower())
-        word_set = set(words)
+        index = self.index
+        matched: Dict[int, List[str]] = {}
+        for position in np.flatnonzero(self._keyword_hits(term_set(text))).tolist():
+            matched.setdefault(int(index["keyword_dept"][position]), []).append(str(index["keywords"][position]))
         
         suggestions = []
         
-        for dept_id, dept_info in self.department_keywords.items():
-            keywords = dept_info['keywords']
-            matches = sum(1 for keyword in keywords if keyword in word_set)
-            
-            if matches > 0:
-                confidence = matches / len(keywords)
-                suggestions.append({
-                    'department_id': dept_id,
-                    'department_name': dept_info['name'],
-                    'confidence': confidence,
-                    'matched_keywords': [kw for kw in keywords if kw in word_set]
-                })
+        for dept, keywords in sorted(matched.items()):
+            suggestions.append({
+                'department_id': int(index["dept_ids"][dept]),
+                'department_name': str(index["dept_names"][dept]),
+                'confidence': len(keywords) / int(index["dept_sizes"][dept]),
+                'matched_keywords': keywords
+            })
         
         # Sort by confidence and return top suggestions
         suggestions.sort(key=lambda x: x['confidence'], reverse=True)
         return suggestions[:limit]
 
+# Departments change rarely; reload the keyword index at most this often
+CLASSIFIER_REFRESH_SECONDS = 300
+
+_classifier: Optional[IssueClassifier] = None
+_classifier_loaded_at = 0.0
+
+# Name of the index snapshot published by the serving supervisor (see services.shared_cache)
+CLASSIFIER_INDEX_SNAPSHOT = "classifier_index"
+
+# How often the active model pointer is checked, so a newly trained model is picked up
+MODEL_CHECK_SECONDS = 10
+MODEL_POINTER = "CURRENT"
+
+_model = None
+_model_version: Optional[str] = None
+_model_checked_at = float("-inf")
+
+def current_model_version() -> Optional[str]:
+    """Name of the active model version directory, None when no model is active"""
+    try:
+        with open(os.path.join(config.CLASSIFIER_MODEL_DIR, MODEL_POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def get_text_model():
+    """The active trained model, hot-swapped when the CURRENT pointer changes"""
+    global _model, _model_version, _model_checked_at
+    now = time.monotonic()
+    if now - _model_checked_at < MODEL_CHECK_SECONDS:
+        return _model
+    _model_checked_at = now
+    version = current_model_version()
+    if version != _model_version:
+        if version is None:
+            _model = None
+        else:
+            try:
+                # NumPy is only imported once a model exists
+                from services.text_model import TOKENIZER_VERSION, LinearTextModel
+                model = LinearTextModel.load(os.path.join(config.CLASSIFIER_MODEL_DIR, version))
+                if model.meta.get("tokenizer") != TOKENIZER_VERSION:
+                    # Features were hashed from different tokens; wait for the next training run
+                    classification_logger.warning(f"Classifier model {version} uses an older tokenizer, not loaded")
+                    _model = None
+                else:
+                    _model = model
+                    classification_logger.info(f"Loaded classifier model {version}")
+            except Exception as e:
+                classification_logger.error(f"Could not load classifier model {version}: {str(e)}")
+        _model_version = version
+    return _model
+
 def get_classifier(db: Session) -> IssueClassifier:
-    """Get classifier instance"""
-    return IssueClassifier(db)
\ No newline at end of file
+    """Get the shared classifier, building it on first use and refreshing it periodically"""
+    global _classifier, _classifier_loaded_at
+    now = time.monotonic()
+    if _classifier is None or now - _classifier_loaded_at > CLASSIFIER_REFRESH_SECONDS:
+        shared_cache = get_shared_cache()
+        index = shared_cache.read_arrays(CLASSIFIER_INDEX_SNAPSHOT) if shared_cache is not None else None
+        if index is not None:
+            classifier = IssueClassifier(None, index)
+        else:
+            classifier = IssueClassifier(db)
+            # The index is all that is kept; do not hold on to the request's session
+            classifier.db = None
+        _classifier, _classifier_loaded_at = classifier, now
+    _classifier.model = get_text_model()
+    return _classifier
+
+def publish_classifier_index(db: Session) -> bool:
+    """Write the current keyword index to the shared cache; False outside the supervisor"""
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        return False
+    shared_cache.publish_arrays(CLASSIFIER_INDEX_SNAPSHOT, IssueClassifier(db).index)
+    return True
+
+def invalidate_classifier():
+    """Force a reload on next use, e.g. after departments, keywords or the model change"""
+    global _classifier, _model_checked_at
+    _classifier = None
+    _model_checked_at = float("-inf")
\ No newline at end of file
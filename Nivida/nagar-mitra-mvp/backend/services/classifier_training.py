@@ -0,0 +1,150 @@
+"""
+Training of the statistical department classifier
+Labels come from the event log: every issue an admin has assigned or moved to another
+department (ASSIGNED / DEPARTMENT_CHANGED events by an admin, excluding the assignment
+engine's own picks) is a labelled example of its current department. A candidate model
+is scored on a held-out split against the keyword rules and only activated when it is
+at least as accurate; activation writes the version directory first and then swaps
+the CURRENT pointer, which every worker picks up within MODEL_CHECK_SECONDS.
+"""
+import logging
+import os
+import random
+import shutil
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+import config
+from models.issue_event import AUTOMATIC_ASSIGNMENT, IssueEvent, IssueEventType
+from models.user import User
+from services.archive import issues_both_tiers
+from services.classification import (
+    MODEL_POINTER, IssueClassifier, current_model_version, get_classifier, invalidate_classifier
+)
+
+training_logger = logging.getLogger("classifier_training")
+
+MIN_TRAINING_SAMPLES = int(os.getenv("CLASSIFIER_MIN_SAMPLES", "50"))
+HOLDOUT_FRACTION = 0.2
+KEEP_MODEL_VERSIONS = 3
+CLASSIFIER_TRAIN_INTERVAL_SECONDS = 24 * 3600
+
+# Labelled sample count of the last run, so the job only retrains on new labels
+_last_sample_count: Optional[int] = None
+
+def labelled_issue_ids():
+    """Issues whose department an admin has decided"""
+    return (
+        select(IssueEvent.issue_id)
+        .join(User, User.id == IssueEvent.actor_id)
+        .where(
+            User.is_admin.is_(True),
+            IssueEvent.event_type.in_([int(IssueEventType.ASSIGNED), int(IssueEventType.DEPARTMENT_CHANGED)]),
+            or_(IssueEvent.value.is_(None), IssueEvent.value != AUTOMATIC_ASSIGNMENT),
+        )
+        .distinct()
+    )
+
+def load_training_data(db: Session) -> Tuple[List[str], List[int]]:
+    """(texts, department ids) of the labelled issues, hot and archived"""
+    issues = issues_both_tiers("id", "title", "description", "department_id")
+    rows = db.execute(
+        select(issues.c.title, issues.c.description, issues.c.department_id)
+        .where(issues.c.id.in_(labelled_issue_ids()), issues.c.department_id.isnot(None))
+        .order_by(issues.c.id)
+    ).all()
+    return [f"{row.title} {row.description}" for row in rows], [row.department_id for row in rows]
+
+def count_training_samples(db: Session) -> int:
+    return db.execute(select(func.count()).select_from(labelled_issue_ids().subquery())).scalar() or 0
+
+def _keyword_accuracy(classifier: IssueClassifier, texts: List[str], labels: List[int]) -> float:
+    correct = sum(
+        classifier.classify_keywords(text, "")[0] == label for text, label in zip(texts, labels)
+    )
+    return correct / len(labels)
+
+def _model_accuracy(model, texts: List[str], labels: List[int]) -> float:
+    best, _, _ = model.predict_batch(texts)
+    predicted = model.classes[best]
+    return float(sum(int(dept_id) == label for dept_id, label in zip(predicted, labels)) / len(labels))
+
+def _activate(directory: str, version: str):
+    """Point CURRENT at a saved version (atomic rename) and drop the oldest versions"""
+    pointer = os.path.join(directory, MODEL_POINTER)
+    with open(f"{pointer}.tmp", "w") as f:
+        f.write(version)
+    os.replace(f"{pointer}.tmp", pointer)
+    versions = sorted(name for name in os.listdir(directory) if name.startswith("v"))
+    for name in versions[:-KEEP_MODEL_VERSIONS]:
+        if name != version:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+def train_classifier(db: Session, force: bool = False, min_samples: int = MIN_TRAINING_SAMPLES) -> Dict[str, Any]:
+    """Train a model from admin decisions and activate it if it beats the keyword rules"""
+    from services.text_model import train_linear_model
+
+    texts, labels = load_training_data(db)
+    summary: Dict[str, Any] = {"samples": len(labels), "classes": len(set(labels)), "activated": False}
+    if len(labels) < min_samples or len(set(labels)) < 2:
+        summary["reason"] = f"need at least {min_samples} labelled issues in 2 departments"
+        return summary
+
+    order = list(range(len(labels)))
+    random.Random(42).shuffle(order)
+    holdout_size = max(1, int(len(order) * HOLDOUT_FRACTION))
+    test, train = order[:holdout_size], order[holdout_size:]
+    test_texts, test_labels = [texts[i] for i in test], [labels[i] for i in test]
+
+    candidate = train_linear_model([texts[i] for i in train], [labels[i] for i in train])
+    summary["model_accuracy"] = round(_model_accuracy(candidate, test_texts, test_labels), 4)
+    summary["keyword_accuracy"] = round(_keyword_accuracy(get_classifier(db), test_texts, test_labels), 4)
+    if summary["model_accuracy"] < summary["keyword_accuracy"] and not force:
+        summary["reason"] = "model is less accurate than the keyword rules on the holdout"
+        return summary
+
+    # Refit on everything for the activated model
+    model = train_linear_model(texts, labels)
+    version = f"v{datetime.utcnow():%Y%m%d%H%M%S%f}"
+    model.meta.update({
+        "version": version,
+        "trained_at": datetime.utcnow().isoformat(),
+        "samples": len(labels),
+        "model_accuracy": summary["model_accuracy"],
+        "keyword_accuracy": summary["keyword_accuracy"],
+    })
+    directory = config.CLASSIFIER_MODEL_DIR
+    model.save(os.path.join(directory, version))
+    _activate(directory, version)
+    invalidate_classifier()
+    training_logger.info(
+        f"Activated classifier model {version} ({len(labels)} samples, holdout accuracy "
+        f"{summary['model_accuracy']} vs keywords {summary['keyword_accuracy']})"
+    )
+    summary.update(activated=True, version=version)
+    return summary
+
+def get_model_info() -> Dict[str, Any]:
+    """The active model's metadata, or {"version": None} when keyword rules are in use"""
+    version = current_model_version()
+    if version is None:
+        return {"version": None}
+    info = {"version": version}
+    try:
+        from services.text_model import LinearTextModel
+        info.update(LinearTextModel.load(os.path.join(config.CLASSIFIER_MODEL_DIR, version)).meta)
+    except Exception as e:
+        info["error"] = str(e)
+    return info
+
+def run_classifier_training(db: Session):
+    """Periodic job entry point: retrain when new labels have arrived"""
+    global _last_sample_count
+    count = count_training_samples(db)
+    if count == _last_sample_count:
+        return
+    _last_sample_count = count
+    train_classifier(db)
\ No newline at end of file
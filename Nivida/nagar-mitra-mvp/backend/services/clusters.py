@@ -0,0 +1,230 @@
+"""
+Precomputed map clusters
+Issue locations are counted on a Web Mercator grid at every zoom level from 0 to
+CLUSTER_MAX_ZOOM, with 2**CELL_BITS cells across each 256px map tile. A row of
+issue_clusters holds the issues of one cell with one status: their number and the
+sums of their coordinates, so the cluster is drawn at sum / count. The event log
+(services.issue_events) applies deltas to these rows whenever an issue is created,
+changes status or is deleted, in the same transaction as the change. A map viewport
+is then one index range read whose size follows the viewport, not the issues in it.
+"""
+import logging
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from models.issue import Issue, IssueStatus
+from models.issue_cluster import IssueCluster
+from models.issue_event import IssueEvent, IssueEventType, STATUS_CODES
+from services.archive import issues_both_tiers
+
+clusters_logger = logging.getLogger("clusters")
+
+CLUSTER_MAX_ZOOM = 16
+# 4x4 cells per 256px tile: clusters about 64px apart on screen
+CELL_BITS = 2
+# Cells in one response; a viewport needs a few hundred
+CLUSTER_MAX_CELLS = 4096
+MAX_LATITUDE = 85.05112878  # Web Mercator limit
+
+# Events that add an issue to a status, move it to another one or remove it
+CLUSTER_EVENT_TYPES = {
+    int(IssueEventType.CREATED), int(IssueEventType.STATUS_CHANGED),
+    int(IssueEventType.ASSIGNED), int(IssueEventType.DELETED),
+}
+
+_GRID_SIZE = 1 << (CLUSTER_MAX_ZOOM + CELL_BITS)
+_clusters = IssueCluster.__table__
+_issues = Issue.__table__
+_events = IssueEvent.__table__
+
+# (zoom, cell_x, cell_y, status code) -> [count, lat_sum, lon_sum]
+Deltas = Dict[Tuple[int, int, int, int], List[float]]
+
+def grid_position(latitude: float, longitude: float) -> Tuple[int, int]:
+    """Cell of a coordinate on the grid of CLUSTER_MAX_ZOOM; coarser zooms shift it right"""
+    latitude = min(max(latitude, -MAX_LATITUDE), MAX_LATITUDE)
+    sin_lat = math.sin(math.radians(latitude))
+    x = (longitude + 180.0) / 360.0
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return (
+        min(max(int(x * _GRID_SIZE), 0), _GRID_SIZE - 1),
+        min(max(int(y * _GRID_SIZE), 0), _GRID_SIZE - 1),
+    )
+
+def _add_issue(deltas: Deltas, latitude: float, longitude: float, status_code: int, sign: int):
+    x, y = grid_position(latitude, longitude)
+    for zoom in range(CLUSTER_MAX_ZOOM + 1):
+        shift = CLUSTER_MAX_ZOOM - zoom
+        delta = deltas[(zoom, x >> shift, y >> shift, status_code)]
+        delta[0] += sign
+        delta[1] += sign * latitude
+        delta[2] += sign * longitude
+
+_upserts: Dict[str, Any] = {}
+
+def _upsert_statement(db: Session):
+    """INSERT ... ON CONFLICT adding to the existing row (SQLite and PostgreSQL)"""
+    dialect = db.get_bind().dialect.name
+    if dialect not in _upserts:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(_clusters)
+        _upserts[dialect] = statement.on_conflict_do_update(
+            index_elements=[_clusters.c.zoom, _clusters.c.cell_x, _clusters.c.cell_y, _clusters.c.status],
+            set_={
+                "count": _clusters.c.count + statement.excluded.count,
+                "lat_sum": _clusters.c.lat_sum + statement.excluded.lat_sum,
+                "lon_sum": _clusters.c.lon_sum + statement.excluded.lon_sum,
+            },
+        )
+    return _upserts[dialect]
+
+_delete_empty = delete(_clusters).where(
+    _clusters.c.zoom == bindparam("k_zoom"),
+    _clusters.c.cell_x == bindparam("k_x"),
+    _clusters.c.cell_y == bindparam("k_y"),
+    _clusters.c.status == bindparam("k_status"),
+    _clusters.c.count <= 0,
+)
+
+def apply_cluster_deltas(db: Session, deltas: Deltas):
+    """Add deltas to the cluster rows (not committed); cells left empty are removed"""
+    rows = [
+        {"zoom": zoom, "cell_x": x, "cell_y": y, "status": status, "count": int(count), "lat_sum": lat, "lon_sum": lon}
+        for (zoom, x, y, status), (count, lat, lon) in deltas.items()
+        if count
+    ]
+    if not rows:
+        return
+    db.execute(_upsert_statement(db), rows)
+    emptied = [
+        {"k_zoom": row["zoom"], "k_x": row["cell_x"], "k_y": row["cell_y"], "k_status": row["status"]}
+        for row in rows if row["count"] < 0
+    ]
+    if emptied:
+        db.execute(_delete_empty, emptied)
+
+# The issue's status before the event about to be logged: that of its latest event
+_previous_status = (
+    select(_events.c.status)
+    .where(_events.c.issue_id == _issues.c.id)
+    .order_by(_events.c.seq.desc())
+    .limit(1)
+    .scalar_subquery()
+)
+
+def track_issue_events(db: Session, params: List[Dict[str, Any]]):
+    """Update clusters for events about to be logged (issue_event_params dicts, at most one per issue)
+
+    Must run before the events are inserted: the previous status comes from the log.
+    """
+    events = {p["e_issue_id"]: p for p in params if p["e_type"] in CLUSTER_EVENT_TYPES}
+    if not events:
+        return
+    rows = db.execute(
+        select(_issues.c.id, _issues.c.latitude, _issues.c.longitude, _previous_status.label("previous"))
+        .where(_issues.c.id.in_(list(events)), _issues.c.latitude.isnot(None), _issues.c.longitude.isnot(None)),
+        execution_options={"include_deleted": True}
+    ).all()
+    deltas: Deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in rows:
+        event = events[row.id]
+        status = None if event["e_type"] == int(IssueEventType.DELETED) else event["e_status"]
+        if status == row.previous:
+            continue
+        if row.previous is not None:
+            _add_issue(deltas, row.latitude, row.longitude, row.previous, -1)
+        if status is not None:
+            _add_issue(deltas, row.latitude, row.longitude, status, 1)
+    apply_cluster_deltas(db, deltas)
+
+def parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """min_lon,min_lat,max_lon,max_lat; min_lon > max_lon crosses the antimeridian"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-180.0 <= min_lon <= 180.0 and -180.0 <= max_lon <= 180.0 and -90.0 <= min_lat <= max_lat <= 90.0):
+        raise ValueError("bbox is out of range")
+    return min_lon, min_lat, max_lon, max_lat
+
+def get_clusters(
+    db: Session, bbox: Tuple[float, float, float, float], zoom: int, status: Optional[IssueStatus] = None
+) -> Dict[str, Any]:
+    """Clusters of the grid cells in a bounding box at a map zoom level
+
+    Zooms past CLUSTER_MAX_ZOOM use its grid. Raises ValueError when the box
+    covers more than CLUSTER_MAX_CELLS cells at this zoom.
+    """
+    zoom = min(zoom, CLUSTER_MAX_ZOOM)
+    shift = CLUSTER_MAX_ZOOM - zoom
+    min_lon, min_lat, max_lon, max_lat = bbox
+    west, south = grid_position(min_lat, min_lon)
+    east, north = grid_position(max_lat, max_lon)
+    west, east, north, south = west >> shift, east >> shift, north >> shift, south >> shift
+    if west <= east:
+        x_ranges = [(west, east)]
+    else:
+        x_ranges = [(west, (_GRID_SIZE >> shift) - 1), (0, east)]
+    cells = sum(high - low + 1 for low, high in x_ranges) * (south - north + 1)
+    if cells > CLUSTER_MAX_CELLS:
+        raise ValueError("Bounding box is too large for this zoom level")
+
+    filters = [
+        _clusters.c.zoom == zoom,
+        or_(*(_clusters.c.cell_x.between(low, high) for low, high in x_ranges)),
+        _clusters.c.cell_y.between(north, south),
+    ]
+    if status:
+        filters.append(_clusters.c.status == STATUS_CODES[status])
+    count = func.sum(_clusters.c.count)
+    rows = db.execute(
+        select(_clusters.c.cell_x, _clusters.c.cell_y, count, func.sum(_clusters.c.lat_sum), func.sum(_clusters.c.lon_sum))
+        .where(*filters)
+        .group_by(_clusters.c.cell_x, _clusters.c.cell_y)
+        .having(count > 0)
+    ).all()
+    clusters = [
+        {"latitude": lat_sum / total, "longitude": lon_sum / total, "count": total, "cell": [x, y]}
+        for x, y, total, lat_sum, lon_sum in rows
+    ]
+    return {"zoom": zoom, "clusters": clusters, "total": sum(cluster["count"] for cluster in clusters)}
+
+def rebuild_issue_clusters(db: Session) -> int:
+    """Recompute every cluster from the issues of both tiers; returns issues counted"""
+    import numpy as np
+
+    all_issues = issues_both_tiers("latitude", "longitude", "status")
+    rows = db.execute(
+        select(all_issues.c.latitude, all_issues.c.longitude, all_issues.c.status)
+        .where(all_issues.c.latitude.isnot(None), all_issues.c.longitude.isnot(None))
+    ).all()
+    db.execute(delete(_clusters))
+    if rows:
+        positions = np.array([grid_position(row.latitude, row.longitude) for row in rows], dtype=np.int64)
+        latitudes = np.array([row.latitude for row in rows], dtype=np.float64)
+        longitudes = np.array([row.longitude for row in rows], dtype=np.float64)
+        statuses = np.array([STATUS_CODES[IssueStatus(row.status)] for row in rows], dtype=np.int64)
+        for zoom in range(CLUSTER_MAX_ZOOM + 1):
+            shift = CLUSTER_MAX_ZOOM - zoom
+            # One integer key per (cell, status), grouped with a sort
+            keys = (((positions[:, 0] >> shift) << 20 | (positions[:, 1] >> shift)) << 4) | statuses
+            unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+            lat_sums = np.bincount(inverse, weights=latitudes)
+            lon_sums = np.bincount(inverse, weights=longitudes)
+            db.execute(insert(_clusters), [
+                {
+                    "zoom": zoom, "cell_x": int(key >> 24), "cell_y": int((key >> 4) & 0xFFFFF), "status": int(key & 0xF),
+                    "count": int(count), "lat_sum": float(lat_sum), "lon_sum": float(lon_sum),
+                }
+                for key, count, lat_sum, lon_sum in zip(unique.tolist(), counts.tolist(), lat_sums.tolist(), lon_sums.tolist())
+            ])
+    db.commit()
+    clusters_logger.info(f"Rebuilt map clusters from {len(rows)} located issues")
+    return len(rows)
\ No newline at end of file
@@ -0,0 +1,352 @@
+"""
+Hotspot detection over recent issue locations
+Issues reported in the last HOTSPOT_WINDOW_DAYS are clustered per department with
+DBSCAN: an issue with at least HOTSPOT_MIN_ISSUES issues (itself included) within
+HOTSPOT_EPS_M metres is a core issue, core issues within that distance of each other
+share a cluster, and other issues join the cluster of a core issue close to them.
+Each cluster is stored as a row of `hotspots`.
+
+density_clusters() runs on a grid of eps/sqrt(2) cells, in NumPy: points in one cell
+are all within eps of each other, so a cell with enough points is all core, and
+distances are only computed between points of nearby cells. Clusters are joined
+cell by cell, not point by point.
+
+The periodic job recomputes everything once a day, as issues age out of the window.
+In between, it only looks at issues created since its last run. Each new issue marks
+its HOTSPOT_TILE_M tile dirty. The tiles of existing hotspots touching dirty tiles
+are added to the region, and only that region, plus one tile around it, is
+clustered again.
+"""
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.hotspot import Hotspot
+from models.issue import Issue
+from services.archive import CLOSED_STATUSES, issues_both_tiers
+from services.issue_events import from_event_ts, to_event_ts
+
+hotspots_logger = logging.getLogger("hotspots")
+
+HOTSPOT_EPS_M = float(os.getenv("HOTSPOT_EPS_M", "75"))
+HOTSPOT_MIN_ISSUES = int(os.getenv("HOTSPOT_MIN_ISSUES", "5"))
+HOTSPOT_WINDOW_DAYS = int(os.getenv("HOTSPOT_WINDOW_DAYS", "90"))
+HOTSPOT_INTERVAL_SECONDS = 900
+HOTSPOT_FULL_INTERVAL_SECONDS = 86400
+# Dirty-region granularity for incremental runs; much larger than eps
+HOTSPOT_TILE_M = 2000.0
+# Candidate point pairs whose distances are computed at once (bounds memory)
+PAIR_CHUNK_SIZE = 4_000_000
+
+METERS_PER_DEGREE = 111_320.0
+_TILE_DEGREES = HOTSPOT_TILE_M / METERS_PER_DEGREE
+
+# Cell offsets that can hold a point within eps of a point in the centre cell (cells are
+# eps/sqrt(2) wide), one of each +/- pair: every cell pair is visited once
+_OFFSETS = [
+    (dx, dy) for dx in range(-2, 3) for dy in range(-2, 3)
+    if (dx, dy) > (0, 0) and not (abs(dx) == 2 and abs(dy) == 2)
+]
+
+def to_meters(latitudes: np.ndarray, longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Equirectangular projection; accurate for distances of a few hundred metres"""
+    x = np.radians(longitudes) * np.cos(np.radians(latitudes)) * (METERS_PER_DEGREE * 180.0 / math.pi)
+    y = latitudes * METERS_PER_DEGREE
+    return x, y
+
+def _find_roots(parent: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Connected components of the graph with edges a[i]-b[i]: the smallest node of each"""
+    while True:
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        root_a, root_b = parent[a], parent[b]
+        differ = root_a != root_b
+        if not differ.any():
+            return parent
+        np.minimum.at(parent, np.maximum(root_a, root_b)[differ], np.minimum(root_a, root_b)[differ])
+
+def density_clusters(x: np.ndarray, y: np.ndarray, eps: float, min_samples: int) -> np.ndarray:
+    """DBSCAN labels (0, 1, ... or -1 for noise) for points in metres"""
+    n = len(x)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+
+    size = eps / math.sqrt(2)
+    cx = np.floor(x / size).astype(np.int64)
+    cy = np.floor(y / size).astype(np.int64)
+    cx -= cx.min()
+    cy -= cy.min() - 2
+    # Neighbouring cell keys are key + dx * width + dy, never wrapping into another column
+    width = int(cy.max()) + 3
+    keys = cx * width + cy
+    order = np.argsort(keys, kind="stable")
+    keys, xs, ys = keys[order], x[order], y[order]
+    cells, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    cell_of = np.repeat(np.arange(len(cells)), counts)
+    dense = counts >= min_samples
+
+    # Same-cell points are neighbours; nearby cells are checked pair by pair
+    neighbours = counts[cell_of].astype(np.int64)
+    pair_a, pair_b = [], []
+    for dx, dy in _OFFSETS:
+        target = cells + dx * width + dy
+        index = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        found = cells[index] == target
+        pair_a.append(np.nonzero(found)[0])
+        pair_b.append(index[found])
+    cell_a, cell_b = np.concatenate(pair_a), np.concatenate(pair_b)
+
+    eps_squared = eps * eps
+    sizes = counts[cell_a] * counts[cell_b]
+    any_close = np.zeros(len(cell_a), dtype=bool)
+    close_i, close_j = [], []
+    cumulative = np.cumsum(sizes)
+    begin = 0
+    while begin < len(cell_a):
+        end = max(int(np.searchsorted(cumulative, cumulative[begin] - sizes[begin] + PAIR_CHUNK_SIZE, side="right")), begin + 1)
+        chunk = np.arange(begin, end)
+        begin = end
+        chunk_sizes = sizes[chunk]
+        pair = np.repeat(chunk, chunk_sizes)
+        offset = np.arange(len(pair)) - np.repeat(np.cumsum(chunk_sizes) - chunk_sizes, chunk_sizes)
+        step_a, step_b = np.divmod(offset, counts[cell_b[pair]])
+        i = starts[cell_a[pair]] + step_a
+        j = starts[cell_b[pair]] + step_b
+        close = (xs[i] - xs[j]) ** 2 + (ys[i] - ys[j]) ** 2 <= eps_squared
+        i, j, pair = i[close], j[close], pair[close]
+        neighbours += np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+        any_close[pair] = True
+        # Pairs touching a sparse cell decide core and border points later
+        undecided = ~(dense[cell_a[pair]] & dense[cell_b[pair]])
+        close_i.append(i[undecided])
+        close_j.append(j[undecided])
+    close_i = np.concatenate(close_i) if close_i else np.zeros(0, dtype=np.int64)
+    close_j = np.concatenate(close_j) if close_j else np.zeros(0, dtype=np.int64)
+
+    core = neighbours >= min_samples
+    if not core.any():
+        return labels
+    # Cells are joined when they hold core points within eps of each other
+    both_dense = dense[cell_a] & dense[cell_b] & any_close
+    core_pair = core[close_i] & core[close_j]
+    edge_a = np.concatenate([cell_a[both_dense], cell_of[close_i[core_pair]]])
+    edge_b = np.concatenate([cell_b[both_dense], cell_of[close_j[core_pair]]])
+    roots = _find_roots(np.arange(len(cells)), edge_a, edge_b)
+
+    cell_has_core = np.zeros(len(cells), dtype=bool)
+    cell_has_core[cell_of[core]] = True
+    sorted_labels = np.full(n, -1, dtype=np.int64)
+    sorted_labels[core] = roots[cell_of[core]]
+    # Border points: same cell as a core point, or close to one in another cell
+    border = ~core & cell_has_core[cell_of]
+    sorted_labels[border] = roots[cell_of[border]]
+    for p, q in ((close_i, close_j), (close_j, close_i)):
+        joins = ~core[p] & core[q] & (sorted_labels[p] < 0)
+        sorted_labels[p[joins]] = roots[cell_of[q[joins]]]
+
+    clustered = sorted_labels >= 0
+    sorted_labels[clustered] = np.unique(sorted_labels[clustered], return_inverse=True)[1]
+    labels[order] = sorted_labels
+    return labels
+
+def _tile(latitude: float, longitude: float) -> Tuple[int, int]:
+    return math.floor(latitude / _TILE_DEGREES), math.floor(longitude / _TILE_DEGREES)
+
+def _tile_span(hotspot: Hotspot) -> Set[Tuple[int, int]]:
+    low_y, low_x = _tile(hotspot.min_latitude, hotspot.min_longitude)
+    high_y, high_x = _tile(hotspot.max_latitude, hotspot.max_longitude)
+    return {(ty, tx) for ty in range(low_y, high_y + 1) for tx in range(low_x, high_x + 1)}
+
+def _load_points(db: Session, cutoff: datetime, department_id: Any = None, bounds=None) -> Dict[str, np.ndarray]:
+    """Located issues created since cutoff, both tiers; one department and a box when given"""
+    issues = issues_both_tiers(
+        "id", "department_id", "latitude", "longitude", "status", "created_at", created_from=cutoff.date()
+    )
+    statement = select(
+        issues.c.department_id, issues.c.latitude, issues.c.longitude, issues.c.status, issues.c.created_at
+    ).where(issues.c.latitude.isnot(None), issues.c.longitude.isnot(None), issues.c.created_at >= cutoff)
+    if department_id is not None:
+        statement = statement.where(
+            issues.c.department_id.is_(None) if department_id == 0 else issues.c.department_id == department_id
+        )
+    if bounds is not None:
+        min_lat, max_lat, min_lon, max_lon = bounds
+        statement = statement.where(
+            issues.c.latitude.between(min_lat, max_lat), issues.c.longitude.between(min_lon, max_lon)
+        )
+    rows = db.execute(statement).all()
+    return {
+        "department": np.array([row[0] or 0 for row in rows], dtype=np.int64),
+        "latitude": np.array([row[1] for row in rows], dtype=np.float64),
+        "longitude": np.array([row[2] for row in rows], dtype=np.float64),
+        "open": np.array([row[3] not in CLOSED_STATUSES for row in rows], dtype=bool),
+        "created": np.array([to_event_ts(row[4]) for row in rows], dtype=np.int64),
+    }
+
+def _hotspots_for(points: Dict[str, np.ndarray], department_id: int, keep=None) -> List[Hotspot]:
+    """Cluster one department's points; `keep(lat, lon)` masks the points that claim a cluster"""
+    latitudes, longitudes = points["latitude"], points["longitude"]
+    x, y = to_meters(latitudes, longitudes)
+    labels = density_clusters(x, y, HOTSPOT_EPS_M, HOTSPOT_MIN_ISSUES)
+    clustered = labels >= 0
+    if not clustered.any():
+        return []
+    if keep is not None:
+        wanted = np.zeros(labels.max() + 1, dtype=bool)
+        wanted[labels[clustered & keep(latitudes, longitudes)]] = True
+        clustered &= wanted[np.maximum(labels, 0)]
+
+    hotspots = []
+    members = np.argsort(labels[clustered], kind="stable")
+    index = np.nonzero(clustered)[0][members]
+    for group in np.split(index, np.nonzero(np.diff(labels[index]))[0] + 1):
+        lat, lon = latitudes[group].mean(), longitudes[group].mean()
+        centre_x, centre_y = to_meters(np.array([lat]), np.array([lon]))
+        hotspots.append(Hotspot(
+            department_id=department_id or None,
+            issue_count=len(group),
+            open_count=int(points["open"][group].sum()),
+            latitude=float(lat),
+            longitude=float(lon),
+            radius_m=float(np.sqrt((x[group] - centre_x[0]) ** 2 + (y[group] - centre_y[0]) ** 2).max()),
+            min_latitude=float(latitudes[group].min()),
+            max_latitude=float(latitudes[group].max()),
+            min_longitude=float(longitudes[group].min()),
+            max_longitude=float(longitudes[group].max()),
+            first_reported_at=from_event_ts(int(points["created"][group].min())),
+            last_reported_at=from_event_ts(int(points["created"][group].max())),
+        ))
+    return hotspots
+
+def _department_filter(department_id: int):
+    return Hotspot.department_id.is_(None) if department_id == 0 else Hotspot.department_id == department_id
+
+class HotspotDetector:
+    """Keeps `hotspots` current; issue ids up to the watermark are accounted for"""
+
+    def __init__(self):
+        self._watermark: Optional[int] = None
+        self._last_full: Optional[float] = None
+
+    def recompute_all(self, db: Session) -> int:
+        """Cluster every department from scratch; returns hotspots found"""
+        watermark = db.execute(select(func.max(Issue.id)), execution_options={"include_deleted": True}).scalar() or 0
+        start = time.perf_counter()
+        points = _load_points(db, datetime.utcnow() - timedelta(days=HOTSPOT_WINDOW_DAYS))
+        hotspots = []
+        for department_id in np.unique(points["department"]).tolist():
+            selected = points["department"] == department_id
+            hotspots += _hotspots_for({name: values[selected] for name, values in points.items()}, department_id)
+        db.query(Hotspot).delete()
+        db.add_all(hotspots)
+        db.commit()
+        self._watermark, self._last_full = watermark, time.time()
+        hotspots_logger.info(
+            f"Found {len(hotspots)} hotspots among {len(points['latitude'])} issues "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        return len(hotspots)
+
+    def _recompute_region(self, db: Session, department_id: int, tiles: Set[Tuple[int, int]], cutoff: datetime) -> int:
+        """Re-cluster the dirty tiles and the hotspots overlapping them; returns hotspots changed"""
+        existing = db.query(Hotspot).filter(_department_filter(department_id)).all()
+        spans = {hotspot.id: _tile_span(hotspot) for hotspot in existing}
+        region, replaced = set(tiles), []
+        grown = True
+        while grown:
+            grown = False
+            for hotspot in existing:
+                if hotspot not in replaced and spans[hotspot.id] & region:
+                    region |= spans[hotspot.id]
+                    replaced.append(hotspot)
+                    grown = True
+
+        # One tile around the region, so clusters at its edge see their neighbours
+        halo = {(ty + dy, tx + dx) for ty, tx in region for dy in (-1, 0, 1) for dx in (-1, 0, 1)}
+        rows, columns = zip(*halo)
+        bounds = (
+            min(rows) * _TILE_DEGREES, (max(rows) + 1) * _TILE_DEGREES,
+            min(columns) * _TILE_DEGREES, (max(columns) + 1) * _TILE_DEGREES,
+        )
+        points = _load_points(db, cutoff, department_id, bounds)
+        tile_y = np.floor(points["latitude"] / _TILE_DEGREES).astype(np.int64)
+        tile_x = np.floor(points["longitude"] / _TILE_DEGREES).astype(np.int64)
+        in_halo = np.array([tile in halo for tile in zip(tile_y.tolist(), tile_x.tolist())], dtype=bool)
+        points = {name: values[in_halo] for name, values in points.items()}
+
+        def in_region(latitudes, longitudes):
+            return np.array([
+                (math.floor(lat / _TILE_DEGREES), math.floor(lon / _TILE_DEGREES)) in region
+                for lat, lon in zip(latitudes.tolist(), longitudes.tolist())
+            ], dtype=bool)
+
+        hotspots = _hotspots_for(points, department_id, keep=in_region)
+        for hotspot in replaced:
+            db.delete(hotspot)
+        db.add_all(hotspots)
+        return len(replaced) + len(hotspots)
+
+    def run(self, db: Session):
+        if self._watermark is None or time.time() - self._last_full >= HOTSPOT_FULL_INTERVAL_SECONDS:
+            self.recompute_all(db)
+            return
+        watermark = db.execute(select(func.max(Issue.id)), execution_options={"include_deleted": True}).scalar() or 0
+        new_issues = db.execute(
+            select(Issue.department_id, Issue.latitude, Issue.longitude).where(
+                Issue.id > self._watermark, Issue.id <= watermark,
+                Issue.latitude.isnot(None), Issue.longitude.isnot(None)
+            )
+        ).all()
+        dirty: Dict[int, Set[Tuple[int, int]]] = {}
+        for department_id, latitude, longitude in new_issues:
+            dirty.setdefault(department_id or 0, set()).add(_tile(latitude, longitude))
+        cutoff = datetime.utcnow() - timedelta(days=HOTSPOT_WINDOW_DAYS)
+        changed = sum(self._recompute_region(db, department_id, tiles, cutoff) for department_id, tiles in dirty.items())
+        db.commit()
+        self._watermark = watermark
+        if new_issues:
+            hotspots_logger.info(f"Re-clustered around {len(new_issues)} new issues, {changed} hotspots changed")
+
+hotspot_detector = HotspotDetector()
+
+def run_hotspot_detection(db: Session):
+    """Periodic job entry point"""
+    hotspot_detector.run(db)
+
+def list_hotspots(
+    db: Session, department_id: Optional[int] = None, min_issues: int = 0, limit: int = 100
+) -> List[Dict[str, Any]]:
+    """Stored hotspots, largest first"""
+    query = db.query(Hotspot)
+    if department_id:
+        query = query.filter(Hotspot.department_id == department_id)
+    if min_issues:
+        query = query.filter(Hotspot.issue_count >= min_issues)
+    hotspots = query.order_by(Hotspot.issue_count.desc(), Hotspot.id).limit(limit).all()
+    return [
+        {
+            "id": hotspot.id,
+            "department_id": hotspot.department_id,
+            "issue_count": hotspot.issue_count,
+            "open_count": hotspot.open_count,
+            "latitude": hotspot.latitude,
+            "longitude": hotspot.longitude,
+            "radius_m": round(hotspot.radius_m, 1),
+            "bbox": [hotspot.min_longitude, hotspot.min_latitude, hotspot.max_longitude, hotspot.max_latitude],
+            "first_reported_at": hotspot.first_reported_at,
+            "last_reported_at": hotspot.last_reported_at,
+            "computed_at": hotspot.computed_at,
+        }
+        for hotspot in hotspots
+    ]
\ No newline at end of file
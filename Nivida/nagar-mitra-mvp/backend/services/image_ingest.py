@@ -0,0 +1,245 @@
+"""
+Photo ingest: downscale, recompress and strip metadata before a photo is stored
+Phone photos arrive as multi-megabyte JPEGs with EXIF (camera, time, location).
+Each uploaded photo is rewritten in place by a process pool, off the event loop
+and outside the GIL: EXIF orientation is applied, photos larger than
+IMAGE_MAX_DIMENSION are scaled down, JPEGs are re-encoded at IMAGE_JPEG_QUALITY,
+and no metadata is written back. A photo that needs neither rotating nor scaling
+keeps its original encoding with the metadata segments cut out when that is
+smaller than the re-encoded file. Photos that cannot be decoded, including
+decompression bombs, are rejected rather than stored with their metadata.
+The EXIF GPS position is returned so the issue can use it when the reporter did
+not give coordinates, and the perceptual hash is taken from the decoded image
+while it is in memory.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from utils.metrics import Counter, Histogram, register
+
+ingest_logger = logging.getLogger("image_ingest")
+
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2048"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+IMAGE_INGEST_WORKERS = int(os.getenv("IMAGE_INGEST_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Formats rewritten on ingest; others (GIF animations, video, audio) are stored as uploaded
+REWRITTEN_FORMATS = {"JPEG", "PNG", "WEBP", "MPO"}
+
+INGEST_BYTES_SAVED = register(Histogram(
+    "media_ingest_bytes_saved", "Bytes saved per uploaded photo by recompression", (),
+    (0, 50_000, 200_000, 500_000, 1_000_000, 2_000_000, 4_000_000, 8_000_000)
+))
+INGEST_BYTES = register(Counter(
+    "media_ingest_bytes_total", "Photo bytes received and stored", ("stage",)
+))
+INGEST_GPS_FILLED = register(Counter(
+    "media_ingest_gps_filled_total", "Issues whose missing coordinates came from photo EXIF"
+))
+
+_GPS_IFD = 0x8825
+_ORIENTATION = 0x0112
+
+class ImageRejected(ValueError):
+    """An uploaded photo that is not stored; status_code is the HTTP status to answer with"""
+
+    status_code = 400
+
+class ImageTooLarge(ImageRejected):
+    """A photo with more pixels than Pillow will decode (a decompression bomb)"""
+
+    status_code = 413
+
+def _gps_degrees(values, ref) -> Optional[float]:
+    try:
+        degrees = float(values[0]) + float(values[1]) / 60.0 + float(values[2]) / 3600.0
+    except (TypeError, ValueError, IndexError, ZeroDivisionError):
+        return None
+    if isinstance(ref, bytes):
+        ref = ref.decode("ascii", "ignore")
+    return -degrees if str(ref).strip().upper() in ("S", "W") else degrees
+
+def exif_gps(exif) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) from a Pillow Exif object, None when absent or implausible"""
+    gps = exif.get_ifd(_GPS_IFD) if exif else None
+    if not gps or 2 not in gps or 4 not in gps:
+        return None
+    latitude = _gps_degrees(gps[2], gps.get(1, "N"))
+    longitude = _gps_degrees(gps[4], gps.get(3, "E"))
+    if latitude is None or longitude is None:
+        return None
+    if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0) or (latitude == 0.0 and longitude == 0.0):
+        return None
+    return latitude, longitude
+
+# Segments and chunks kept when metadata is cut out of an original file; everything
+# else (EXIF, XMP, IPTC, comments, text chunks, trailing data) is dropped
+_JPEG_KEPT_APP = (b"\xff\xe0JFIF\x00", b"\xff\xe2ICC_PROFILE\x00", b"\xff\xeeAdobe")
+_PNG_KEPT_CHUNKS = {
+    b"IHDR", b"PLTE", b"IDAT", b"IEND", b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT", b"pHYs", b"bKGD",
+}
+
+def strip_jpeg(data: bytes) -> Optional[bytes]:
+    """A JPEG without its metadata segments, bytes unchanged otherwise; None if malformed"""
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    output = [data[:2]]
+    position, size = 2, len(data)
+    while position + 1 < size:
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:  # fill byte
+            position += 1
+            continue
+        if marker == 0xD9:
+            output.append(b"\xff\xd9")
+            return b"".join(output)
+        if position + 4 > size:
+            return None
+        end = position + 2 + int.from_bytes(data[position + 2:position + 4], "big")
+        if end > size or end < position + 4:
+            return None
+        segment = data[position:end]
+        is_metadata = 0xE0 <= marker <= 0xEF or marker == 0xFE
+        if not is_metadata or any(segment[:2] + segment[4:4 + len(kept) - 2] == kept for kept in _JPEG_KEPT_APP):
+            output.append(segment)
+        position = end
+        if marker == 0xDA:
+            # Entropy-coded data runs to the next marker that is not a stuffed byte or a restart
+            scan = position
+            while True:
+                scan = data.find(b"\xff", scan)
+                if scan < 0 or scan + 1 >= size:
+                    return None
+                following = data[scan + 1]
+                if following == 0x00 or 0xD0 <= following <= 0xD7:
+                    scan += 2
+                elif following == 0xFF:
+                    scan += 1
+                else:
+                    break
+            output.append(data[position:scan])
+            position = scan
+    return None
+
+def strip_png(data: bytes) -> Optional[bytes]:
+    """A PNG with only its image and colour chunks; None if malformed"""
+    if not data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return None
+    output = [data[:8]]
+    position, size = 8, len(data)
+    while position + 12 <= size:
+        end = position + 12 + int.from_bytes(data[position:position + 4], "big")
+        chunk_type = data[position + 4:position + 8]
+        if end > size:
+            return None
+        if chunk_type in _PNG_KEPT_CHUNKS:
+            output.append(data[position:end])
+        elif chunk_type[:1].isupper():
+            return None  # an unknown critical chunk cannot be dropped
+        if chunk_type == b"IEND":
+            return b"".join(output)
+        position = end
+    return None
+
+def process_image(path: str, max_dimension: int = IMAGE_MAX_DIMENSION,
+                  quality: int = IMAGE_JPEG_QUALITY) -> Dict[str, Any]:
+    """Rewrite a photo in place; runs in a pool process
+
+    Returns the original and stored sizes, the EXIF GPS position and the perceptual
+    hash. Raises ImageRejected for files Pillow cannot decode (ImageTooLarge for
+    decompression bombs); the file is then left as it is for the caller to remove.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    from utils.image_hash import dhash_image
+
+    original_size = os.path.getsize(path)
+    result: Dict[str, Any] = {"original_size": original_size, "file_size": original_size, "gps": None, "phash": None}
+    temporary = f"{path}.ingest"
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            exif = image.getexif()
+            result["gps"] = exif_gps(exif)
+            if image_format not in REWRITTEN_FORMATS:
+                result["phash"] = dhash_image(image)
+                return result
+            # Only an upright photo within the size cap can keep its original encoding
+            keeps_pixels = (
+                image_format in ("JPEG", "PNG") and exif.get(_ORIENTATION, 1) == 1
+                and max(image.size) <= max_dimension
+            )
+            if image_format in ("JPEG", "MPO"):
+                # Decode at reduced scale when the photo is far over the cap
+                image.draft("RGB", (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(image)
+            if max(image.size) > max_dimension:
+                image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            result["phash"] = dhash_image(image)
+
+            temporary = f"{path}.ingest"
+            if image_format == "PNG":
+                # No pnginfo/exif: text chunks and metadata are dropped
+                image.save(temporary, "PNG", optimize=True)
+            elif image_format == "WEBP":
+                image.save(temporary, "WEBP", quality=quality)
+            else:
+                if image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                # Pillow copies a JPEG comment from the source unless one is given
+                image.save(temporary, "JPEG", quality=quality, optimize=True, progressive=True, comment=b"")
+    except Image.DecompressionBombError as e:
+        ingest_logger.warning(f"Rejected {path}: {e}")
+        raise ImageTooLarge("Image has too many pixels")
+    except (UnidentifiedImageError, OSError, ValueError, SyntaxError) as e:
+        ingest_logger.warning(f"Could not process {path}: {e}")
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise ImageRejected("Not a readable image")
+
+    if keeps_pixels:
+        with open(path, "rb") as source:
+            original = source.read()
+        stripped = strip_jpeg(original) if image_format == "JPEG" else strip_png(original)
+        if stripped is not None and len(stripped) < os.path.getsize(temporary):
+            with open(temporary, "wb") as output:
+                output.write(stripped)
+    os.replace(temporary, path)
+    result["file_size"] = os.path.getsize(path)
+    return result
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: the server process has threads and open connections
+        _pool = ProcessPoolExecutor(IMAGE_INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+async def ingest_image(path: str) -> Dict[str, Any]:
+    """Process a stored photo in the pool and record the bytes saved"""
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(_get_pool(), process_image, path)
+    except BrokenProcessPool:
+        # A pool process died (e.g. killed for memory); later photos get a new pool
+        shutdown_pool()
+        raise
+    saved = result["original_size"] - result["file_size"]
+    INGEST_BYTES.inc(("received",), result["original_size"])
+    INGEST_BYTES.inc(("stored",), result["file_size"])
+    INGEST_BYTES_SAVED.observe(max(0, saved))
+    return result
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
\ No newline at end of file
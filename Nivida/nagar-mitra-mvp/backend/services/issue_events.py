@@ -0,0 +1,253 @@
+"""
+Append-only issue event log
+Every lifecycle change (creation, status, assignment, priority, votes, media, deletion)
+appends a row to issue_events in the same transaction as the change itself. Rows are
+small integers only: enum codes, ids and a timestamp in seconds since EVENT_EPOCH, and
+each carries the issue's state after the event. Timelines and "state of every issue at
+time T" are answered from this log instead of the overwritten columns of `issues`.
+Status changes also update the precomputed map clusters (services.clusters) here.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, bindparam, case, func, insert, select
+from sqlalchemy.orm import Session
+
+from models.issue import Issue, IssueStatus
+from models.issue_event import (
+    IssueEvent, IssueEventType, PRIORITY_BY_CODE, PRIORITY_CODES, STATUS_BY_CODE, STATUS_CODES
+)
+from services.clusters import track_issue_events
+
+issue_events_logger = logging.getLogger("issue_events")
+
+EVENT_EPOCH = datetime(2024, 1, 1)
+BACKFILL_BATCH_SIZE = 1000
+
+def to_event_ts(when: Optional[datetime] = None) -> int:
+    """Seconds since EVENT_EPOCH (naive datetimes are UTC, like the rest of the schema)"""
+    if when is None:
+        when = datetime.utcnow()
+    elif when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((when - EVENT_EPOCH).total_seconds())
+
+def from_event_ts(ts: int) -> datetime:
+    return EVENT_EPOCH + timedelta(seconds=ts)
+
+_events = IssueEvent.__table__
+
+# Per-issue sequence number assigned inside the INSERT itself. The change being logged
+# has already updated (and so locked) the issue row, which serializes writers per issue.
+# Statements may carry many rows, but at most one per issue: batched VALUES share a snapshot.
+_next_seq = (
+    select(func.coalesce(func.max(_events.c.seq), 0) + 1)
+    .where(_events.c.issue_id == bindparam("e_issue_id"))
+    .scalar_subquery()
+)
+_insert_event = insert(_events).values(
+    issue_id=bindparam("e_issue_id"),
+    seq=_next_seq,
+    event_type=bindparam("e_type"),
+    ts=bindparam("e_ts"),
+    actor_id=bindparam("e_actor_id"),
+    status=bindparam("e_status"),
+    priority=bindparam("e_priority"),
+    department_id=bindparam("e_department_id"),
+    worker_id=bindparam("e_worker_id"),
+    value=bindparam("e_value"),
+)
+
+def issue_event_params(
+    issue,
+    event_type: IssueEventType,
+    actor_id: Optional[int] = None,
+    value: Optional[int] = None,
+    when: Optional[datetime] = None,
+    status: Optional[IssueStatus] = None,
+) -> Dict[str, Any]:
+    """Parameters for one event, snapshotting the issue's (or row's) current state"""
+    status = status or issue.status
+    priority = getattr(issue, "priority", None)
+    return {
+        "e_issue_id": issue.id,
+        "e_type": int(event_type),
+        "e_ts": to_event_ts(when),
+        "e_actor_id": actor_id,
+        "e_status": STATUS_CODES.get(status),
+        "e_priority": PRIORITY_CODES.get(priority),
+        "e_department_id": issue.department_id,
+        "e_worker_id": issue.worker_id,
+        "e_value": value,
+    }
+
+def record_issue_event(
+    db: Session,
+    issue,
+    event_type: IssueEventType,
+    actor_id: Optional[int] = None,
+    value: Optional[int] = None,
+):
+    """Append an event for a change made in this session; commit it with the change"""
+    # New issues need their id, and the issue row update goes first
+    db.flush()
+    params = issue_event_params(issue, event_type, actor_id, value)
+    track_issue_events(db, [params])
+    db.execute(_insert_event, params)
+
+def record_issue_events(db: Session, params: List[Dict[str, Any]]):
+    """Append prepared events (from issue_event_params), at most one per issue"""
+    if params:
+        track_issue_events(db, params)
+        db.execute(_insert_event, params)
+
+def record_issue_changes(db: Session, issue, previous: Dict[str, Any], actor_id: Optional[int] = None):
+    """Log an in-place update, one event per kind of change, against a snapshot of the old values"""
+    changes = [
+        (IssueEventType.STATUS_CHANGED, previous["status"] != issue.status),
+        (IssueEventType.ASSIGNED, previous["worker_id"] != issue.worker_id),
+        (IssueEventType.DEPARTMENT_CHANGED, previous["department_id"] != issue.department_id),
+        (IssueEventType.PRIORITY_CHANGED, previous["priority"] != issue.priority),
+    ]
+    event_types = [event_type for event_type, changed in changes if changed] or [IssueEventType.UPDATED]
+    for event_type in event_types:
+        record_issue_event(db, issue, event_type, actor_id)
+
+def snapshot_issue(issue) -> Dict[str, Any]:
+    """The logged fields of an issue, taken before an in-place update"""
+    return {
+        "status": issue.status,
+        "worker_id": issue.worker_id,
+        "department_id": issue.department_id,
+        "priority": issue.priority,
+    }
+
+def _event_dict(row) -> Dict[str, Any]:
+    return {
+        "seq": row.seq,
+        "type": IssueEventType(row.event_type).name.lower(),
+        "at": from_event_ts(row.ts),
+        "actor_id": row.actor_id,
+        "status": STATUS_BY_CODE.get(row.status),
+        "priority": PRIORITY_BY_CODE.get(row.priority),
+        "department_id": row.department_id,
+        "worker_id": row.worker_id,
+        "value": row.value,
+    }
+
+def get_issue_timeline(db: Session, issue_id: int) -> List[Dict[str, Any]]:
+    """All events of one issue in order (an index range read on (issue_id, seq))"""
+    rows = db.execute(
+        select(_events).where(_events.c.issue_id == issue_id).order_by(_events.c.seq)
+    ).all()
+    return [_event_dict(row) for row in rows]
+
+def _latest_events(ts: int, after_id: int = 0):
+    """Per issue: the last event at or before ts, plus votes cast up to then"""
+    is_vote = _events.c.event_type == int(IssueEventType.VOTED)
+    return (
+        select(
+            _events.c.issue_id,
+            func.max(_events.c.seq).label("seq"),
+            func.sum(case((and_(is_vote, _events.c.value > 0), 1), else_=0)).label("upvotes"),
+            func.sum(case((and_(is_vote, _events.c.value < 0), 1), else_=0)).label("downvotes"),
+        )
+        .where(_events.c.ts <= ts, _events.c.issue_id > after_id)
+        .group_by(_events.c.issue_id)
+        .subquery()
+    )
+
+def _state_filters(department_id: Optional[int], status: Optional[IssueStatus]) -> list:
+    filters = [_events.c.event_type != int(IssueEventType.DELETED)]
+    if department_id:
+        filters.append(_events.c.department_id == department_id)
+    if status:
+        filters.append(_events.c.status == STATUS_CODES[status])
+    return filters
+
+def get_state_at(
+    db: Session,
+    at: datetime,
+    department_id: Optional[int] = None,
+    status: Optional[IssueStatus] = None,
+    after_id: int = 0,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """State of every issue that existed at `at`, by issue id (keyset paged with after_id)"""
+    latest = _latest_events(to_event_ts(at), after_id)
+    rows = db.execute(
+        select(
+            _events.c.issue_id, _events.c.ts, _events.c.status, _events.c.priority,
+            _events.c.department_id, _events.c.worker_id, latest.c.upvotes, latest.c.downvotes,
+        )
+        .join(latest, and_(_events.c.issue_id == latest.c.issue_id, _events.c.seq == latest.c.seq))
+        .where(*_state_filters(department_id, status))
+        .order_by(_events.c.issue_id)
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "issue_id": row.issue_id,
+            "status": STATUS_BY_CODE.get(row.status),
+            "priority": PRIORITY_BY_CODE.get(row.priority),
+            "department_id": row.department_id,
+            "worker_id": row.worker_id,
+            "upvotes": row.upvotes,
+            "downvotes": row.downvotes,
+            "last_event_at": from_event_ts(row.ts),
+        }
+        for row in rows
+    ]
+
+def count_by_status_at(db: Session, at: datetime, department_id: Optional[int] = None) -> Dict[str, int]:
+    """Number of issues in each status at `at`"""
+    latest = _latest_events(to_event_ts(at))
+    rows = db.execute(
+        select(_events.c.status, func.count())
+        .join(latest, and_(_events.c.issue_id == latest.c.issue_id, _events.c.seq == latest.c.seq))
+        .where(*_state_filters(department_id, None))
+        .group_by(_events.c.status)
+    ).all()
+    return {STATUS_BY_CODE[code].value: count for code, count in rows if code in STATUS_BY_CODE}
+
+def backfill_issue_events(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Write a best-effort history for issues that predate the event log; returns issues covered"""
+    has_events = select(_events.c.issue_id).where(_events.c.issue_id == Issue.id).exists()
+    columns = (
+        Issue.id, Issue.user_id, Issue.status, Issue.priority, Issue.department_id,
+        Issue.worker_id, Issue.created_at, Issue.resolved_at,
+    )
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(*columns).where(Issue.id > last_id, ~has_events).order_by(Issue.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        created, resolved = [], []
+        for row in rows:
+            if row.status == IssueStatus.RESOLVED and row.resolved_at is not None:
+                # Reported as pending, resolved later; intermediate steps are unknown
+                params = issue_event_params(
+                    row, IssueEventType.CREATED, row.user_id, when=row.created_at, status=IssueStatus.PENDING
+                )
+                params["e_worker_id"] = None
+                created.append(params)
+                resolved.append(issue_event_params(row, IssueEventType.STATUS_CHANGED, when=row.resolved_at))
+            else:
+                created.append(issue_event_params(row, IssueEventType.CREATED, row.user_id, when=row.created_at))
+        # Separate statements so an issue's second event sees its first. Past events leave
+        # the map clusters alone: init_db rebuilds them from the issues afterwards.
+        db.execute(_insert_event, created)
+        if resolved:
+            db.execute(_insert_event, resolved)
+        db.commit()
+        total += len(rows)
+
+    if total:
+        issue_events_logger.info(f"Backfilled events for {total} issues")
+    return total
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""
+Issue media intake
+Uploads are staged before the issue exists: photos go through the ingest pool
+(services.image_ingest) so their EXIF position can still fill in the issue's
+coordinates; a photo that cannot be processed rejects the request instead of being
+stored with its metadata. Staged files are then moved to media storage (services.storage) and
+attached to the issue, with a perceptual hash and a link to any earlier issue that
+already has the same (possibly resized or re-compressed) photo. Media rows are
+committed with the issue; when anything fails before that, the staged and stored
+files are discarded.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from config import UPLOAD_DIR
+from models.issue import Issue, IssueMedia
+from models.issue_event import IssueEventType
+from services.image_ingest import INGEST_GPS_FILLED, ImageRejected, ingest_image
+from services.issue_events import record_issue_event
+from services.media_index import get_photo_index
+from services.storage import StorageError, get_storage, storage_for
+from utils.image_hash import dhash, to_db_hash
+from utils.metrics import timed
+
+media_logger = logging.getLogger("media")
+
+BACKFILL_BATCH_SIZE = 200
+# Files under UPLOAD_DIR not yet attached to an issue
+STAGED_PREFIX = "incoming_"
+ALLOWED_FILE_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'video/mp4', 'audio/mpeg', 'audio/wav'}
+
+class StagedUpload:
+    """An uploaded file saved (and, for photos, processed) before its issue exists"""
+
+    __slots__ = (
+        "path", "name", "original_filename", "content_type", "file_type", "file_size", "phash", "gps", "location"
+    )
+
+    def __init__(self, path: str, name: str, original_filename: str, content_type: str):
+        self.path = path
+        self.name = name
+        self.original_filename = original_filename
+        self.content_type = content_type
+        self.file_type = media_file_type(content_type)
+        self.file_size = 0
+        self.phash: Optional[int] = None
+        self.gps: Optional[Tuple[float, float]] = None
+        self.location: Optional[str] = None  # set once moved to media storage
+
+def media_file_type(content_type: str) -> str:
+    return "image" if content_type.startswith("image") else \
+           "video" if content_type.startswith("video") else "audio"
+
+def stage_upload(file: UploadFile) -> StagedUpload:
+    """Save an uploaded file under a temporary name"""
+    # Create uploads directory if it doesn't exist
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+    # Generate unique filename
+    name = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
+    file_path = os.path.join(UPLOAD_DIR, STAGED_PREFIX + name)
+
+    # Save file
+    with timed("file_write"), open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+    staged = StagedUpload(file_path, name, file.filename, file.content_type)
+    staged.file_size = os.path.getsize(file_path)
+    return staged
+
+def stage_file(path: str, original_filename: str, content_type: str) -> StagedUpload:
+    """Stage a copy of a file under UPLOAD_DIR (a finished resumable upload); the file stays"""
+    name = f"{uuid.uuid4()}{os.path.splitext(original_filename)[1]}"
+    staged_path = os.path.join(UPLOAD_DIR, STAGED_PREFIX + name)
+    try:
+        # Ingest and storage replace the staged path rather than write to it, so a link is safe
+        os.link(path, staged_path)
+        os.utime(staged_path)
+    except OSError:
+        shutil.copyfile(path, staged_path)
+    staged = StagedUpload(staged_path, name, original_filename, content_type)
+    staged.file_size = os.path.getsize(staged_path)
+    return staged
+
+def stage_uploads(files: Iterable[UploadFile]) -> List[StagedUpload]:
+    """Save uploads under temporary names; photos are then processed by ingest_staged"""
+    return [stage_upload(file) for file in files if file.filename]  # Skip empty files
+
+async def ingest_staged(staged: List[StagedUpload]) -> List[StagedUpload]:
+    """Process the staged photos concurrently in the ingest pool
+
+    Raises ImageRejected for the first photo that could not be processed; the
+    caller discards the staged uploads.
+    """
+    photos = [upload for upload in staged if upload.file_type == "image"]
+    results = await asyncio.gather(*(ingest_image(upload.path) for upload in photos), return_exceptions=True)
+    for upload, result in zip(photos, results):
+        if isinstance(result, ImageRejected):
+            raise type(result)(f"{upload.original_filename}: {result}")
+        if isinstance(result, BaseException):
+            # The original still has its metadata: never store it unprocessed
+            media_logger.error(f"Photo ingest failed for {upload.original_filename}: {result}")
+            raise ImageRejected(f"{upload.original_filename}: the photo could not be processed")
+    for upload, result in zip(photos, results):
+        upload.file_size = result["file_size"]
+        upload.phash = result["phash"]
+        upload.gps = result["gps"]
+    return staged
+
+def upload_location(staged: Iterable[StagedUpload]) -> Optional[Tuple[float, float]]:
+    """Position from the first photo with EXIF GPS"""
+    for upload in staged:
+        if upload.gps is not None:
+            INGEST_GPS_FILLED.inc()
+            return upload.gps
+    return None
+
+async def store_staged(staged: Iterable[StagedUpload]):
+    """Move staged uploads to media storage; they are attached by attach_uploads"""
+    storage = get_storage()
+    for upload in staged:
+        if upload.location is None:
+            upload.location = await storage.put_file(upload.path, upload.name, upload.content_type)
+
+async def discard_staged(staged: Iterable[StagedUpload]):
+    """Remove uploads that will not be attached, staged or already stored"""
+    for upload in staged:
+        if os.path.exists(upload.path):
+            os.remove(upload.path)
+        if upload.location is not None:
+            try:
+                await storage_for(upload.location).delete(upload.location)
+            except StorageError as e:
+                media_logger.error(f"Could not delete {upload.location}: {e}")
+
+def photo_hash(source) -> Optional[int]:
+    """Perceptual hash of a photo (path or file object), None if it is not a readable image"""
+    with timed("photo_hash"):
+        return dhash(source)
+
+def find_duplicate_photos(db: Session, value: int, exclude_issue_id: Optional[int] = None) -> List[dict]:
+    """Earlier issues with a near-identical photo, nearest first"""
+    matches = get_photo_index(db).find_duplicates(value, exclude_issue_id)
+    return [
+        {"issue_id": issue_id, "media_id": media_id, "distance": distance}
+        for distance, media_id, issue_id in matches
+    ]
+
+def attach_uploads(db: Session, issue: Issue, staged: Iterable[StagedUpload], actor_id: int) -> List[IssueMedia]:
+    """Add stored uploads (store_staged) as the issue's media, flag duplicate photos, and commit
+
+    The commit includes whatever else the session holds, such as the new issue itself.
+    """
+    index = get_photo_index(db)
+    added: List[Tuple[IssueMedia, Optional[int]]] = []
+    for upload in staged:
+        value = upload.phash
+        duplicate_of = None
+        if value is not None:
+            matches = index.find_duplicates(value, exclude_issue_id=issue.id)
+            if matches:
+                duplicate_of = matches[0][2]
+
+        media = IssueMedia(
+            issue_id=issue.id,
+            file_path=upload.location,
+            file_type=upload.file_type,
+            file_size=upload.file_size,
+            original_filename=upload.original_filename,
+            phash=to_db_hash(value) if value is not None else None,
+            duplicate_of_issue_id=duplicate_of
+        )
+        db.add(media)
+        added.append((media, value))
+
+    if added:
+        record_issue_event(db, issue, IssueEventType.MEDIA_ADDED, actor_id, value=len(added))
+    db.commit()
+    for media, value in added:
+        if value is not None:
+            index.add(value, media.id, issue.id)
+    duplicates = {media.duplicate_of_issue_id for media, _ in added if media.duplicate_of_issue_id}
+    if duplicates:
+        media_logger.info(f"Issue {issue.id} has photos already attached to issues {sorted(duplicates)}")
+    return [media for media, _ in added]
+
+async def delete_media_files(media_rows: Iterable[IssueMedia]):
+    """Remove stored files; a file that cannot be removed is logged, not raised"""
+    for media in media_rows:
+        try:
+            await storage_for(media.file_path).delete(media.file_path)
+        except StorageError as e:
+            media_logger.error(f"Could not delete {media.file_path}: {e}")
+
+def backfill_photo_hashes(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Hash photos stored before perceptual hashing existed; returns photos hashed"""
+    hashed = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(IssueMedia.id, IssueMedia.file_path)
+            .where(IssueMedia.file_type == "image", IssueMedia.phash.is_(None), IssueMedia.id > last_id)
+            .order_by(IssueMedia.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for row in rows:
+            value = dhash(row.file_path) if os.path.exists(row.file_path) else None
+            if value is not None:
+                db.query(IssueMedia).filter(IssueMedia.id == row.id).update(
+                    {IssueMedia.phash: to_db_hash(value)}, synchronize_session=False
+                )
+                hashed += 1
+        db.commit()
+    if hashed:
+        media_logger.info(f"Backfilled perceptual hashes for {hashed} photos")
+    return hashed
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+In-memory index of photo hashes for near-duplicate search
+Multi-index hashing: each 64-bit hash is split into CHUNKS 16-bit chunks with one
+table per chunk. If two hashes are within MAX_DISTANCE bits, at least one chunk
+differs by at most MAX_DISTANCE // CHUNKS bits, so probing every chunk value within
+that radius finds all matches while only touching a few buckets.
+The index is rebuilt from issue_media every REFRESH_SECONDS, picks up rows added by
+other processes by id in between, and is updated in place on intake and deletion.
+"""
+import logging
+import os
+import threading
+import time
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.issue import Issue, IssueMedia
+from utils.image_hash import HASH_BITS, from_db_hash, hamming_distance
+
+media_index_logger = logging.getLogger("media_index")
+
+# Photos this many bits apart or closer are reported as duplicates
+MAX_DISTANCE = int(os.getenv("PHOTO_DUPLICATE_MAX_DISTANCE", "6"))
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+REFRESH_SECONDS = 300
+# Newer rows written by other worker processes are picked up this often
+SYNC_SECONDS = 5
+
+_CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+def _chunks(value: int) -> List[int]:
+    return [(value >> (CHUNK_BITS * i)) & _CHUNK_MASK for i in range(CHUNKS)]
+
+def _flip_masks(radius: int) -> List[int]:
+    """Every chunk-sized mask with at most `radius` bits set"""
+    masks = [0]
+    for bits in range(1, radius + 1):
+        for positions in combinations(range(CHUNK_BITS), bits):
+            mask = 0
+            for position in positions:
+                mask |= 1 << position
+            masks.append(mask)
+    return masks
+
+class MultiIndexHashTable:
+    """Hamming-distance search over 64-bit hashes; each hash carries (media_id, issue_id) entries"""
+
+    def __init__(self, max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._masks = _flip_masks(max_distance // CHUNKS)
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(CHUNKS)]
+        self._entries: Dict[int, List[Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def add(self, value: int, media_id: int, issue_id: int):
+        entries = self._entries.get(value)
+        if entries is None:
+            self._entries[value] = entries = []
+            for table, chunk in zip(self._tables, _chunks(value)):
+                table.setdefault(chunk, set()).add(value)
+        entries.append((media_id, issue_id))
+
+    def remove_issue(self, value: int, issue_id: int):
+        entries = self._entries.get(value)
+        if entries is None:
+            return
+        entries[:] = [entry for entry in entries if entry[1] != issue_id]
+        if not entries:
+            del self._entries[value]
+            for table, chunk in zip(self._tables, _chunks(value)):
+                bucket = table.get(chunk)
+                if bucket is not None:
+                    bucket.discard(value)
+                    if not bucket:
+                        del table[chunk]
+
+    def search(self, value: int, max_distance: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """(distance, media_id, issue_id) of stored photos within max_distance, nearest first"""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        candidates: Set[int] = set()
+        for table, chunk in zip(self._tables, _chunks(value)):
+            for mask in self._masks:
+                bucket = table.get(chunk ^ mask)
+                if bucket:
+                    candidates |= bucket
+        matches = []
+        for candidate in candidates:
+            distance = hamming_distance(value, candidate)
+            if distance <= max_distance:
+                matches.extend((distance, media_id, issue_id) for media_id, issue_id in self._entries[candidate])
+        matches.sort()
+        return matches
+
+class PhotoIndex:
+    """The process-wide photo hash index, kept in step with issue_media"""
+
+    def __init__(self):
+        self._table = MultiIndexHashTable()
+        self._hashes: Dict[int, List[int]] = {}  # issue_id -> hashes, for removal
+        self._last_media_id = 0
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+        self._synced_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def _add(self, value: int, media_id: int, issue_id: int):
+        self._table.add(value, media_id, issue_id)
+        self._hashes.setdefault(issue_id, []).append(value)
+        self._last_media_id = max(self._last_media_id, media_id)
+
+    def _load_rows(self, db: Session, after_id: int):
+        rows = db.execute(
+            select(IssueMedia.id, IssueMedia.issue_id, IssueMedia.phash)
+            .join(Issue, Issue.id == IssueMedia.issue_id)  # leaves out deleted issues
+            .where(IssueMedia.phash.isnot(None), IssueMedia.id > after_id)
+            .order_by(IssueMedia.id)
+        ).all()
+        for row in rows:
+            self._add(from_db_hash(row.phash), row.id, row.issue_id)
+        return len(rows)
+
+    def load(self, db: Session):
+        """Rebuild from issue_media"""
+        with self._lock:
+            self._table = MultiIndexHashTable()
+            self._hashes = {}
+            self._last_media_id = 0
+            count = self._load_rows(db, 0)
+            self._loaded_at = self._synced_at = time.monotonic()
+        media_index_logger.info(f"Loaded {count} photo hashes")
+
+    def ensure_loaded(self, db: Session):
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at > REFRESH_SECONDS:
+            self.load(db)
+        elif now - self._synced_at > SYNC_SECONDS:
+            with self._lock:
+                self._load_rows(db, self._last_media_id)
+                self._synced_at = now
+
+    def find_duplicates(self, value: int, exclude_issue_id: Optional[int] = None) -> List[Tuple[int, int, int]]:
+        """(distance, media_id, issue_id) of near-identical photos on other issues"""
+        with self._lock:
+            matches = self._table.search(value)
+        return [match for match in matches if match[2] != exclude_issue_id]
+
+    def add(self, value: int, media_id: int, issue_id: int):
+        with self._lock:
+            self._add(value, media_id, issue_id)
+
+    def remove_issue(self, issue_id: int):
+        with self._lock:
+            for value in self._hashes.pop(issue_id, []):
+                self._table.remove_issue(value, issue_id)
+
+photo_index = PhotoIndex()
+
+def get_photo_index(db: Session) -> PhotoIndex:
+    """Get the photo index, loading it on first use"""
+    photo_index.ensure_loaded(db)
+    return photo_index
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+Reconciliation of the local media directory against issue_media
+A pass walks UPLOAD_DIR in name order and looks every file up in issue_media
+(hot, tombstoned and archived issues alike):
+- referenced files are measured, giving actual disk usage per department;
+- files nothing references (left by a crash between writing a file and committing
+  its row, or between deleting rows and files) are removed once they are older than
+  ORPHAN_GRACE_SECONDS, so uploads still being attached are never touched;
+- staged uploads (services.media) and resumable upload files (services.uploads)
+  are orphans only once they outlive their grace period or their session.
+It then checks the rows whose files should be local and reports those whose file is
+missing. Each run spends at most MEDIA_RECONCILE_IO_BUDGET file operations
+(stat, unlink or existence check) at MEDIA_RECONCILE_OPS_PER_SECOND, and the next
+run continues where it stopped; a finished pass becomes the storage report.
+"""
+import logging
+import os
+import time
+from stat import S_ISREG
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from config import UPLOAD_DIR
+from models.archive import issue_media_archive, issues_archive
+from models.issue import Issue, IssueMedia
+from models.upload_session import UploadSession
+from services.media import STAGED_PREFIX
+from services.storage import LocalStorage
+from utils.metrics import Counter, register
+
+reconcile_logger = logging.getLogger("media_reconcile")
+
+RECONCILE_INTERVAL_SECONDS = 3600
+RECONCILE_IO_BUDGET = int(os.getenv("MEDIA_RECONCILE_IO_BUDGET", "5000"))
+RECONCILE_OPS_PER_SECOND = float(os.getenv("MEDIA_RECONCILE_OPS_PER_SECOND", "500"))
+ORPHAN_GRACE_SECONDS = int(os.getenv("MEDIA_ORPHAN_GRACE_SECONDS", str(24 * 3600)))
+RECONCILE_BATCH_SIZE = 200
+MAX_REPORTED_MISSING = 50
+
+_UPLOAD_SESSION_PREFIX = f"{STAGED_PREFIX}upload_"
+
+ORPHANS_REMOVED = register(Counter(
+    "media_orphans_removed_total", "Unreferenced media files removed by the reconciler", ("kind",)
+))
+ORPHAN_BYTES_REMOVED = register(Counter(
+    "media_orphan_bytes_removed_total", "Bytes freed by removing unreferenced media files"
+))
+
+def _media_rows(db: Session, locations: List[str]):
+    """(file_path, department_id) of media rows at these locations, whichever tier they are in"""
+    hot = (
+        select(IssueMedia.file_path, Issue.department_id)
+        .join(Issue, Issue.id == IssueMedia.issue_id)
+        .where(IssueMedia.file_path.in_(locations))
+    )
+    archived = (
+        select(issue_media_archive.c.file_path, issues_archive.c.department_id)
+        .join(issues_archive, issues_archive.c.id == issue_media_archive.c.issue_id)
+        .where(issue_media_archive.c.file_path.in_(locations))
+    )
+    return db.execute(union_all(hot, archived), execution_options={"include_deleted": True}).all()
+
+class MediaReconciler:
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+        self.local = LocalStorage(root)
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._reset()
+
+    def _reset(self):
+        self._phase = "files"
+        self._cursor = ""  # last file name handled in this pass
+        self._row_cursor = 0  # last media id checked for a missing file
+        self._started_at = time.time()
+        self._usage: Dict[Optional[int], List[int]] = {}
+        self._files = 0
+        self._bytes = 0
+        self._orphans = 0
+        self._orphan_bytes = 0
+        self._missing: List[int] = []
+        self._missing_count = 0
+
+    def _throttle(self, ops: int):
+        if ops and RECONCILE_OPS_PER_SECOND > 0:
+            time.sleep(ops / RECONCILE_OPS_PER_SECOND)
+
+    def _remove_orphan(self, path: str, size: int, kind: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self._orphans += 1
+        self._orphan_bytes += size
+        ORPHANS_REMOVED.inc((kind,))
+        ORPHAN_BYTES_REMOVED.inc(amount=size)
+        reconcile_logger.info(f"Removed orphaned {kind} file {path} ({size} bytes)")
+
+    def _scan_files(self, db: Session, budget: int) -> int:
+        """Handle directory entries after the cursor; returns operations spent"""
+        try:
+            # One directory read per run; names only, no per-file I/O
+            names = sorted(
+                name for name in os.listdir(self.root) if name > self._cursor and not name.startswith(".")
+            )
+        except FileNotFoundError:
+            names = []
+        spent = 0
+        start = 0
+        now = time.time()
+        while start < len(names):
+            if spent >= budget:
+                return spent
+            batch = names[start:start + min(RECONCILE_BATCH_SIZE, budget - spent)]
+            start += len(batch)
+            paths = {name: os.path.join(self.root, name) for name in batch}
+            referenced = {row.file_path: row.department_id for row in _media_rows(db, list(paths.values()))}
+            session_ids = [name[len(_UPLOAD_SESSION_PREFIX):] for name in batch if name.startswith(_UPLOAD_SESSION_PREFIX)]
+            live_sessions = set(db.execute(
+                select(UploadSession.id).where(UploadSession.id.in_(session_ids))
+            ).scalars()) if session_ids else set()
+
+            ops = 0
+            for name, path in paths.items():
+                self._cursor = name
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                finally:
+                    ops += 1
+                if not S_ISREG(info.st_mode):
+                    continue
+                if path in referenced:
+                    usage = self._usage.setdefault(referenced[path], [0, 0])
+                    usage[0] += 1
+                    usage[1] += info.st_size
+                    self._files += 1
+                    self._bytes += info.st_size
+                    continue
+                if now - info.st_mtime < ORPHAN_GRACE_SECONDS:
+                    continue
+                if name.startswith(_UPLOAD_SESSION_PREFIX):
+                    if name[len(_UPLOAD_SESSION_PREFIX):] not in live_sessions:
+                        self._remove_orphan(path, info.st_size, "upload")
+                        ops += 1
+                elif name.startswith(STAGED_PREFIX):
+                    self._remove_orphan(path, info.st_size, "staged")
+                    ops += 1
+                else:
+                    self._remove_orphan(path, info.st_size, "media")
+                    ops += 1
+            spent += ops
+            self._throttle(ops)
+        self._phase = "rows"
+        return spent
+
+    def _check_rows(self, db: Session, budget: int) -> int:
+        """Look for media rows whose local file is gone; returns operations spent"""
+        spent = 0
+        while spent < budget:
+            rows = db.execute(
+                select(IssueMedia.id, IssueMedia.file_path)
+                .where(IssueMedia.id > self._row_cursor)
+                .order_by(IssueMedia.id)
+                .limit(min(RECONCILE_BATCH_SIZE, budget - spent)),
+                execution_options={"include_deleted": True}
+            ).all()
+            if not rows:
+                self._phase = "done"
+                break
+            ops = 0
+            for row in rows:
+                self._row_cursor = row.id
+                if not self.local.owns(row.file_path):
+                    continue
+                ops += 1
+                if not os.path.exists(row.file_path):
+                    self._missing_count += 1
+                    if len(self._missing) < MAX_REPORTED_MISSING:
+                        self._missing.append(row.id)
+            spent += ops
+            self._throttle(ops)
+        return spent
+
+    def _finish_pass(self):
+        self.last_report = {
+            "started_at": self._started_at,
+            "completed_at": time.time(),
+            "files": self._files,
+            "bytes": self._bytes,
+            "orphans_removed": self._orphans,
+            "orphan_bytes_removed": self._orphan_bytes,
+            "missing_files": self._missing_count,
+            "missing_media_ids": self._missing,
+            "departments": [
+                {"department_id": department_id, "files": files, "bytes": size}
+                for department_id, (files, size) in sorted(
+                    self._usage.items(), key=lambda item: item[1][1], reverse=True
+                )
+            ],
+        }
+        if self._missing_count:
+            reconcile_logger.warning(
+                f"{self._missing_count} media rows point to missing files, e.g. ids {self._missing[:10]}"
+            )
+        reconcile_logger.info(
+            f"Media pass done: {self._files} files, {self._bytes} bytes, "
+            f"{self._orphans} orphans removed ({self._orphan_bytes} bytes)"
+        )
+        self._reset()
+
+    def run(self, db: Session, budget: int = RECONCILE_IO_BUDGET) -> int:
+        """Continue the current pass within `budget` file operations; returns operations spent"""
+        spent = 0
+        if self._phase == "files":
+            spent += self._scan_files(db, budget)
+        if self._phase == "rows" and spent < budget:
+            spent += self._check_rows(db, budget - spent)
+        if self._phase == "done":
+            self._finish_pass()
+        return spent
+
+media_reconciler = MediaReconciler()
+
+def run_media_reconcile(db: Session):
+    """Periodic job entry point"""
+    media_reconciler.run(db)
+
+def recorded_storage_usage(db: Session) -> List[Dict[str, Any]]:
+    """Media files and bytes per department as recorded in issue_media (all storage backends)"""
+    hot = (
+        select(Issue.department_id.label("department_id"), IssueMedia.file_size.label("file_size"))
+        .join(Issue, Issue.id == IssueMedia.issue_id)
+    )
+    archived = (
+        select(issues_archive.c.department_id, issue_media_archive.c.file_size)
+        .join(issues_archive, issues_archive.c.id == issue_media_archive.c.issue_id)
+    )
+    media = union_all(hot, archived).subquery()
+    rows = db.execute(
+        select(media.c.department_id, func.count(), func.coalesce(func.sum(media.c.file_size), 0))
+        .group_by(media.c.department_id)
+        .order_by(func.coalesce(func.sum(media.c.file_size), 0).desc())
+    ).all()
+    return [{"department_id": row[0], "files": row[1], "bytes": int(row[2])} for row in rows]
\ No newline at end of file
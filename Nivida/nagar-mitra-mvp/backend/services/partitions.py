@@ -0,0 +1,116 @@
+"""
+Monthly range partitions for issues and issue_media on PostgreSQL
+After the 0006_partition_issues migration converts the tables, `issues` and `issue_media` are
+partitioned by created_at month: everything older than the conversion stays in one
+`<table>_legacy` partition, and the periodic job creates `<table>_pYYYYMM`
+partitions PARTITION_MONTHS_AHEAD months ahead so inserts always have a home.
+Date-bounded queries (created_at ranges) only read the matching partitions.
+On other databases, or before the migration, everything here is a no-op.
+"""
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+partitions_logger = logging.getLogger("partitions")
+
+PARTITIONED_TABLES = ("issues", "issue_media")
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_INTERVAL_SECONDS = 6 * 3600
+
+_BOUND_RE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+def _bound_literal(month: date) -> str:
+    # Explicit UTC offset: bounds must not depend on the session time zone
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    value = value.strip()
+    if value.upper() in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+def existing_ranges(conn: Connection, table: str) -> List[Tuple[Optional[datetime], Optional[datetime]]]:
+    """(from, to) of each partition of a table; None stands for MINVALUE/MAXVALUE"""
+    rows = conn.execute(text(
+        "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": table}).scalars().all()
+    ranges = []
+    for bound in rows:
+        match = _BOUND_RE.search(bound or "")
+        if match:
+            ranges.append((_parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return ranges
+
+def _covered(ranges, start: datetime, end: datetime) -> bool:
+    """True if [start, end) overlaps an existing partition"""
+    for low, high in ranges:
+        if (low is None or low < end) and (high is None or start < high):
+            return True
+    return False
+
+def create_month_partitions(conn: Connection, table: str, first_month: date, end_month: date) -> List[str]:
+    """Create the monthly partitions of `table` in [first_month, end_month) that are not covered yet"""
+    ranges = existing_ranges(conn, table)
+    created = []
+    month = month_start(first_month)
+    while month < end_month:
+        next_month = add_months(month, 1)
+        start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+        end = datetime(next_month.year, next_month.month, 1, tzinfo=timezone.utc)
+        if not _covered(ranges, start, end):
+            name = partition_name(table, month)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ({_bound_literal(month)}) TO ({_bound_literal(next_month)})"
+            ))
+            ranges.append((start, end))
+            created.append(name)
+        month = next_month
+    return created
+
+def partitioned_tables(conn: Connection) -> Set[str]:
+    """Which of PARTITIONED_TABLES are actually partitioned in this database"""
+    if conn.dialect.name != "postgresql":
+        return set()
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = ANY(:tables) AND c.relnamespace = CAST(current_schema() AS regnamespace)"
+    ), {"tables": list(PARTITIONED_TABLES)}).scalars().all()
+    return set(rows)
+
+def ensure_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """Create missing partitions from the current month to `months_ahead` months ahead"""
+    conn = db.connection()
+    tables = partitioned_tables(conn)
+    if not tables:
+        return []
+    first_month = month_start(datetime.utcnow().date())
+    end_month = add_months(first_month, months_ahead + 1)
+    created = []
+    for table in sorted(tables):
+        created.extend(create_month_partitions(conn, table, first_month, end_month))
+    db.commit()
+    if created:
+        partitions_logger.info(f"Created partitions {', '.join(created)}")
+    return created
+
+def run_ensure_partitions(db: Session):
+    """Periodic job entry point"""
+    ensure_partitions(db)
\ No newline at end of file
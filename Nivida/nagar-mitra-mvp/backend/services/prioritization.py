@@ -0,0 +1,191 @@
+"""
+Urgency scoring and SLA tracking for open issues
+The score combines the priority detected from the issue text, net upvotes, age
+relative to the SLA and the number of open reports nearby. It is stored in the
+indexed issues.urgency_score column so the admin queue is an index range read;
+a periodic sweep keeps the age and clustering parts current and flags SLA breaches.
+"""
+import logging
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from models.issue import Issue, IssuePriority, IssueStatus
+
+priority_logger = logging.getLogger("prioritization")
+
+PRIORITY_POINTS = {
+    IssuePriority.LOW: 10.0,
+    IssuePriority.MEDIUM: 20.0,
+    IssuePriority.HIGH: 40.0,
+    IssuePriority.CRITICAL: 80.0,
+}
+SLA_HOURS = {
+    IssuePriority.LOW: 336,
+    IssuePriority.MEDIUM: 168,
+    IssuePriority.HIGH: 72,
+    IssuePriority.CRITICAL: 24,
+}
+OPEN_STATUSES = (IssueStatus.PENDING, IssueStatus.ASSIGNED, IssueStatus.IN_PROGRESS)
+
+VOTE_WEIGHT = 10.0
+AGE_WEIGHT = 30.0  # points at the SLA deadline, capped at twice that when overdue
+CLUSTER_WEIGHT = 8.0
+NEARBY_RADIUS_M = 250.0
+NEARBY_WINDOW_DAYS = 30
+SWEEP_INTERVAL_SECONDS = int(os.getenv("PRIORITY_SWEEP_SECONDS", "300"))
+SWEEP_BATCH_SIZE = 1000
+
+METERS_PER_DEGREE = 111320.0
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def sla_due_at(priority: IssuePriority, created_at: datetime) -> datetime:
+    return _naive_utc(created_at) + timedelta(hours=SLA_HOURS[priority or IssuePriority.MEDIUM])
+
+def compute_urgency(
+    priority: Optional[IssuePriority],
+    upvotes: int,
+    downvotes: int,
+    created_at: Optional[datetime],
+    nearby_count: int,
+    now: Optional[datetime] = None
+) -> float:
+    """Urgency score; higher means the issue should be handled sooner"""
+    priority = priority or IssuePriority.MEDIUM
+    now = now or datetime.utcnow()
+    score = PRIORITY_POINTS[priority]
+    score += VOTE_WEIGHT * math.log1p(max((upvotes or 0) - (downvotes or 0), 0))
+    if created_at is not None:
+        age_hours = max((now - _naive_utc(created_at)).total_seconds() / 3600.0, 0.0)
+        score += AGE_WEIGHT * min(age_hours / SLA_HOURS[priority], 2.0)
+    score += CLUSTER_WEIGHT * math.log1p(nearby_count or 0)
+    return round(score, 3)
+
+def _bounding_box(latitude: float, longitude: float, radius_m: float) -> Tuple[float, float, float, float]:
+    dlat = radius_m / METERS_PER_DEGREE
+    dlon = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon
+
+def count_nearby(db: Session, issue: Issue) -> int:
+    """Open issues of the same department within NEARBY_RADIUS_M (bounding box)"""
+    if issue.latitude is None or issue.longitude is None:
+        return 0
+    min_lat, max_lat, min_lon, max_lon = _bounding_box(issue.latitude, issue.longitude, NEARBY_RADIUS_M)
+    filters = [
+        Issue.status.in_(OPEN_STATUSES),
+        Issue.latitude.between(min_lat, max_lat),
+        Issue.longitude.between(min_lon, max_lon),
+        Issue.created_at >= datetime.utcnow() - timedelta(days=NEARBY_WINDOW_DAYS),
+    ]
+    if issue.department_id is not None:
+        filters.append(Issue.department_id == issue.department_id)
+    if issue.id is not None:
+        filters.append(Issue.id != issue.id)
+    return db.execute(select(func.count(Issue.id)).where(*filters)).scalar() or 0
+
+def prioritize_new_issue(db: Session, issue: Issue, priority: IssuePriority):
+    """Set priority, nearby count, urgency and SLA deadline on a not-yet-committed issue"""
+    now = datetime.utcnow()
+    issue.priority = priority
+    issue.nearby_count = count_nearby(db, issue)
+    issue.sla_due_at = sla_due_at(priority, now)
+    issue.urgency_score = compute_urgency(priority, 0, 0, now, issue.nearby_count, now)
+
+def rescore_issue(issue: Issue):
+    """Recompute the stored urgency after votes or a priority change (no queries)"""
+    issue.urgency_score = compute_urgency(
+        issue.priority, issue.upvotes, issue.downvotes, issue.created_at, issue.nearby_count
+    )
+    if issue.created_at is not None:
+        issue.sla_due_at = sla_due_at(issue.priority, issue.created_at)
+
+def _nearby_counts(points: List[Tuple[int, Optional[int], float, float]]) -> Dict[int, int]:
+    """Count neighbours within NEARBY_RADIUS_M per point using a spatial hash"""
+    cells = defaultdict(list)
+    projected = []
+    for issue_id, dept_id, lat, lon in points:
+        x = lon * METERS_PER_DEGREE * math.cos(math.radians(lat))
+        y = lat * METERS_PER_DEGREE
+        cell = (dept_id, int(x // NEARBY_RADIUS_M), int(y // NEARBY_RADIUS_M))
+        cells[cell].append((issue_id, x, y))
+        projected.append((issue_id, cell, x, y))
+
+    radius_sq = NEARBY_RADIUS_M * NEARBY_RADIUS_M
+    counts = {}
+    for issue_id, (dept_id, cx, cy), x, y in projected:
+        count = 0
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other_id, ox, oy in cells.get((dept_id, cx + dx, cy + dy), ()):
+                    if other_id != issue_id and (ox - x) ** 2 + (oy - y) ** 2 <= radius_sq:
+                        count += 1
+        counts[issue_id] = count
+    return counts
+
+def refresh_open_issues(db: Session, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    """Recompute urgency (age and clustering parts) for every open issue"""
+    now = datetime.utcnow()
+    rows = db.execute(
+        select(
+            Issue.id, Issue.priority, Issue.upvotes, Issue.downvotes, Issue.created_at,
+            Issue.department_id, Issue.latitude, Issue.longitude,
+        ).where(Issue.status.in_(OPEN_STATUSES))
+    ).all()
+
+    window_start = now - timedelta(days=NEARBY_WINDOW_DAYS)
+    nearby = _nearby_counts([
+        (row.id, row.department_id, row.latitude, row.longitude)
+        for row in rows
+        if row.latitude is not None and row.longitude is not None
+        and row.created_at is not None and _naive_utc(row.created_at) >= window_start
+    ])
+
+    statement = update(Issue.__table__).where(Issue.__table__.c.id == bindparam("issue_id")).values(
+        urgency_score=bindparam("score"),
+        nearby_count=bindparam("nearby"),
+        # Bookkeeping, not a user-visible change: keep updated_at as it was
+        updated_at=Issue.__table__.c.updated_at,
+    )
+    for start in range(0, len(rows), batch_size):
+        params = []
+        for row in rows[start:start + batch_size]:
+            count = nearby.get(row.id, 0)
+            params.append({
+                "issue_id": row.id,
+                "score": compute_urgency(row.priority, row.upvotes, row.downvotes, row.created_at, count, now),
+                "nearby": count,
+            })
+        db.execute(statement, params)
+        db.commit()
+    return len(rows)
+
+def sweep_sla_breaches(db: Session) -> int:
+    """Flag open issues past their SLA deadline; returns the number newly breached"""
+    result = db.execute(
+        update(Issue.__table__)
+        .where(
+            Issue.__table__.c.status.in_(OPEN_STATUSES),
+            Issue.__table__.c.sla_due_at < datetime.utcnow(),
+            Issue.__table__.c.sla_breached == False
+        )
+        .values(sla_breached=True, updated_at=Issue.__table__.c.updated_at)
+    )
+    db.commit()
+    if result.rowcount:
+        priority_logger.warning(f"{result.rowcount} issues breached their SLA")
+    return result.rowcount
+
+def run_priority_sweep(db: Session):
+    """Periodic job: refresh urgency scores, then detect SLA breaches"""
+    refreshed = refresh_open_issues(db)
+    breached = sweep_sla_breaches(db)
+    priority_logger.info(f"Priority sweep refreshed {refreshed} issues, {breached} new SLA breaches")
\ No newline at end of file
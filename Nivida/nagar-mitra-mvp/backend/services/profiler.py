@@ -0,0 +1,217 @@
+"""
+On-demand sampling profiler for the current worker process
+A background thread samples every thread's Python stack with sys._current_frames()
+at a fixed interval and aggregates them as collapsed stacks (the input format of
+flamegraph.pl and speedscope). Event loop samples are attributed to the route of the
+request whose task is running. Nothing is installed while no session is active: the
+metrics middleware only checks get_profile_session() for None.
+"""
+import asyncio
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+profiler_logger = logging.getLogger("profiler")
+
+MAX_PROFILE_SECONDS = 120
+MAX_STACK_DEPTH = 128
+# Leaf frames, as (co_filename, co_name), of threads blocked in the standard library
+# waiting rather than working: the event loop's selector, locks, conditions and queues
+IDLE_FUNCTIONS = frozenset(
+    (os.path.join(sysconfig.get_paths()["stdlib"], module), name)
+    for module, name in (
+        ("selectors.py", "select"),
+        ("threading.py", "wait"),
+        ("threading.py", "_wait_for_tstate_lock"),
+        ("queue.py", "get"),
+        (os.path.join("concurrent", "futures", "thread.py"), "_worker"),
+    )
+)
+
+_SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from asyncio.tasks import _current_tasks
+except ImportError:  # private API; without it event loop samples are not attributed to routes
+    _current_tasks = None
+
+_frame_labels: Dict[Any, str] = {}
+
+def _frame_label(code) -> str:
+    label = _frame_labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_SOURCE_ROOT):
+            filename = os.path.relpath(filename, _SOURCE_ROOT)
+        elif "site-packages" in filename:
+            filename = filename.split("site-packages" + os.sep, 1)[1]
+        else:
+            filename = os.path.basename(filename)
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+        _frame_labels[code] = label
+    return label
+
+class RouteStats:
+    __slots__ = ("requests", "durations", "queries", "db_time", "errors", "samples")
+
+    def __init__(self):
+        self.requests = 0
+        self.durations: List[float] = []
+        self.queries = 0
+        self.db_time = 0.0
+        self.errors = 0
+        self.samples = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        durations = sorted(self.durations)
+        def percentile(p: float) -> Optional[float]:
+            if not durations:
+                return None
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))] * 1000, 2)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_ms": round(sum(durations) * 1000 / len(durations), 2) if durations else None,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(durations[-1] * 1000, 2) if durations else None,
+            "db_queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 2),
+            "samples": self.samples,
+        }
+
+class ProfileSession:
+    """One profiling run, ending after `seconds` or `max_requests` completed requests"""
+
+    def __init__(self, seconds: float, max_requests: Optional[int], interval: float, include_idle: bool):
+        self.seconds = seconds
+        self.max_requests = max_requests
+        self.interval = interval
+        self.include_idle = include_idle
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+        self.in_flight: Dict[Any, dict] = {}
+        self.completed_requests = 0
+        self.sample_count = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    # Hooks called by the metrics middleware on the event loop
+    def request_started(self, scope) -> Any:
+        task = asyncio.current_task()
+        if task is not None:
+            self.in_flight[task] = scope
+        return task
+
+    def request_finished(self, task, route: str, status_code: int, elapsed: float, stats):
+        self.in_flight.pop(task, None)
+        route_stats = self.routes[route]
+        route_stats.requests += 1
+        route_stats.durations.append(elapsed)
+        route_stats.queries += stats.queries
+        route_stats.db_time += stats.db_time
+        if status_code >= 500:
+            route_stats.errors += 1
+        self.completed_requests += 1
+        if self.max_requests and self.completed_requests >= self.max_requests:
+            self._stop.set()
+
+    def _thread_root(self, thread_id: int, names: Dict[int, str]) -> str:
+        if thread_id == self.loop_thread_id:
+            task = _current_tasks.get(self.loop) if _current_tasks is not None else None
+            scope = self.in_flight.get(task) if task is not None else None
+            if scope is not None:
+                route = scope.get("route")
+                label = route.path if route is not None else scope["path"]
+                self.routes[label].samples += 1
+                return f"route {scope['method']} {label}"
+            return "event loop"
+        return f"thread {names.get(thread_id, thread_id)}"
+
+    def _sample(self, own_id: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if not self.include_idle and (frame.f_code.co_filename, frame.f_code.co_name) in IDLE_FUNCTIONS:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(self._thread_root(thread_id, names))
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+        self.sample_count += 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            self._sample(own_id)
+            self._stop.wait(self.interval)
+        self.finished_at = time.time()
+        self._stop.set()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def done(self) -> bool:
+        return self._stop.is_set() and not self._thread.is_alive()
+
+    def collapsed(self) -> str:
+        """Collapsed stacks: one "frame;frame;frame count" line per distinct stack"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": round((self.finished_at or time.time()) - self.started_at, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.sample_count,
+            "requests": self.completed_requests,
+            "routes": {
+                route: stats.to_dict()
+                for route, stats in sorted(self.routes.items(), key=lambda item: -item[1].requests)
+            },
+        }
+
+_session: Optional[ProfileSession] = None
+
+def get_profile_session() -> Optional[ProfileSession]:
+    return _session
+
+async def run_profile(
+    seconds: float,
+    max_requests: Optional[int] = None,
+    interval: float = 0.005,
+    include_idle: bool = False
+) -> ProfileSession:
+    """Profile this worker until the time or request limit is reached; one session at a time"""
+    global _session
+    if _session is not None:
+        raise RuntimeError("A profiling session is already running")
+    session = ProfileSession(min(seconds, MAX_PROFILE_SECONDS), max_requests, interval, include_idle)
+    _session = session
+    profiler_logger.info(f"Profiling for up to {session.seconds}s ({max_requests or 'any'} requests)")
+    try:
+        session.start()
+        while not session.done:
+            await asyncio.sleep(0.05)
+    finally:
+        session.stop()
+        _session = None
+    return session
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Soft delete and background purge of issues
+Deleting an issue only sets its deleted_at tombstone (and records the DELETED
+event); from then on every ORM query leaves it out (models.issue). The purge job
+later removes tombstoned issues in batches: media files first, then the rows, so a
+crash in between leaves a tombstone that the next run finishes rather than rows
+pointing to missing files.
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models.issue import Issue, IssueMedia
+from models.issue_event import IssueEventType
+from services.issue_events import record_issue_event
+from services.media import delete_media_files
+from services.scheduler import call_async
+from utils.metrics import Counter, register
+
+purge_logger = logging.getLogger("purge")
+
+PURGE_INTERVAL_SECONDS = 300
+PURGE_BATCH_SIZE = 100
+PURGE_MAX_BATCHES = 20
+# Tombstones younger than this are kept, so a mistaken delete can still be undone in the database
+PURGE_AFTER_SECONDS = int(os.getenv("ISSUE_PURGE_AFTER_SECONDS", "0"))
+
+ISSUES_PURGED = register(Counter("issues_purged_total", "Soft-deleted issues removed by the purge job"))
+
+def soft_delete_issue(db: Session, issue: Issue, actor_id: Optional[int]):
+    """Tombstone an issue (not committed)"""
+    issue.deleted_at = datetime.utcnow()
+    record_issue_event(db, issue, IssueEventType.DELETED, actor_id)
+
+def purge_deleted_issues(db: Session, batch_size: int = PURGE_BATCH_SIZE, max_batches: Optional[int] = None,
+                         older_than_seconds: int = PURGE_AFTER_SECONDS) -> int:
+    """Remove tombstoned issues with their media; returns issues purged"""
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than_seconds)
+    purged = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        issues = (
+            db.query(Issue)
+            .execution_options(include_deleted=True)
+            .filter(Issue.deleted_at.isnot(None), Issue.deleted_at <= cutoff)
+            .order_by(Issue.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not issues:
+            break
+        issue_ids = [issue.id for issue in issues]
+        media = db.query(IssueMedia).filter(IssueMedia.issue_id.in_(issue_ids)).all()
+        call_async(delete_media_files, media)
+
+        for issue in issues:
+            db.delete(issue)  # media rows go with it (cascade)
+        db.commit()
+        purged += len(issues)
+        batches += 1
+    if purged:
+        ISSUES_PURGED.inc(amount=purged)
+        purge_logger.info(f"Purged {purged} deleted issues")
+    return purged
+
+def run_purge(db: Session):
+    """Periodic job entry point"""
+    purge_deleted_issues(db, max_batches=PURGE_MAX_BATCHES)
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Time-decayed "hot" ranking for issues
+Uses the Reddit-style formula: log10 of the net vote count plus the creation time
+divided by a decay constant. Because the time term grows for newer issues instead of
+shrinking for older ones, the relative order of two issues never changes while no
+one votes, so the score can be stored in an indexed column and only needs updating
+on votes. A periodic job recomputes recent issues to repair any drift.
+"""
+import logging
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from models.issue import Issue
+
+ranking_logger = logging.getLogger("ranking")
+
+HOT_EPOCH = datetime(2024, 1, 1)
+# Seconds of recency worth one order of magnitude of net votes (12.5 hours)
+HOT_DECAY_SECONDS = 45000.0
+HOT_REFRESH_DAYS = 14
+HOT_REFRESH_INTERVAL_SECONDS = int(os.getenv("HOT_REFRESH_SECONDS", "900"))
+HOT_REFRESH_BATCH_SIZE = 1000
+
+def hot_score(upvotes: int, downvotes: int, created_at: Optional[datetime]) -> float:
+    """Hot score for an issue; higher is hotter"""
+    net = (upvotes or 0) - (downvotes or 0)
+    order = math.log10(max(abs(net), 1))
+    sign = 1 if net > 0 else -1 if net < 0 else 0
+    if created_at is None:
+        created_at = datetime.utcnow()
+    elif created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    seconds = (created_at - HOT_EPOCH).total_seconds()
+    return round(sign * order + seconds / HOT_DECAY_SECONDS, 7)
+
+def rescore_hot(issue: Issue):
+    """Update an issue's stored hot score after a vote"""
+    issue.hot_score = hot_score(issue.upvotes, issue.downvotes, issue.created_at)
+
+def refresh_hot_scores(db: Session, days: int = HOT_REFRESH_DAYS, batch_size: int = HOT_REFRESH_BATCH_SIZE) -> int:
+    """Recompute hot scores for recently created issues; returns rows updated"""
+    statement = update(Issue.__table__).where(Issue.__table__.c.id == bindparam("issue_id")).values(
+        hot_score=bindparam("score"),
+        updated_at=Issue.__table__.c.updated_at,
+    )
+    since = datetime.utcnow() - timedelta(days=days)
+    last_id = 0
+    changed = 0
+    while True:
+        rows = db.execute(
+            select(Issue.id, Issue.upvotes, Issue.downvotes, Issue.created_at, Issue.hot_score)
+            .where(Issue.created_at >= since, Issue.id > last_id)
+            .order_by(Issue.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        params = []
+        for row in rows:
+            score = hot_score(row.upvotes, row.downvotes, row.created_at)
+            if row.hot_score is None or abs(score - row.hot_score) > 1e-6:
+                params.append({"issue_id": row.id, "score": score})
+        if params:
+            db.execute(statement, params)
+            db.commit()
+            changed += len(params)
+    if changed:
+        ranking_logger.info(f"Refreshed hot score of {changed} issues")
+    return changed
+
+def run_hot_refresh(db: Session):
+    """Periodic job entry point"""
+    refresh_hot_scores(db)
\ No newline at end of file
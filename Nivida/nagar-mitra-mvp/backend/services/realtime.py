@@ -0,0 +1,269 @@
+"""
+In-process fan-out hub for realtime issue updates
+Issue lifecycle events are published to channels (per user, per department and the
+admin review queue) and pushed to subscribers over Server-Sent Events.
+Each subscriber has a small bounded buffer: a newer event for the same issue replaces
+the queued one, and when the buffer is full the oldest event is dropped and the
+client is told to resync.
+Under the serving supervisor (serve.py) each worker has its own hub; events are also
+relayed to the other workers as datagrams on Unix sockets in SHARED_CACHE_DIR, so a
+subscriber receives events published by whichever worker handled the change.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+realtime_logger = logging.getLogger("realtime")
+
+ADMIN_REVIEW_CHANNEL = "admin:review"
+SUBSCRIBER_BUFFER_SIZE = 64
+# How long the list of sibling workers' sockets is reused before listing the directory again
+RELAY_PEERS_SECONDS = 1.0
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+def department_channel(department_id: int) -> str:
+    return f"department:{department_id}"
+
+class Subscriber:
+    """One connected client: a coalescing, bounded event buffer"""
+
+    __slots__ = ("channels", "buffer", "max_size", "dropped", "_wakeup")
+
+    def __init__(self, channels: Iterable[str], max_size: int = SUBSCRIBER_BUFFER_SIZE):
+        self.channels = frozenset(channels)
+        self.buffer: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self.max_size = max_size
+        self.dropped = 0
+        self._wakeup = asyncio.Event()
+
+    def push(self, key: Any, event: Dict[str, Any]):
+        """Queue an event, coalescing by key and dropping the oldest when full"""
+        if key in self.buffer:
+            # Only the latest state of an issue matters to the client
+            del self.buffer[key]
+        elif len(self.buffer) >= self.max_size:
+            self.buffer.popitem(last=False)
+            self.dropped += 1
+        self.buffer[key] = event
+        self._wakeup.set()
+
+    async def get_batch(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Wait for events and drain the buffer; returns [] on timeout"""
+        if not self.buffer:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+        events = list(self.buffer.values())
+        self.buffer.clear()
+        if self.dropped:
+            # The client missed events and should refetch its view
+            events.insert(0, {"type": "resync", "dropped": self.dropped})
+            self.dropped = 0
+        return events
+
+class EventRelay:
+    """Passes events between the worker processes of one supervisor
+
+    Every worker sends to the socket of each sibling that has subscribers; datagrams
+    that do not fit a full socket buffer are dropped, like events a slow client misses.
+    """
+
+    PREFIX = "events-"
+
+    def __init__(self, directory: str):
+        from utils.serialization import dumps
+
+        self._dumps = dumps
+        self.directory = directory
+        self.path = os.path.join(directory, f"{self.PREFIX}{os.getpid()}.sock")
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._receiver: Optional[socket.socket] = None
+        self._peers: List[str] = []
+        self._peers_at = 0.0
+
+    def _peer_paths(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_at > RELAY_PEERS_SECONDS:
+            try:
+                names = os.listdir(self.directory)
+            except FileNotFoundError:
+                names = []
+            self._peers = [
+                os.path.join(self.directory, name) for name in names
+                if name.startswith(self.PREFIX) and os.path.join(self.directory, name) != self.path
+            ]
+            self._peers_at = now
+        return self._peers
+
+    def send(self, channels: List[str], key: Any, event: Dict[str, Any]):
+        peers = self._peer_paths()
+        if not peers:
+            return
+        data = self._dumps({"channels": channels, "key": key, "event": event})
+        for path in peers:
+            try:
+                self._sender.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker is gone; forget its socket
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                self._peers_at = 0.0
+            except BlockingIOError:
+                realtime_logger.warning(f"Relay to {path} is full; event for {key} dropped")
+            except OSError as e:
+                realtime_logger.error(f"Error relaying event for {key}: {str(e)}")
+
+    def listen(self, loop: asyncio.AbstractEventLoop, dispatch):
+        """Start receiving siblings' events on the loop; idempotent"""
+        if self._receiver is not None:
+            return
+        import json
+
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        receiver.bind(self.path)
+        receiver.setblocking(False)
+        self._receiver = receiver
+
+        def on_readable():
+            while True:
+                try:
+                    data = receiver.recv(65536)
+                except BlockingIOError:
+                    return
+                try:
+                    message = json.loads(data)
+                    dispatch(message["channels"], message["key"], message["event"])
+                except Exception as e:
+                    realtime_logger.error(f"Error dispatching a relayed event: {str(e)}")
+
+        loop.add_reader(receiver.fileno(), on_readable)
+
+_relay: Optional[EventRelay] = None
+
+def get_event_relay() -> Optional[EventRelay]:
+    """Relay to the sibling workers of this process, if it runs under the supervisor"""
+    global _relay
+    directory = os.getenv("SHARED_CACHE_DIR")
+    if not directory:
+        return None
+    # A forked worker must not reuse its parent's sockets
+    if _relay is None or _relay.directory != directory or not _relay.path.endswith(f"-{os.getpid()}.sock"):
+        _relay = EventRelay(directory)
+    return _relay
+
+class EventHub:
+    """Routes published events to the subscribers of each channel"""
+
+    def __init__(self):
+        self._channels: Dict[str, Set[Subscriber]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len({sub for subs in self._channels.values() for sub in subs})
+
+    def subscribe(self, channels: Iterable[str], max_size: int = SUBSCRIBER_BUFFER_SIZE) -> Subscriber:
+        """Register a subscriber; must be called from the event loop"""
+        self._loop = asyncio.get_running_loop()
+        relay = get_event_relay()
+        if relay is not None:
+            relay.listen(self._loop, self._dispatch)
+        subscriber = Subscriber(channels, max_size)
+        for channel in subscriber.channels:
+            self._channels.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for channel in subscriber.channels:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channels: Iterable[str], key: Any, event: Dict[str, Any]):
+        """Fan an event out to every subscriber of the given channels (thread-safe)"""
+        relay = get_event_relay()
+        if relay is not None:
+            relay.send(list(channels), key, event)
+        if not self._channels:
+            return
+        loop = self._loop
+        if loop is None:
+            return
+        if _running_loop() is loop:
+            self._dispatch(channels, key, event)
+        else:
+            # Published from a threadpool (e.g. bulk import); hand over to the loop
+            loop.call_soon_threadsafe(self._dispatch, list(channels), key, event)
+
+    def _dispatch(self, channels: Iterable[str], key: Any, event: Dict[str, Any]):
+        delivered = set()
+        for channel in channels:
+            for subscriber in self._channels.get(channel, ()):
+                if subscriber not in delivered:
+                    delivered.add(subscriber)
+                    subscriber.push(key, event)
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+# Global hub instance (one per worker process, linked by the relay)
+event_hub = EventHub()
+
+def get_event_hub() -> EventHub:
+    """Get event hub instance"""
+    return event_hub
+
+def build_issue_event(issue, event_type: str) -> Tuple[List[str], Dict[str, Any]]:
+    """Snapshot an issue into (channels, event) for the reporter, department and review queue"""
+    event = {
+        "type": event_type,
+        "issue_id": issue.id,
+        "status": issue.status,
+        "department_id": issue.department_id,
+        "worker_id": issue.worker_id,
+        "needs_manual_review": issue.needs_manual_review,
+        "upvotes": issue.upvotes,
+        "downvotes": issue.downvotes,
+        "timestamp": datetime.utcnow(),
+    }
+
+    channels = [user_channel(issue.user_id)]
+    if issue.department_id:
+        channels.append(department_channel(issue.department_id))
+    if issue.needs_manual_review or event_type == "assigned":
+        # Assignment takes an issue off the review queue, admins need to see that too
+        channels.append(ADMIN_REVIEW_CHANNEL)
+    return channels, event
+
+def publish_event(channels: List[str], event: Dict[str, Any]):
+    """Publish a prepared issue event, never failing the caller"""
+    try:
+        event_hub.publish(channels, event["issue_id"], event)
+    except Exception as e:
+        realtime_logger.error(f"Error publishing {event['type']} event for issue {event['issue_id']}: {str(e)}")
+
+def publish_issue_event(issue, event_type: str):
+    """Publish an issue lifecycle event; call after the change is committed"""
+    publish_event(*build_issue_event(issue, event_type))
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Minimal periodic job runner for background maintenance
+Jobs are plain functions taking a database session; they run in the threadpool on
+a fixed interval so request handlers never do sweep work themselves.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+
+scheduler_logger = logging.getLogger("scheduler")
+
+# Set to "false" on all but one process when running several API processes
+BACKGROUND_JOBS_ENABLED = os.getenv("BACKGROUND_JOBS_ENABLED", "true").lower() == "true"
+
+class PeriodicJob:
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[Session], None], initial_delay: float):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.initial_delay = initial_delay
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def run_once(self):
+        """Run the job with its own session, logging instead of raising"""
+        db = SessionLocal()
+        start = time.perf_counter()
+        try:
+            self.func(db)
+            self.last_error = None
+        except Exception as e:
+            db.rollback()
+            self.last_error = str(e)
+            scheduler_logger.error(f"Background job {self.name} failed: {str(e)}")
+        finally:
+            db.close()
+            self.last_run = time.time()
+            self.last_duration = time.perf_counter() - start
+
+_jobs: Dict[str, PeriodicJob] = {}
+_tasks: List[asyncio.Task] = []
+
+def call_async(func: Callable[..., Awaitable[Any]], *args) -> Any:
+    """Run a coroutine function from a job on the application's event loop
+
+    Async clients (e.g. services.storage) belong to that loop. Outside the server,
+    such as in scripts, the coroutine gets a loop of its own.
+    """
+    import anyio.from_thread
+
+    try:
+        return anyio.from_thread.run(func, *args)
+    except RuntimeError:  # not in a worker thread of a running loop
+        return asyncio.run(func(*args))
+
+def register_job(name: str, interval_seconds: float, func: Callable[[Session], None], initial_delay: float = 5.0):
+    """Register (or replace) a periodic job"""
+    _jobs[name] = PeriodicJob(name, interval_seconds, func, initial_delay)
+
+def get_jobs() -> Dict[str, PeriodicJob]:
+    return dict(_jobs)
+
+async def _job_loop(job: PeriodicJob):
+    await asyncio.sleep(job.initial_delay)
+    while True:
+        await run_in_threadpool(job.run_once)
+        await asyncio.sleep(job.interval_seconds)
+
+def start_background_jobs():
+    """Start one task per registered job; call from application startup"""
+    if not BACKGROUND_JOBS_ENABLED or _tasks:
+        return
+    for job in _jobs.values():
+        _tasks.append(asyncio.create_task(_job_loop(job), name=f"job:{job.name}"))
+    scheduler_logger.info(f"Started {len(_tasks)} background jobs")
+
+async def stop_background_jobs():
+    """Cancel running job loops; call from application shutdown"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
\ No newline at end of file
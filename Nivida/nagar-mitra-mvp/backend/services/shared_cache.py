@@ -0,0 +1,142 @@
+"""
+Read-mostly snapshots shared between worker processes
+The serving supervisor (serve.py) publishes snapshots in a per-run directory,
+normally on /dev/shm, so workers do not each query the database for them.
+Array snapshots (such as the classifier's department index) are .npy files that
+workers memory-map and use in place: every process reads the same page-cache pages
+and none keeps a copy. JSON snapshots are parsed into a copy per process and are
+meant for small values. A new snapshot is written under a temporary name and renamed
+into place, and readers pick it up by its changed modification time.
+Outside the supervisor SHARED_CACHE_DIR is unset and callers fall back to loading
+from the database themselves.
+"""
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    orjson = None
+
+if TYPE_CHECKING:
+    import numpy as np
+
+shared_cache_logger = logging.getLogger("shared_cache")
+
+# Array snapshot versions kept on disk: the current one and the one before, which a
+# reader may still be opening while the supervisor publishes
+ARRAY_VERSIONS_KEPT = 2
+
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+def _loads(view) -> Any:
+    if orjson is not None:
+        # orjson parses straight from the mapped pages
+        return orjson.loads(view)
+    return json.loads(bytes(view))
+
+class SharedCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._entries: Dict[str, Tuple[int, Any]] = {}
+        self._arrays: Dict[str, Tuple[str, Dict[str, "np.ndarray"]]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def publish(self, name: str, data: Any):
+        """Atomically replace a snapshot (called by the supervisor)"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_dumps(data))
+            os.replace(tmp_path, self._path(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def publish_arrays(self, name: str, arrays: Dict[str, "np.ndarray"]):
+        """Replace an array snapshot (called by the supervisor)
+
+        The arrays go to a new version directory; the JSON snapshot `name` then
+        points readers at it.
+        """
+        import numpy as np
+
+        version = tempfile.mkdtemp(dir=self.directory, prefix=f"{name}.")
+        for key, array in arrays.items():
+            np.save(os.path.join(version, f"{key}.npy"), np.ascontiguousarray(array))
+        self.publish(name, {"version": os.path.basename(version), "arrays": sorted(arrays)})
+        versions = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_dir() and entry.name.startswith(f"{name}.")),
+            key=lambda entry: entry.stat().st_mtime_ns, reverse=True
+        )
+        for entry in versions[ARRAY_VERSIONS_KEPT:]:
+            if entry.path != version:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def read_arrays(self, name: str) -> Optional[Dict[str, "np.ndarray"]]:
+        """Latest array snapshot, memory-mapped read-only; None if it does not exist"""
+        pointer = self.read(name)
+        if pointer is None:
+            return None
+        cached = self._arrays.get(name)
+        if cached is not None and cached[0] == pointer["version"]:
+            return cached[1]
+        import numpy as np
+
+        version = os.path.join(self.directory, pointer["version"])
+        try:
+            arrays = {key: np.load(os.path.join(version, f"{key}.npy"), mmap_mode="r") for key in pointer["arrays"]}
+        except FileNotFoundError:
+            # Replaced twice since the pointer was read; the caller falls back to the database
+            return None
+        self._arrays[name] = (pointer["version"], arrays)
+        return arrays
+
+    def read(self, name: str) -> Optional[Any]:
+        """Latest published value, or None if the snapshot does not exist"""
+        path = self._path(name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._entries.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with self._lock:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return None
+                with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    try:
+                        value = _loads(view)
+                    finally:
+                        view.release()
+            self._entries[name] = (mtime, value)
+        return value
+
+_shared_cache: Optional[SharedCache] = None
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Cache of the serving supervisor this process belongs to, if any"""
+    global _shared_cache
+    directory = os.getenv("SHARED_CACHE_DIR")
+    if not directory:
+        return None
+    if _shared_cache is None or _shared_cache.directory != directory:
+        _shared_cache = SharedCache(directory)
+    return _shared_cache
\ No newline at end of file
@@ -0,0 +1,311 @@
+"""
+Media storage backends
+New media goes to the backend named by MEDIA_STORAGE; IssueMedia.file_path keeps
+where each file went: a path under UPLOAD_DIR for the local backend, or
+"s3://bucket/key" for an S3-compatible object store (AWS S3, MinIO, ...). Existing
+rows are always served by the backend their location belongs to, so switching
+backends (or S3 buckets) needs no data migration: objects in another bucket are
+reached with the configured endpoint and credentials.
+The S3 backend speaks the REST API directly over pooled httpx connections with
+SigV4 signing: large files go up as concurrent multipart uploads, and downloads are
+pre-signed URLs, so media bytes never pass through the API process.
+Uploads are still received and processed on local disk (services.media,
+services.uploads) before they are handed to a backend.
+"""
+import asyncio
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+
+from config import UPLOAD_DIR
+from utils.metrics import timed
+
+if TYPE_CHECKING:
+    import httpx
+
+storage_logger = logging.getLogger("storage")
+
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local")  # local | s3
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "https://s3.amazonaws.com")
+S3_BUCKET = os.getenv("S3_BUCKET", "nagar-mitra-media")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+S3_PRESIGN_SECONDS = int(os.getenv("S3_PRESIGN_SECONDS", "900"))
+# Files larger than one part are sent as a multipart upload (S3's minimum part size is 5MB)
+S3_PART_SIZE = max(5, int(os.getenv("S3_PART_SIZE_MB", "8"))) * 1024 * 1024
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "4"))
+S3_MAX_CONNECTIONS = int(os.getenv("S3_MAX_CONNECTIONS", "20"))
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+class StorageError(RuntimeError):
+    pass
+
+class LocalStorage:
+    """Files under a directory on this machine, served by the API itself"""
+
+    def __init__(self, root: str = UPLOAD_DIR):
+        self.root = root
+
+    def owns(self, location: str) -> bool:
+        return "://" not in location
+
+    async def put_file(self, path: str, key: str, content_type: str) -> str:
+        """Store a local file under `key` (the file is moved); returns its location"""
+        location = os.path.join(self.root, key)
+        os.replace(path, location)
+        return location
+
+    async def delete(self, location: str):
+        if os.path.exists(location):
+            os.remove(location)
+
+    def exists(self, location: str) -> bool:
+        return os.path.exists(location)
+
+    def download_url(self, location: str, filename: str) -> Optional[str]:
+        return None  # served with FileResponse
+
+    async def aclose(self):
+        pass
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+def sigv4_signature(secret_key: str, region: str, amz_date: str, method: str, path: str,
+                    query: Dict[str, str], headers: Dict[str, str], payload_hash: str,
+                    service: str = "s3") -> Tuple[str, str]:
+    """(signature, signed header names) for an AWS Signature Version 4 request
+
+    `path` is the unencoded object path, `headers` lower-case names to values.
+    """
+    date = amz_date[:8]
+    scope = f"{date}/{region}/{service}/aws4_request"
+    signed_headers = ";".join(sorted(headers))
+    canonical_request = "\n".join((
+        method,
+        _uri_encode(path, safe="/-_.~"),
+        "&".join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(query.items())),
+        "".join(f"{name}:{headers[name].strip()}\n" for name in sorted(headers)),
+        signed_headers,
+        payload_hash,
+    ))
+    string_to_sign = "\n".join((
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+    ))
+    key = _hmac(f"AWS4{secret_key}".encode("utf-8"), date)
+    for part in (region, service, "aws4_request"):
+        key = _hmac(key, part)
+    return hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest(), signed_headers
+
+def _amz_date(now: Optional[datetime.datetime] = None) -> str:
+    return (now or datetime.datetime.utcnow()).strftime("%Y%m%dT%H%M%SZ")
+
+def _xml_text(body: bytes, tag: str) -> Optional[str]:
+    """Text of the first element named `tag`, whatever its namespace"""
+    for element in ElementTree.fromstring(body).iter():
+        if element.tag == tag or element.tag.endswith("}" + tag):
+            return element.text
+    return None
+
+class S3Storage:
+    """Objects in one bucket of an S3-compatible store, addressed path-style"""
+
+    def __init__(self, endpoint: str = S3_ENDPOINT_URL, bucket: str = S3_BUCKET, region: str = S3_REGION,
+                 access_key: str = S3_ACCESS_KEY_ID, secret_key: str = S3_SECRET_ACCESS_KEY,
+                 part_size: int = S3_PART_SIZE, concurrency: int = S3_UPLOAD_CONCURRENCY,
+                 presign_seconds: int = S3_PRESIGN_SECONDS):
+        self.endpoint = endpoint.rstrip("/")
+        self.host = urlsplit(self.endpoint).netloc
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.presign_seconds = presign_seconds
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def owns(self, location: str) -> bool:
+        return location.startswith(f"s3://{self.bucket}/")
+
+    def location(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def key(self, location: str) -> str:
+        return location[len(f"s3://{self.bucket}/"):]
+
+    def _object_path(self, key: str) -> str:
+        return f"/{self.bucket}/{key}"
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        # A client belongs to the loop it was created on; scripts may run several loops in turn
+        if self._client is None or self._client_loop is not loop:
+            import httpx
+
+            self._client_loop = loop
+            # One pool per process: connections are reused across uploads and parts
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=S3_MAX_CONNECTIONS, max_keepalive_connections=S3_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(60.0, connect=10.0)
+            )
+        return self._client
+
+    async def _request(self, method: str, key: str, query: Optional[Dict[str, str]] = None, body: bytes = b"",
+                       headers: Optional[Dict[str, str]] = None, sign_payload: bool = True) -> "httpx.Response":
+        query = query or {}
+        amz_date = _amz_date()
+        # File data is not hashed on the event loop; TLS protects it in transit
+        payload_hash = (hashlib.sha256(body).hexdigest() if body else _EMPTY_SHA256) if sign_payload else UNSIGNED_PAYLOAD
+        signed = {"host": self.host, "x-amz-content-sha256": payload_hash, "x-amz-date": amz_date}
+        signed.update({name.lower(): value for name, value in (headers or {}).items()})
+        path = self._object_path(key)
+        signature, signed_headers = sigv4_signature(
+            self.secret_key, self.region, amz_date, method, path, query, signed, payload_hash
+        )
+        signed["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        del signed["host"]  # httpx sets it from the URL
+        url = self.endpoint + _uri_encode(path, safe="/-_.~")
+        response = await self._get_client().request(method, url, params=query, content=body or None, headers=signed)
+        if response.status_code >= 300 and not (method == "DELETE" and response.status_code == 404):
+            raise StorageError(f"S3 {method} {key} failed: {response.status_code} {response.text[:200]}")
+        return response
+
+    async def put_file(self, path: str, key: str, content_type: str) -> str:
+        """Upload a local file under `key` (the local copy is removed); returns its location"""
+        size = os.path.getsize(path)
+        with timed("storage_put"):
+            if size <= self.part_size:
+                with open(path, "rb") as source:
+                    body = source.read()
+                await self._request("PUT", key, body=body, headers={"Content-Type": content_type}, sign_payload=False)
+            else:
+                await self._put_multipart(path, size, key, content_type)
+        os.remove(path)
+        return self.location(key)
+
+    async def _put_multipart(self, path: str, size: int, key: str, content_type: str):
+        response = await self._request("POST", key, {"uploads": ""}, headers={"Content-Type": content_type})
+        upload_id = _xml_text(response.content, "UploadId")
+        if not upload_id:
+            raise StorageError(f"S3 multipart upload of {key} returned no UploadId")
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        def read_part(offset: int) -> bytes:
+            with open(path, "rb") as source:
+                source.seek(offset)
+                return source.read(self.part_size)
+
+        async def upload_part(number: int, offset: int) -> str:
+            async with limit:
+                body = await asyncio.to_thread(read_part, offset)
+                part = await self._request(
+                    "PUT", key, {"partNumber": str(number), "uploadId": upload_id}, body=body, sign_payload=False
+                )
+                return part.headers["ETag"]
+
+        try:
+            offsets = range(0, size, self.part_size)
+            etags: List[str] = await asyncio.gather(
+                *(upload_part(number, offset) for number, offset in enumerate(offsets, start=1))
+            )
+            parts = "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for number, etag in enumerate(etags, start=1)
+            )
+            complete = f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode("utf-8")
+            response = await self._request("POST", key, {"uploadId": upload_id}, body=complete)
+            # Completion can fail after the 200 status line has been sent
+            if b"<Error>" in response.content:
+                raise StorageError(f"S3 multipart upload of {key} failed: {response.text[:200]}")
+        except BaseException:
+            try:
+                await self._request("DELETE", key, {"uploadId": upload_id})
+            except Exception as e:
+                storage_logger.warning(f"Could not abort multipart upload {upload_id}: {e}")
+            raise
+
+    async def delete(self, location: str):
+        with timed("storage_delete"):
+            await self._request("DELETE", self.key(location))
+
+    def exists(self, location: str) -> bool:
+        return True  # checked by the object store when the URL is used
+
+    def download_url(self, location: str, filename: str) -> Optional[str]:
+        """Pre-signed GET URL, valid for presign_seconds"""
+        amz_date = _amz_date()
+        path = self._object_path(self.key(location))
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(self.presign_seconds),
+            "X-Amz-SignedHeaders": "host",
+            "response-content-disposition": f'attachment; filename="{filename.replace(chr(34), "")}"',
+        }
+        signature, _ = sigv4_signature(
+            self.secret_key, self.region, amz_date, "GET", path, query, {"host": self.host}, UNSIGNED_PAYLOAD
+        )
+        query["X-Amz-Signature"] = signature
+        encoded = "&".join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(query.items()))
+        return f"{self.endpoint}{_uri_encode(path, safe='/-_.~')}?{encoded}"
+
+    async def aclose(self):
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+
+_local = LocalStorage()
+_default = None
+# Backends for buckets other than the default's, holding media stored before a switch
+_buckets: Dict[str, S3Storage] = {}
+
+def get_storage():
+    """The backend new media is stored in"""
+    global _default
+    if _default is None:
+        if MEDIA_STORAGE == "s3":
+            _default = S3Storage()
+        elif MEDIA_STORAGE == "local":
+            _default = _local
+        else:
+            raise ValueError(f"Unknown MEDIA_STORAGE '{MEDIA_STORAGE}' (use local or s3)")
+    return _default
+
+def storage_for(location: str):
+    """The backend holding an existing file"""
+    storage = get_storage()
+    if storage.owns(location):
+        return storage
+    if _local.owns(location):
+        return _local
+    if location.startswith("s3://"):
+        bucket = location[len("s3://"):].split("/", 1)[0]
+        if bucket:
+            if bucket not in _buckets:
+                _buckets[bucket] = S3Storage(bucket=bucket)
+            return _buckets[bucket]
+    raise StorageError(f"No storage backend for {location}")
+
+async def close_storage():
+    if _default is not None:
+        await _default.aclose()
+    for storage in _buckets.values():
+        await storage.aclose()
\ No newline at end of file
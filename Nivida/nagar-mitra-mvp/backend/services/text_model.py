@@ -0,0 +1,180 @@
+"""
+Hashed TF-IDF features and a softmax (multinomial logistic regression) text model
+Words and word bigrams are hashed into N_FEATURES buckets (no vocabulary to store),
+weighted by sublinear TF-IDF and L2-normalised. A document batch is kept as CSR
+arrays, so scoring is a gather of weight rows and a segmented sum in NumPy.
+A trained model is a directory of .npy files that is memory-mapped on load, so
+every worker process shares the same pages.
+"""
+import json
+import os
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.text import TOKEN_CACHE_SIZE, canonical_tokens
+
+N_FEATURES = 1 << 18
+# Bumped whenever tokenize() changes; models hashed with another tokenizer are not loaded
+TOKENIZER_VERSION = 2
+
+def tokenize(text: str) -> List[str]:
+    """Canonical terms (utils.text) plus adjacent term pairs"""
+    words = canonical_tokens(text)
+    return list(words) + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _bucket(token: str, n_features: int) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(token.encode("utf-8")) & (n_features - 1)
+
+class SparseBatch:
+    """Term counts of a batch of documents in CSR form"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, counts: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Row number of every stored entry"""
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+def hash_counts(texts: Iterable[str], n_features: int = N_FEATURES) -> SparseBatch:
+    indptr = [0]
+    indices: List[int] = []
+    counts: List[int] = []
+    for text in texts:
+        bucket_counts = Counter(_bucket(token, n_features) for token in tokenize(text))
+        indices.extend(bucket_counts.keys())
+        counts.extend(bucket_counts.values())
+        indptr.append(len(indices))
+    return SparseBatch(
+        np.asarray(indptr, dtype=np.int64),
+        np.asarray(indices, dtype=np.int64),
+        np.asarray(counts, dtype=np.float32),
+    )
+
+def tfidf_values(batch: SparseBatch, idf: np.ndarray) -> np.ndarray:
+    """Sublinear TF-IDF weights of the batch's entries, L2-normalised per document"""
+    values = (1.0 + np.log(batch.counts)) * idf[batch.indices]
+    rows = batch.rows
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(batch)))
+    norms[norms == 0] = 1.0
+    return (values / norms[rows]).astype(np.float32)
+
+def segment_sum(values: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """Sum of `values` rows over each CSR segment (empty segments give zeros)"""
+    out = np.zeros((len(indptr) - 1,) + values.shape[1:], dtype=np.float32)
+    nonempty = np.flatnonzero(np.diff(indptr))
+    if len(nonempty):
+        out[nonempty] = np.add.reduceat(values, indptr[:-1][nonempty], axis=0)
+    return out
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+class LinearTextModel:
+    """Softmax classifier over hashed TF-IDF features; `classes` are department ids"""
+
+    FILES = ("weights", "bias", "idf", "classes")
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, idf: np.ndarray, classes: np.ndarray,
+                 meta: Optional[Dict[str, Any]] = None):
+        self.weights = weights  # (n_features, n_classes)
+        self.bias = bias
+        self.idf = idf
+        self.classes = classes
+        self.meta = meta or {}
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    def predict_batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(class index, probability, known-feature flag) per text
+
+        A text with no feature seen in training gets the prior only; callers treat
+        `known == False` as "no opinion".
+        """
+        batch = hash_counts(texts, self.n_features)
+        values = tfidf_values(batch, self.idf)
+        rows_weights = self.weights[batch.indices]
+        logits = segment_sum(rows_weights * values[:, None], batch.indptr) + self.bias
+        known = segment_sum(np.any(rows_weights != 0, axis=1).astype(np.float32), batch.indptr) > 0
+        probabilities = softmax(logits)
+        best = probabilities.argmax(axis=1)
+        return best, probabilities[np.arange(len(best)), best], known
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.FILES:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2, default=str)
+
+    @classmethod
+    def load(cls, directory: str) -> "LinearTextModel":
+        """Memory-map a saved model (read-only)"""
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in cls.FILES}
+        meta = {}
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        return cls(meta=meta, **arrays)
+
+def train_linear_model(
+    texts: Sequence[str],
+    labels: Sequence[int],
+    n_features: int = N_FEATURES,
+    epochs: int = 150,
+    learning_rate: float = 0.1,
+    l2: float = 1e-4,
+) -> LinearTextModel:
+    """Fit softmax regression with full-batch Adam on the features that occur in `texts`"""
+    classes, y = np.unique(np.asarray(labels), return_inverse=True)
+    batch = hash_counts(texts, n_features)
+    n_docs, n_classes = len(batch), len(classes)
+
+    document_frequency = np.bincount(batch.indices, minlength=n_features)
+    idf = (np.log((1.0 + n_docs) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+    values = tfidf_values(batch, idf)
+
+    # Optimise only the weight rows of features present in the data
+    used, compact = np.unique(batch.indices, return_inverse=True)
+    weights = np.zeros((len(used), n_classes), dtype=np.float32)
+    bias = np.zeros(n_classes, dtype=np.float32)
+    targets = np.zeros((n_docs, n_classes), dtype=np.float32)
+    targets[np.arange(n_docs), y] = 1.0
+    rows = batch.rows
+
+    moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    for step in range(1, epochs + 1):
+        logits = segment_sum(weights[compact] * values[:, None], batch.indptr) + bias
+        error = (softmax(logits) - targets) / n_docs
+        grad_weights = np.zeros_like(weights)
+        np.add.at(grad_weights, compact, values[:, None] * error[rows])
+        grad_weights += l2 * weights
+        grad_bias = error.sum(axis=0)
+        for param, grad, m, v in ((weights, grad_weights, moments[0], moments[1]),
+                                  (bias, grad_bias, moments[2], moments[3])):
+            m *= beta1
+            m += (1 - beta1) * grad
+            v *= beta2
+            v += (1 - beta2) * grad * grad
+            param -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+    full_weights = np.zeros((n_features, n_classes), dtype=np.float32)
+    full_weights[used] = weights
+    return LinearTextModel(full_weights, bias, idf, classes.astype(np.int64), {"tokenizer": TOKENIZER_VERSION})
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""
+Resumable uploads in the style of the tus protocol
+A client creates a session with the file's name, type and total length, then sends
+the bytes in one or more PATCH requests, each starting at the offset the server has
+stored. After a dropped connection it asks for that offset and continues from there:
+bytes that arrived before the drop are kept. Request bodies are streamed straight
+into the session's file. A completed upload is attached to an issue by its id; the
+session is deleted in the transaction that adds the media, so a failed attach can be
+retried with the same id.
+Sessions that are neither completed and attached nor touched for
+UPLOAD_SESSION_TTL_SECONDS are removed, file included, by a background job.
+"""
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterator, List, Optional, Set
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import ObjectDeletedError
+
+from config import UPLOAD_DIR
+from models.upload_session import UploadSession
+from services.media import ALLOWED_FILE_TYPES, STAGED_PREFIX, StagedUpload, stage_file
+from utils.metrics import Counter, register
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; only the per-process guard applies there
+    fcntl = None
+
+uploads_logger = logging.getLogger("uploads")
+
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+RESUMABLE_UPLOAD_MAX_BYTES = int(os.getenv("RESUMABLE_UPLOAD_MAX_MB", "100")) * 1024 * 1024
+UPLOAD_GC_INTERVAL_SECONDS = 900
+
+UPLOAD_BYTES = register(Counter("resumable_upload_bytes_total", "Bytes received by resumable upload chunks"))
+UPLOAD_SESSIONS = register(Counter(
+    "resumable_upload_sessions_total", "Resumable upload sessions by outcome", ("outcome",)
+))
+
+# Sessions with a chunk being written by this process; other processes are kept out
+# by an exclusive flock on the session file
+_writing: Set[str] = set()
+
+class UploadError(ValueError):
+    """A request the upload session cannot accept; carries the HTTP status to answer with"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+
+def session_path(upload: UploadSession) -> str:
+    return os.path.join(UPLOAD_DIR, f"{STAGED_PREFIX}upload_{upload.id}")
+
+def is_complete(upload: UploadSession) -> bool:
+    return upload.received >= upload.length
+
+@contextmanager
+def _locked_file(upload: UploadSession, mode: str) -> Iterator:
+    """Open the session file under an exclusive lock held by no other process
+
+    Raises UploadError (423) when a chunk of the upload is being written elsewhere.
+    """
+    with open(session_path(upload), mode) as file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError(423, "Another chunk of this upload is being written")
+        yield file
+
+def _is_writing(upload: UploadSession) -> bool:
+    if upload.id in _writing:
+        return True
+    try:
+        with _locked_file(upload, "rb"):
+            return False
+    except UploadError:
+        return True
+    except FileNotFoundError:
+        return False
+
+def create_session(db: Session, user_id: int, filename: str, content_type: str, length: int) -> UploadSession:
+    if content_type not in ALLOWED_FILE_TYPES:
+        raise UploadError(400, f"File type {content_type} not allowed")
+    if length <= 0:
+        raise UploadError(400, "Upload length must be positive")
+    if length > RESUMABLE_UPLOAD_MAX_BYTES:
+        raise UploadError(413, f"Uploads are limited to {RESUMABLE_UPLOAD_MAX_BYTES} bytes")
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        filename=os.path.basename(filename)[:255] or "upload",
+        content_type=content_type,
+        length=length,
+        received=0,
+        expires_at=datetime.utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)
+    )
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    open(session_path(upload), "wb").close()
+    db.add(upload)
+    db.commit()
+    UPLOAD_SESSIONS.inc(("created",))
+    return upload
+
+def get_session(db: Session, upload_id: str, user_id: int) -> Optional[UploadSession]:
+    """The user's live session, None when unknown, someone else's or expired"""
+    upload = db.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != user_id or upload.expires_at < datetime.utcnow():
+        return None
+    return upload
+
+async def write_chunk(db: Session, upload: UploadSession, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """Append a request body at `offset`; returns the new offset
+
+    A body cut short by a disconnect still counts: the client resumes after the bytes
+    that arrived. Writers hold a lock on the session file, and the offset is read
+    again once it is taken, so a chunk committed meanwhile by another process is
+    never truncated; the offset is then advanced with a compare-and-set.
+    """
+    if offset != upload.received:
+        raise UploadError(409, f"Upload offset is {upload.received}, not {offset}")
+    if upload.id in _writing:
+        raise UploadError(423, "Another chunk of this upload is being written")
+
+    from starlette.requests import ClientDisconnect
+
+    _writing.add(upload.id)
+    written = 0
+    try:
+        with _locked_file(upload, "r+b") as output:
+            try:
+                db.refresh(upload)
+            except ObjectDeletedError:
+                raise UploadError(404, "Upload not found")
+            if offset != upload.received:
+                raise UploadError(409, f"Upload offset is {upload.received}, not {offset}")
+            # Drop bytes past the stored offset left by a chunk that was never committed
+            output.seek(offset)
+            output.truncate()
+            try:
+                async for chunk in chunks:
+                    if offset + written + len(chunk) > upload.length:
+                        raise UploadError(413, "Chunk goes past the announced upload length")
+                    output.write(chunk)
+                    written += len(chunk)
+            except ClientDisconnect:
+                uploads_logger.info(f"Upload {upload.id} interrupted after {offset + written} bytes")
+    finally:
+        _writing.discard(upload.id)
+
+    UPLOAD_BYTES.inc(amount=written)
+    result = db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload.id, UploadSession.received == offset)
+        .values(
+            received=offset + written,
+            expires_at=datetime.utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)
+        )
+    )
+    db.commit()
+    if result.rowcount != 1:
+        raise UploadError(409, "Upload offset changed while the chunk was written")
+    db.refresh(upload)
+    if is_complete(upload):
+        UPLOAD_SESSIONS.inc(("completed",))
+    return upload.received
+
+def completed_sessions(db: Session, upload_ids: List[str], user_id: int) -> List[UploadSession]:
+    """The user's finished uploads, in the order given"""
+    uploads = []
+    for upload_id in dict.fromkeys(upload_ids):
+        upload = get_session(db, upload_id, user_id)
+        if upload is None:
+            raise UploadError(404, f"Upload {upload_id} not found")
+        if not is_complete(upload):
+            raise UploadError(409, f"Upload {upload_id} is incomplete ({upload.received} of {upload.length} bytes)")
+        uploads.append(upload)
+    return uploads
+
+def stage_sessions(uploads: List[UploadSession]) -> List[StagedUpload]:
+    """Stage copies of finished uploads for media intake; the sessions are left as they are"""
+    return [stage_file(session_path(upload), upload.filename, upload.content_type) for upload in uploads]
+
+def consume_sessions(db: Session, uploads: List[UploadSession]):
+    """Delete attached sessions as part of the caller's transaction (not committed)
+
+    Raises UploadError when another request attached one of them first.
+    """
+    if not uploads:
+        return
+    result = db.execute(
+        delete(UploadSession).where(UploadSession.id.in_([upload.id for upload in uploads])),
+        execution_options={"synchronize_session": False}
+    )
+    if result.rowcount != len(uploads):
+        raise UploadError(409, "Upload was attached by another request")
+    for upload in uploads:
+        db.expunge(upload)
+
+def release_sessions(uploads: List[UploadSession]):
+    """Remove the files of sessions deleted by a committed consume_sessions"""
+    for upload in uploads:
+        path = session_path(upload)
+        if os.path.exists(path):
+            os.remove(path)
+    UPLOAD_SESSIONS.inc(("attached",), len(uploads))
+
+def delete_session(db: Session, upload: UploadSession, outcome: str = "terminated"):
+    """Remove the session and whatever is left of its file; 423 while a chunk is being written"""
+    if _is_writing(upload):
+        raise UploadError(423, "A chunk of this upload is being written")
+    path = session_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    db.delete(upload)
+    db.commit()
+    UPLOAD_SESSIONS.inc((outcome,))
+
+def expire_sessions(db: Session, now: Optional[datetime] = None) -> int:
+    """Delete sessions past their expiry with their files; returns sessions removed"""
+    now = now or datetime.utcnow()
+    removed = 0
+    for upload in db.query(UploadSession).filter(UploadSession.expires_at < now).all():
+        if _is_writing(upload):
+            continue
+        path = session_path(upload)
+        if os.path.exists(path):
+            os.remove(path)
+        db.delete(upload)
+        removed += 1
+    db.commit()
+    if removed:
+        UPLOAD_SESSIONS.inc(("expired",), removed)
+        uploads_logger.info(f"Removed {removed} expired upload sessions")
+    return removed
+
+def run_upload_gc(db: Session):
+    """Periodic job entry point"""
+    expire_sessions(db)
\ No newline at end of file
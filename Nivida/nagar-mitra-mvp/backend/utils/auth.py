@@ -1,7 +1,5 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -10,9 +8,10 @@ import os
 from database import get_db
 from models.user import User
 from schemas.auth import TokenData
+from utils.metrics import timed
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context, created on first use (passlib and its bcrypt backend are slow to import)
+_pwd_context = None
 
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your_super_secret_key_here_change_in_production")
@@ -22,13 +21,22 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
 # Security scheme
 security = HTTPBearer()
 
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    with timed("bcrypt_verify"):
+        return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    with timed("bcrypt_hash"):
+        return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
@@ -38,6 +46,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -50,6 +59,27 @@ def authenticate_user(db: Session, mobile_number: str, password: str) -> Optiona
         return None
     return user
 
+def decode_access_token(token: str) -> Optional[dict]:
+    """Verified claims of a JWT access token, or None if it is invalid or expired"""
+    # jose pulls in the cryptography backends; import it when a token is first handled
+    from jose import JWTError, jwt
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+def get_user_from_token(db: Session, token: str) -> Optional[User]:
+    """Resolve a JWT access token to its user, or None if the token is invalid"""
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    mobile_number: str = payload.get("sub")
+    if mobile_number is None:
+        return None
+    token_data = TokenData(mobile_number=mobile_number)
+    
+    return db.query(User).filter(User.mobile_number == token_data.mobile_number).first()
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -61,16 +91,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        mobile_number: str = payload.get("sub")
-        if mobile_number is None:
-            raise credentials_exception
-        token_data = TokenData(mobile_number=mobile_number)
-    except JWTError:
-        raise credentials_exception
-        
-    user = db.query(User).filter(User.mobile_number == token_data.mobile_number).first()
+    user = get_user_from_token(db, credentials.credentials)
     if user is None:
         raise credentials_exception
     return user
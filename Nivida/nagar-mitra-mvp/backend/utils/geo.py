@@ -0,0 +1,59 @@
+"""
+Geographic helpers: geohash cells used to group issues by area
+"""
+from typing import Dict, Optional
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Precision 6 cells are roughly 1.2km x 0.6km, about a neighbourhood
+GEO_CELL_PRECISION = 6
+# Listable cell precisions and their Issue columns; each column has a (cell, hot_score)
+# index, so an area listing is an equality lookup read in hot order
+GEO_CELL_COLUMNS = {4: "geo_cell_4", 5: "geo_cell_5", GEO_CELL_PRECISION: "geo_cell"}
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEO_CELL_PRECISION) -> str:
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+def geo_cell(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    """Geohash cell for an issue location, or None when the location is unknown"""
+    if latitude is None or longitude is None:
+        return None
+    return geohash_encode(latitude, longitude)
+
+def geo_cells(latitude: Optional[float], longitude: Optional[float]) -> Dict[str, Optional[str]]:
+    """Values of every geo cell column for an issue location"""
+    cell = geo_cell(latitude, longitude)
+    return {column: cell[:precision] if cell else None for precision, column in GEO_CELL_COLUMNS.items()}
+
+def is_valid_cell(cell: str) -> bool:
+    return len(cell) in GEO_CELL_COLUMNS and all(c in _BASE32 for c in cell)
\ No newline at end of file
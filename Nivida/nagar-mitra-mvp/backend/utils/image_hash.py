@@ -0,0 +1,45 @@
+"""
+Perceptual image hashes
+dHash: the image is reduced to 9x8 grey pixels and each bit says whether a pixel is
+brighter than its right neighbour. Resizing, re-compression and small colour changes
+leave most of the 64 bits alone, so near-duplicate photos are a small Hamming
+distance apart. Pillow is imported on first use.
+"""
+from typing import BinaryIO, Optional, Union
+
+HASH_BITS = 64
+_SIGN_BIT = 1 << (HASH_BITS - 1)
+
+def dhash(source: Union[str, BinaryIO], size: int = 8) -> Optional[int]:
+    """Unsigned 64-bit dHash of an image file, None if it cannot be decoded"""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(source) as image:
+            # JPEG decoders can scale down while decoding, far cheaper than a full decode
+            image.draft("L", (size * 4, size * 4))
+            return dhash_image(image, size)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+def dhash_image(image, size: int = 8) -> int:
+    """dHash of an already opened Pillow image"""
+    from PIL import Image
+
+    pixels = list(image.convert("L").resize((size + 1, size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for column in range(size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+def hamming_distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+def to_db_hash(value: int) -> int:
+    """Unsigned hash as the signed 64-bit integer a BIGINT column holds"""
+    return value - (1 << HASH_BITS) if value & _SIGN_BIT else value
+
+def from_db_hash(value: int) -> int:
+    return value & ((1 << HASH_BITS) - 1)
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Fast serialization helpers for list endpoints
+Rows are read as plain column tuples and encoded straight to JSON, skipping
+pydantic validation for data that comes from our own database
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, List, Sequence
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.issue import Issue, IssueMedia
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+# Columns exposed by IssueResponse, in the order they are selected
+ISSUE_COLUMNS = (
+    Issue.id,
+    Issue.title,
+    Issue.description,
+    Issue.category,
+    Issue.latitude,
+    Issue.longitude,
+    Issue.address,
+    Issue.status,
+    Issue.priority,
+    Issue.user_id,
+    Issue.department_id,
+    Issue.worker_id,
+    Issue.ai_confidence,
+    Issue.needs_manual_review,
+    Issue.upvotes,
+    Issue.downvotes,
+    Issue.urgency_score,
+    Issue.sla_due_at,
+    Issue.sla_breached,
+    Issue.hot_score,
+    Issue.created_at,
+    Issue.updated_at,
+    Issue.resolved_at,
+)
+ISSUE_FIELDS = tuple(column.key for column in ISSUE_COLUMNS)
+
+MEDIA_COLUMNS = (
+    IssueMedia.issue_id,
+    IssueMedia.id,
+    IssueMedia.file_path,
+    IssueMedia.file_type,
+    IssueMedia.file_size,
+    IssueMedia.original_filename,
+    IssueMedia.duplicate_of_issue_id,
+    IssueMedia.created_at,
+)
+MEDIA_FIELDS = tuple(column.key for column in MEDIA_COLUMNS[1:])
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for types the stdlib json module does not handle"""
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response that encodes with orjson and skips jsonable_encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def rows_to_issue_dicts(db: Session, rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Turn issue column tuples into IssueResponse-shaped dicts, media included"""
+    issues = [dict(zip(ISSUE_FIELDS, row)) for row in rows]
+    if not issues:
+        return issues
+
+    by_id = {}
+    for issue in issues:
+        issue["media"] = []
+        by_id[issue["id"]] = issue
+
+    # One query for the media of the whole page instead of a lazy load per issue
+    media_rows = db.execute(
+        select(*MEDIA_COLUMNS)
+        .where(IssueMedia.issue_id.in_(by_id.keys()))
+        .order_by(IssueMedia.id)
+    ).all()
+    for row in media_rows:
+        by_id[row[0]]["media"].append(dict(zip(MEDIA_FIELDS, row[1:])))
+
+    return issues
+
+def fetch_issue_dicts(db: Session, statement) -> List[Dict[str, Any]]:
+    """Execute a column-tuple issue select and return serialized dicts"""
+    return rows_to_issue_dicts(db, db.execute(statement).all())
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Text normalization shared by everything that matches words in issue reports
+Reports arrive in English, Hindi and Marathi (Devanagari) and in romanized Hindi
+("paani nahi aa raha"). Text is NFKC-normalized and case-folded, Devanagari
+spelling variants are unified, tokens are split script-aware (vowel signs stay
+inside their word), and each token is mapped to a canonical term: common Hindi,
+Marathi and transliterated words go to the English keyword they mean, and the
+rest are lightly stemmed. Token and text results are memoized in bounded caches.
+Keywords must go through canonical_term() too, so both sides compare alike.
+"""
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+
+TOKEN_CACHE_SIZE = int(os.getenv("TEXT_TOKEN_CACHE_SIZE", "65536"))
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "4096"))
+
+# Word characters plus Devanagari letters and vowel signs (\w alone splits "पानी"),
+# without the danda punctuation marks
+_TOKEN_RE = re.compile(r"[\w\u0900-\u0963\u0966-\u097f]+")
+_DEVANAGARI_RE = re.compile(r"[\u0900-\u097f]")
+
+_CHAR_MAP = str.maketrans({
+    "\u200b": None,  # zero width space
+    "\u200c": None,  # zero width non-joiner
+    "\u200d": None,  # zero width joiner
+    "\u093c": None,  # nukta: "सड़क" and "सडक" are both common spellings
+    "\u0901": "\u0902",  # candrabindu written as anusvara
+})
+
+# Hindi/Marathi words and their common romanizations, by the English keyword they mean
+TRANSLITERATIONS: Dict[str, Tuple[str, ...]] = {
+    "water": ("पानी", "पाणी", "जल", "paani", "pani", "paanee", "jal"),
+    "pipe": ("पाइप", "पाईप", "paip"),
+    "leak": ("लीक", "रिसाव", "गळती", "risav", "galti"),
+    "tap": ("नल", "नळ", "nal", "nall"),
+    "drainage": ("नाली", "नाला", "गटार", "naali", "nali", "nala", "naala", "gatar", "gutter"),
+    "sewage": ("सीवर", "sewer", "seevar"),
+    "electricity": ("बिजली", "वीज", "bijli", "bijlee", "bijali", "vij", "veej", "electric"),
+    "power": ("करंट", "current", "karant"),
+    "outage": ("कटौती", "blackout", "powercut", "katauti"),
+    "wire": ("तार", "वायर", "taar", "vayar"),
+    "pole": ("खंभा", "खांब", "khamba", "khambha", "khamb"),
+    "streetlight": ("बत्ती", "दिवा", "batti", "diva", "lamp", "streetlamp"),
+    "transformer": ("ट्रांसफार्मर", "ट्रान्सफॉर्मर"),
+    "road": ("सड़क", "रस्ता", "रास्ता", "मार्ग", "sadak", "sarak", "rasta", "raasta", "marg"),
+    "pothole": ("गड्ढा", "गड्ढे", "खड्डा", "खड्डे", "gaddha", "gadda", "gaddhe", "khadda", "khadde"),
+    "traffic": ("जाम", "वाहतूक", "jam", "vahatuk"),
+    "footpath": ("फुटपाथ", "पदपथ", "futpath"),
+    "garbage": ("कचरा", "कूड़ा", "कुडा", "kachra", "kachara", "kooda", "kuda", "rubbish", "litter"),
+    "dustbin": ("कूड़ेदान", "कचराकुंडी", "koodedan", "kachrakundi"),
+    "cleaning": ("सफाई", "स्वच्छता", "safai", "swachhata"),
+    "fire": ("आग", "aag"),
+    "accident": ("दुर्घटना", "अपघात", "durghatna", "apghat"),
+    "crime": ("अपराध", "गुन्हा", "aparadh", "gunha"),
+    "police": ("पुलिस", "पोलीस", "pulis"),
+    "safety": ("सुरक्षा", "suraksha"),
+    "theft": ("चोरी", "chori"),
+    "danger": ("खतरा", "धोका", "khatra", "dhoka"),
+    "urgent": ("तुरंत", "ताबडतोब", "turant", "jaldi"),
+    "flood": ("बाढ़", "पूर", "baadh", "badh"),
+}
+
+# Plural/oblique endings: Hindi feminine -ी and masculine -ा nouns, Marathi "on"/"in"
+# forms of -ा nouns ("रस्त्यावर"), and bare suffixes
+_DEVANAGARI_SUFFIXES = (
+    ("ियों", "ी"), ("ियां", "ी"), ("ाओं", "ा"), ("ाएं", "ा"), ("्यावर", "ा"), ("्यात", "ा"),
+    ("ों", ""), ("ें", ""),
+)
+
+def normalize_text(text: str) -> str:
+    """NFKC, case-folded, with Devanagari spelling variants unified"""
+    return unicodedata.normalize("NFKC", text or "").casefold().translate(_CHAR_MAP)
+
+def tokenize(text: str) -> List[str]:
+    """Normalized words, script-aware"""
+    return _TOKEN_RE.findall(normalize_text(text))
+
+def _stem_english(word: str) -> str:
+    if len(word) <= 3 or not word.isascii():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("es") and word[-3] in "sxz" or word.endswith(("ches", "shes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ing", "ed"):
+        stem = word[:-len(suffix)]
+        if word.endswith(suffix) and len(stem) >= 3 and any(vowel in stem for vowel in "aeiouy"):
+            word = stem[:-1] if len(stem) > 3 and stem[-1] == stem[-2] and stem[-1] not in "lsz" else stem
+            break
+    # "pipe"/"piped", "wire"/"wired" meet at the same stem
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+def _stem_devanagari(word: str) -> str:
+    for suffix, replacement in _DEVANAGARI_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            return word[:-len(suffix)] + replacement
+    return word
+
+def light_stem(word: str) -> str:
+    """Strip common inflections (English plurals/-ing/-ed, Hindi plural endings)"""
+    if _DEVANAGARI_RE.search(word):
+        return _stem_devanagari(word)
+    return _stem_english(word)
+
+def _build_term_map() -> Dict[str, str]:
+    terms = {}
+    for english, variants in TRANSLITERATIONS.items():
+        target = _stem_english(english)
+        for variant in variants:
+            variant = normalize_text(variant)
+            terms[variant] = target
+            terms.setdefault(light_stem(variant), target)
+    return terms
+
+_TERM_MAP = _build_term_map()
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def canonical_term(token: str) -> str:
+    """The canonical term for one token or keyword"""
+    token = normalize_text(token)
+    term = _TERM_MAP.get(token)
+    if term is None:
+        stem = light_stem(token)
+        term = _TERM_MAP.get(stem, stem)
+    return term
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def canonical_tokens(text: str) -> Tuple[str, ...]:
+    """Canonical terms of a text, in order (a text is often matched several times on intake)"""
+    return tuple(canonical_term(token) for token in tokenize(text))
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def term_set(text: str) -> FrozenSet[str]:
+    """Distinct canonical terms of a text"""
+    return frozenset(canonical_tokens(text))
+
+def cache_info() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters of the token and text caches"""
+    return {
+        name: func.cache_info()._asdict()
+        for name, func in (("terms", canonical_term), ("tokens", canonical_tokens), ("term_sets", term_set))
+    }
\ No newline at end of file